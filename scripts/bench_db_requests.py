@@ -0,0 +1,129 @@
+"""
+Request Throughput Benchmark — WatchTower V2
+=============================================
+Replays the request pattern of the threaded Flask server against a scratch
+database: every call runs on a fresh thread (app.run(threaded=True) starts
+one per request), with a fixed number in flight at once. Reports throughput
+and latency for reads, writes and a 3:1 mix.
+
+    get_debug_entries   newest 50 of the seeded debug log
+    add_todo            one new todo
+    mixed               three reads for every write
+
+--no-pool keeps no idle connections (SQLITE_POOL_SIZE = 0), so every
+get_db() block opens and closes its own connection, as before pooling.
+
+Usage:
+    python scripts/bench_db_requests.py
+    python scripts/bench_db_requests.py --no-pool
+    python scripts/bench_db_requests.py --requests 5000 --concurrency 16
+"""
+
+import sys
+import os
+import argparse
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from models import database as db
+
+
+def seed(entries: int):
+    with db.get_db() as conn:
+        conn.executemany(
+            "INSERT INTO debug_log (device_name, severity, title, description) VALUES (?, ?, ?, ?)",
+            [(f"Prop{i % 40}", "warning", f"Seeded issue {i}", "x" * 200) for i in range(entries)]
+        )
+
+
+def read(i):
+    db.get_debug_entries(limit=50)
+
+
+def write(i):
+    db.add_todo(f"Bench todo {i}", device_name=f"Prop{i % 40}", priority="normal")
+
+
+def mixed(i):
+    (write if i % 4 == 0 else read)(i)
+
+
+def percentile(ordered: list, p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def run(call, requests: int, concurrency: int) -> dict:
+    """`requests` calls, each on a new thread, at most `concurrency` at a time."""
+    slots = threading.Semaphore(concurrency)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def request(i):
+        started = time.perf_counter()
+        try:
+            call(i)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+            slots.release()
+
+    threads = []
+    started = time.perf_counter()
+    for i in range(requests):
+        slots.acquire()
+        thread = threading.Thread(target=request, args=(i,))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rate": requests / wall,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-request database access")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per workload")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once")
+    parser.add_argument("--seed", type=int, default=5000, help="debug log rows to read from")
+    parser.add_argument("--no-pool", action="store_true", help="open a connection per get_db() block")
+    args = parser.parse_args()
+
+    if args.no_pool:
+        config.SQLITE_POOL_SIZE = 0
+    config.DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+    db.init_db(config.DATABASE_PATH)
+    seed(args.seed)
+
+    print(f"  {args.requests} requests per workload, {args.concurrency} concurrent, "
+          f"{'no pool' if args.no_pool else f'pool of {config.SQLITE_POOL_SIZE}'}")
+    print(f"  {'workload':<18} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    errors = 0
+    for name, call in (("get_debug_entries", read), ("add_todo", write), ("mixed 3:1", mixed)):
+        result = run(call, args.requests, args.concurrency)
+        errors += result["errors"]
+        print(f"  {name:<18} {result['rate']:>8.0f} {result['p50_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['max_ms']:>8.2f}")
+
+    print()
+    print(f"{'❌' if errors else '✅'} {errors} failed requests")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Ingest Latency Benchmark — WatchTower V2
+=========================================
+UI write latency while MQTT traffic is being logged. One thread plays the
+logger and event writer (app.run_mqtt_logger / run_event_writer): every
+flush interval it appends the interval's messages to the mqtt_log day
+partition and a few status changes to device_status_history, both in the hot
+file. Meanwhile a UI thread saves a debug note and resolves it every 20ms,
+the way the debug-log page does, and times both writes.
+
+With the time series in watchtower_hot.db the UI writes only ever wait on
+the main file, so their latency should stay flat as the ingest rate rises.
+
+Usage:
+    python scripts/bench_ingest_latency.py
+    python scripts/bench_ingest_latency.py --rates 0,1000,10000 --seconds 10
+"""
+
+import sys
+import os
+import argparse
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from models import database as db
+
+DEVICES = 40
+STATUS_CHANGE_SHARE = 0.01   # one status change per hundred messages
+
+
+def percentile(ordered: list, p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def ingest(rate: int, stop: threading.Event, counts: dict):
+    """Log `rate` messages per second in flush-interval batches until stopped."""
+    interval = config.MQTT_LOG_FLUSH_INTERVAL
+    per_flush = int(rate * interval)
+    changes_per_flush = max(1, int(per_flush * STATUS_CHANGE_SHARE))
+    online = [True] * DEVICES
+    n = 0
+    next_flush = time.perf_counter() + interval
+    while not stop.wait(max(0.0, next_flush - time.perf_counter())):
+        now = datetime.now().isoformat(sep=" ", timespec="milliseconds")
+        rows = [(now, "in", f"MermaidsTale/Prop{(n + i) % DEVICES}/angle", str((n + i) % 360),
+                 f"Prop{(n + i) % DEVICES}") for i in range(per_flush)]
+        db.log_mqtt_messages(rows)
+        changes = []
+        for i in range(changes_per_flush):
+            device = (n + i) % DEVICES
+            online[device] = not online[device]
+            changes.append((now, f"Prop{device}", "online" if online[device] else "offline"))
+        db.record_status_changes(changes)
+        n += per_flush
+        counts["messages"] += per_flush
+        next_flush += interval
+
+
+def run(rate: int, seconds: float) -> dict:
+    stop = threading.Event()
+    counts = {"messages": 0}
+    ingester = None
+    if rate:
+        ingester = threading.Thread(target=ingest, args=(rate, stop, counts), daemon=True)
+        ingester.start()
+
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        tick = time.perf_counter()
+        try:
+            entry_id = db.add_debug_entry(f"Prop{i % DEVICES}", "warning", f"UI note {rate}/{i}")
+            latencies.append(time.perf_counter() - tick)
+            resolved = time.perf_counter()
+            db.resolve_debug_entry(entry_id, "reseated the connector")
+            latencies.append(time.perf_counter() - resolved)
+        except Exception:
+            errors += 1
+        i += 1
+        time.sleep(max(0.0, tick + 0.02 - time.perf_counter()))
+
+    stop.set()
+    if ingester:
+        ingester.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "ingested": counts["messages"] / wall,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark UI write latency under MQTT ingest")
+    parser.add_argument("--rates", default="0,1000,3000,5000", help="comma-separated msg/s to ingest")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each rate")
+    args = parser.parse_args()
+
+    config.DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+    db.init_db(config.DATABASE_PATH)
+
+    print(f"  {args.seconds:g}s per rate, UI writes every 20ms, "
+          f"ingest flushed every {config.MQTT_LOG_FLUSH_INTERVAL:g}s")
+    print(f"  {'msg/s':>7} {'ingested/s':>11} {'UI p50 ms':>10} {'UI p99 ms':>10} {'UI max ms':>10}")
+    errors = 0
+    for rate in (int(r) for r in args.rates.split(",")):
+        result = run(rate, args.seconds)
+        errors += result["errors"]
+        print(f"  {rate:>7} {result['ingested']:>11.0f} {result['p50_ms']:>10.2f} "
+              f"{result['p99_ms']:>10.2f} {result['max_ms']:>10.2f}")
+
+    print()
+    print(f"{'❌' if errors else '✅'} {errors} failed UI writes")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Grimoire Import Benchmark — WatchTower V2
+==========================================
+Times the bulk import behind seed_grimoire.py on synthetic data: half debug
+log issues, half todo items, imported into a scratch database three times.
+
+    fresh       every item is new
+    re-run      nothing changed, nothing written
+    1% edited   one item in a hundred has new text
+
+Exits 1 if the fresh import of --items takes longer than --budget seconds.
+
+Usage:
+    python scripts/bench_seed_import.py                   # 10,000 items, 1s budget
+    python scripts/bench_seed_import.py --items 50000 --budget 5
+"""
+
+import sys
+import os
+import argparse
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from models import database as db
+
+SEVERITIES = ("info", "warning", "critical")
+PRIORITIES = ("low", "normal", "high", "critical")
+
+
+def synthetic(count: int) -> tuple:
+    issues = [{
+        "device_name": f"Prop{i % 40}",
+        "severity": SEVERITIES[i % 3],
+        "title": f"Prop{i % 40} fault {i}: sensor reads out of range",
+        "description": f"Seen during game {i}. " + "Reseated the harness and it came back. " * 4,
+        "resolution": "Replaced the connector" if i % 2 else None,
+        "resolved": bool(i % 2),
+    } for i in range(count // 2)]
+    todos = [{
+        "device_name": f"Prop{i % 40}",
+        "title": f"Check Prop{i % 40} wiring, item {i}",
+        "description": "Follow up on the last debug note.",
+        "priority": PRIORITIES[i % 4],
+    } for i in range(count - count // 2)]
+    return issues, todos
+
+
+def timed_import(issues: list, todos: list) -> tuple:
+    started = time.perf_counter()
+    debug_counts = db.import_debug_entries(issues)
+    todo_counts = db.import_todos(todos)
+    elapsed = time.perf_counter() - started
+    return elapsed, {k: debug_counts[k] + todo_counts[k] for k in debug_counts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the grimoire bulk import")
+    parser.add_argument("--items", type=int, default=10_000, help="issues + todos to import")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds allowed for the fresh import")
+    args = parser.parse_args()
+
+    config.DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+    db.init_db(config.DATABASE_PATH)
+    issues, todos = synthetic(args.items)
+
+    print(f"  {len(issues)} issues + {len(todos)} todos")
+    print(f"  {'run':<10} {'ms':>8} {'inserted':>9} {'updated':>8} {'unchanged':>10}")
+    runs = []
+    for label in ("fresh", "re-run", "1% edited"):
+        if label == "1% edited":
+            for item in issues[::100] + todos[::100]:
+                item["description"] += " Checked again."
+        elapsed, counts = timed_import(issues, todos)
+        runs.append(elapsed)
+        print(f"  {label:<10} {elapsed * 1000:>8.0f} {counts['inserted']:>9} "
+              f"{counts['updated']:>8} {counts['unchanged']:>10}")
+
+    over = runs[0] > args.budget
+    print()
+    print(f"{'❌' if over else '✅'} Fresh import of {args.items} items in {runs[0] * 1000:.0f}ms "
+          f"(budget {args.budget * 1000:.0f}ms)")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Write Queue Benchmark — WatchTower V2
+======================================
+Concurrent UI writers against a scratch database, with and without the
+group-committing writer thread. Each worker thread loops over the writes the
+routes make:
+
+    add_debug_entry -> resolve_debug_entry -> add_todo -> update_todo_status
+
+    queued    the shipped path: every call goes through the writer thread,
+              which commits whatever is waiting in one transaction
+    direct    each call runs on its own thread and commits on its own
+              (the undecorated function, as before the queue)
+
+Reports writes/s, latency, commits and fsync/fdatasync calls per second.
+fsyncs are counted by a small LD_PRELOAD shim compiled with cc on first run;
+without a C compiler that column shows n/a. With the shipped
+synchronous=NORMAL a WAL commit doesn't sync at all and fsyncs come from
+checkpoints; --synchronous full syncs the WAL on every commit, which is
+where grouping commits shows most.
+
+Usage:
+    python scripts/bench_write_queue.py
+    python scripts/bench_write_queue.py --threads 16 --seconds 10
+    python scripts/bench_write_queue.py --synchronous full
+"""
+
+import sys
+import os
+import argparse
+import ctypes
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from models import database as db
+
+SHIM_SOURCE = r"""
+#define _GNU_SOURCE
+#include <dlfcn.h>
+
+unsigned long watchtower_fsyncs = 0;
+
+int fsync(int fd) {
+    static int (*real)(int);
+    if (!real) real = dlsym(RTLD_NEXT, "fsync");
+    __atomic_add_fetch(&watchtower_fsyncs, 1, __ATOMIC_RELAXED);
+    return real(fd);
+}
+
+int fdatasync(int fd) {
+    static int (*real)(int);
+    if (!real) real = dlsym(RTLD_NEXT, "fdatasync");
+    __atomic_add_fetch(&watchtower_fsyncs, 1, __ATOMIC_RELAXED);
+    return real(fd);
+}
+"""
+SHIM_PATH = os.path.join(tempfile.gettempdir(), "watchtower_fsync_shim.so")
+SHIM_ENV = "WATCHTOWER_FSYNC_SHIM"
+
+
+def preload_shim():
+    """Re-exec under LD_PRELOAD with the fsync counter; returns the counter, or None."""
+    if os.environ.get(SHIM_ENV) == SHIM_PATH:
+        try:
+            return ctypes.c_ulong.in_dll(ctypes.CDLL(SHIM_PATH), "watchtower_fsyncs")
+        except (OSError, ValueError):
+            return None
+    if os.environ.get(SHIM_ENV) is None:
+        compiler = shutil.which("cc") or shutil.which("gcc")
+        if compiler and not os.path.exists(SHIM_PATH):
+            source = SHIM_PATH[:-3] + ".c"
+            with open(source, "w") as f:
+                f.write(SHIM_SOURCE)
+            subprocess.run([compiler, "-shared", "-fPIC", "-O2", "-o", SHIM_PATH, source, "-ldl"],
+                           check=False, capture_output=True)
+        if os.path.exists(SHIM_PATH):
+            env = dict(os.environ, LD_PRELOAD=SHIM_PATH, **{SHIM_ENV: SHIM_PATH})
+            os.execve(sys.executable, [sys.executable] + sys.argv, env)
+    return None
+
+
+def percentile(ordered: list, p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def run(mode: str, threads: int, seconds: float, fsyncs) -> dict:
+    if mode == "queued":
+        add_entry, resolve, add_todo, set_status = (
+            db.add_debug_entry, db.resolve_debug_entry, db.add_todo, db.update_todo_status)
+    else:
+        add_entry, resolve, add_todo, set_status = (
+            db.add_debug_entry.__wrapped__, db.resolve_debug_entry.__wrapped__,
+            db.add_todo.__wrapped__, db.update_todo_status.__wrapped__)
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def timed(call, *args):
+        started = time.perf_counter()
+        try:
+            return call(*args)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    def worker(n):
+        i = 0
+        while time.perf_counter() < deadline:
+            entry_id = timed(add_entry, f"Prop{n}", "warning", f"Bench issue {n}/{i}")
+            timed(resolve, entry_id, "reset it")
+            todo_id = timed(add_todo, f"Bench todo {n}/{i}")
+            timed(set_status, todo_id, "completed")
+            i += 1
+
+    batches = [0]
+    commit_batch = db._commit_batch
+
+    def counting_commit_batch(batch):
+        batches[0] += 1
+        return commit_batch(batch)
+
+    db._commit_batch = counting_commit_batch
+    fsyncs_before = fsyncs.value if fsyncs is not None else None
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    wall = time.perf_counter() - started
+    db._commit_batch = commit_batch
+
+    latencies.sort()
+    return {
+        "rate": len(latencies) / wall,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "commits_s": (batches[0] if mode == "queued" else len(latencies)) / wall,
+        "fsyncs_s": None if fsyncs is None else (fsyncs.value - fsyncs_before) / wall,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark grouped vs per-call write commits")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent writer threads")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each mode")
+    parser.add_argument("--synchronous", choices=("normal", "full"), default="normal")
+    args = parser.parse_args()
+
+    fsyncs = preload_shim()
+
+    if args.synchronous == "full":
+        connect = db._connect
+
+        def connect_full(path):
+            conn = connect(path)
+            conn.execute("PRAGMA synchronous = FULL")
+            return conn
+
+        db._connect = connect_full
+
+    print(f"  {args.threads} threads, {args.seconds:g}s per mode, synchronous={args.synchronous.upper()}")
+    print(f"  {'mode':<8} {'writes/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'commits/s':>10} {'fsyncs/s':>9}")
+    errors = 0
+    for mode in ("queued", "direct"):
+        config.DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+        db.close_connections()
+        db.init_db(config.DATABASE_PATH)
+        result = run(mode, args.threads, args.seconds, fsyncs)
+        errors += result["errors"]
+        fsync_rate = "n/a" if result["fsyncs_s"] is None else f"{result['fsyncs_s']:.0f}"
+        print(f"  {mode:<8} {result['rate']:>9.0f} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+              f"{result['max_ms']:>8.2f} {result['commits_s']:>10.0f} {fsync_rate:>9}")
+
+    print()
+    print(f"{'❌' if errors else '✅'} {errors} failed writes")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
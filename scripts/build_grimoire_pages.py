@@ -0,0 +1,53 @@
+"""
+Grimoire Page Build — WatchTower V2
+====================================
+Renders /library and every /library/device/<slug> page into static HTML
+with gzip copies and content-hash ETags (config.GRIMOIRE_BUILD_DIR), which
+WatchTower then serves without rendering. Run after the grimoire documents
+change; run_grimoire_update.bat does this after every regeneration.
+
+Usage:
+    python scripts/build_grimoire_pages.py            # build and swap in
+    python scripts/build_grimoire_pages.py --check    # exit 1 if the current build is stale or missing
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import static_pages
+from app import create_app
+
+
+def check() -> int:
+    manifest = static_pages._load_manifest()
+    if manifest is None:
+        print(f"❌ No build in {config.GRIMOIRE_BUILD_DIR}")
+        return 1
+    if not static_pages.is_current(manifest):
+        print(f"❌ Build from {manifest['built_at']} is stale; pages are being rendered live")
+        return 1
+    print(f"✅ Build from {manifest['built_at']} is current ({len(manifest['pages'])} pages)")
+    return 0
+
+
+def main():
+    if "--check" in sys.argv:
+        sys.exit(check())
+
+    started = time.perf_counter()
+    manifest = static_pages.build(create_app())
+    elapsed = time.perf_counter() - started
+
+    pages = manifest["pages"].values()
+    raw = sum(p["bytes"] for p in pages)
+    compressed = sum(p["gzip_bytes"] for p in pages)
+    print(f"✅ Built {len(manifest['pages'])} pages in {elapsed * 1000:.0f}ms → {config.GRIMOIRE_BUILD_DIR}")
+    print(f"   {raw // 1024} KB HTML, {compressed // 1024} KB gzipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Reliability Analytics Rebuild — WatchTower V2
+==============================================
+Recomputes the per-device reliability summaries (incidents, MTTR, game-hour
+uptime) from the raw debug_log and device_status_history tables, and
+reports every value the incrementally maintained summaries had drifted on.
+
+Usage:
+    python scripts/rebuild_analytics.py            # rebuild, list differences
+    python scripts/rebuild_analytics.py --check    # same, exit 1 if anything drifted
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from models import database as db
+
+SUMMARIES = {
+    "device_reliability": ("device_name",),
+    "device_incidents_monthly": ("device_name", "month"),
+}
+
+
+def snapshot() -> dict:
+    with db.get_db() as conn:
+        return {
+            table: {tuple(row[k] for k in keys): dict(row) for row in conn.execute(f"SELECT * FROM {table}")}
+            for table, keys in SUMMARIES.items()
+        }
+
+
+def same(a, b) -> bool:
+    if isinstance(a, float) or isinstance(b, float):
+        return a is not None and b is not None and abs(a - b) < 0.01
+    return a == b
+
+
+def differences(before: dict, after: dict) -> list:
+    found = []
+    for table in SUMMARIES:
+        old, new = before[table], after[table]
+        for key in sorted(old.keys() | new.keys(), key=str):
+            row_old, row_new = old.get(key, {}), new.get(key, {})
+            for column in sorted(row_old.keys() | row_new.keys()):
+                if not same(row_old.get(column), row_new.get(column)):
+                    found.append((table, key, column, row_old.get(column), row_new.get(column)))
+    return found
+
+
+def main():
+    check = "--check" in sys.argv
+
+    db.init_db(config.DATABASE_PATH)
+    before = snapshot()
+    started = time.perf_counter()
+    db.rebuild_reliability()
+    elapsed = time.perf_counter() - started
+    drift = differences(before, snapshot())
+
+    for table, key, column, old, new in drift:
+        print(f"  {table} {'/'.join(map(str, key))} {column}: {old} -> {new}")
+    print()
+    print(f"{'❌' if drift else '✅'} Rebuilt reliability analytics in {elapsed * 1000:.0f}ms, "
+          f"{len(drift)} drifted values")
+    sys.exit(1 if drift and check else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -56,4 +56,13 @@ if errorlevel 1 (
     echo %date% %time% - SUCCESS >> "%SCRIPT_DIR%grimoire_log.txt"
 )
 
+REM --- Prebuild WatchTower's library pages from the local grimoire ---
+echo Building WatchTower library pages...
+set "PYTHONPATH=%SCRIPT_DIR%..\watchtower-v2"
+%PYTHON_PATH% "%SCRIPT_DIR%build_grimoire_pages.py"
+if errorlevel 1 (
+    echo WARNING: Page build failed - WatchTower will render library pages live.
+    echo %date% %time% - PAGE BUILD FAILED >> "%SCRIPT_DIR%grimoire_log.txt"
+)
+
 exit /b 0
@@ -1,17 +1,19 @@
 """
 Grimoire Seeder
 ===============
-One-time script to import historical debug log entries and TODO items
+Imports historical debug log entries and TODO items
 from the Grimoire markdown files into the WatchTower SQLite database.
 
 Run from the project root:
     python scripts/seed_grimoire.py
 
-Safe to re-run — checks a seed flag before importing.
+Safe to re-run — each item is keyed and hashed, so only new or changed
+items are written. --force rewrites every item from the markdown.
 """
 
 import sys
 import os
+import time
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import config
@@ -19,60 +21,17 @@ from models import database as db
 from models.grimoire_loader import parse_todo_md, parse_debug_log_md
 
 
-def is_already_seeded() -> bool:
-    with db.get_db() as conn:
-        row = conn.execute(
-            "SELECT COUNT(*) as n FROM debug_log WHERE created_by = 'grimoire_import'"
-        ).fetchone()
-        return row["n"] > 0
-
-
-def seed_debug_log(issues: list[dict], dry_run: bool = False) -> int:
-    count = 0
+def preview(issues: list[dict], todos: list[dict]):
     for issue in issues:
-        if dry_run:
-            print(f"  [DEBUG] [{issue['severity'].upper()}] {issue['title'][:80]}"
-                  f"  {'✅ resolved' if issue['resolved'] else '🔴 open'}")
-            count += 1
-            continue
-
-        with db.get_db() as conn:
-            cursor = conn.execute(
-                """INSERT INTO debug_log
-                   (device_name, severity, title, description, resolution, resolved, created_by)
-                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    issue.get("device_name"),
-                    issue.get("severity", "info"),
-                    issue["title"],
-                    issue.get("description"),
-                    issue.get("resolution"),
-                    1 if issue.get("resolved") else 0,
-                    "grimoire_import",
-                )
-            )
-            count += 1
-
-    return count
-
-
-def seed_todos(todos: list[dict], dry_run: bool = False) -> int:
-    count = 0
+        print(f"  [DEBUG] [{issue['severity'].upper()}] {issue['title'][:80]}"
+              f"  {'✅ resolved' if issue['resolved'] else '🔴 open'}")
     for todo in todos:
-        if dry_run:
-            print(f"  [TODO] [{todo['priority'].upper()}] {todo['title'][:80]}")
-            count += 1
-            continue
+        print(f"  [TODO] [{todo['priority'].upper()}] {todo['title'][:80]}")
 
-        db.add_todo(
-            title=todo["title"],
-            device_name=todo.get("device_name"),
-            description=todo.get("description"),
-            priority=todo.get("priority", "normal"),
-        )
-        count += 1
 
-    return count
+def report(label: str, counts: dict):
+    print(f"  {label:<10} {counts['inserted']} new, {counts['updated']} updated, "
+          f"{counts['unchanged']} unchanged")
 
 
 def main():
@@ -87,11 +46,6 @@ def main():
 
     db.init_db(config.DATABASE_PATH)
 
-    if is_already_seeded() and not force:
-        print("⚠️  Database already seeded. Use --force to re-seed.")
-        print("   (This would create duplicate entries)")
-        return
-
     if dry_run:
         print("🔍 DRY RUN — no changes will be written\n")
 
@@ -104,24 +58,27 @@ def main():
     todos = parse_todo_md()
     print(f"  Found {len(todos)} TODO items\n")
 
-    # Seed debug log
-    print("Seeding debug log:")
-    debug_count = seed_debug_log(issues, dry_run=dry_run)
-    print(f"  {'Would import' if dry_run else 'Imported'} {debug_count} issues\n")
-
-    # Seed todos
-    print("Seeding TODO list:")
-    todo_count = seed_todos(todos, dry_run=dry_run)
-    print(f"  {'Would import' if dry_run else 'Imported'} {todo_count} tasks\n")
-
-    if not dry_run:
-        print("✅ Seeding complete!")
-        print(f"   Debug log: {debug_count} historical issues")
-        print(f"   Tasks:     {todo_count} items (open in Debug & Tasks tab)")
-    else:
+    if dry_run:
+        preview(issues, todos)
+        print()
         print("✅ Dry run complete. Run without --dry-run to write to DB.")
-    print()
+        print()
+        return
+
+    # One transaction per table; re-runs only touch new or changed items
+    started = time.perf_counter()
+    debug_counts = db.import_debug_entries(issues, force=force)
+    todo_counts = db.import_todos(todos, force=force)
+    elapsed = time.perf_counter() - started
 
+    print("Indexing grimoire sections for search...")
+    reindexed = db.reindex_grimoire(force=True)
+    print(f"  Indexed {len(reindexed)} documents\n")
+
+    print(f"✅ Seeding complete in {elapsed * 1000:.0f}ms")
+    report("Debug log:", debug_counts)
+    report("Tasks:", todo_counts)
+    print()
 
 if __name__ == "__main__":
     main()
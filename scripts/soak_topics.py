@@ -0,0 +1,100 @@
+"""
+Topic Churn Soak — WatchTower V2
+=================================
+Feeds a stream of never-repeating topic names through MQTTClient._on_message
+(the way a prop stuck publishing unique topics would) and checks that the
+per-topic state stays bounded:
+
+    - every BoundedCache stays at or below its maxsize
+    - process RSS, once the caches are full, grows by less than --rss-slack MB
+
+Usage:
+    python scripts/soak_topics.py                        # 1,000,000 topics, exits 1 on growth
+    python scripts/soak_topics.py --messages 3000000 --rss-slack 8
+"""
+
+import sys
+import os
+import argparse
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from models import database as db
+from mqtt import MQTTClient
+
+
+# One suffix per kind of per-topic state: dedup (last_payloads), delta
+# filtering (last_values), and a plain status topic; every topic also opens a
+# device feed for the made-up device name
+SUFFIXES = ("Loaded", "angle", "status")
+
+
+class Message:
+    __slots__ = ("topic", "payload")
+
+    def __init__(self, topic: str, payload: bytes):
+        self.topic = topic
+        self.payload = payload
+
+
+def rss_mb():
+    """Current resident set size in MB (Linux only; None elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak MQTTClient with distinct topics")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--rss-slack", type=float, default=10.0, help="allowed RSS growth (MB) after warm-up")
+    args = parser.parse_args()
+
+    config.DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "soak.db")
+    db.init_db(config.DATABASE_PATH)
+    client = MQTTClient()
+    caches = (client.last_values, client.last_payloads, client.device_feeds)
+
+    # Caches are full once every one has seen maxsize distinct keys; measure from
+    # there (plus a margin for allocator warm-up) so only real growth counts
+    warm_up = min(args.messages // 2, 2 * max(cache.maxsize for cache in caches) + 100_000)
+    report_every = max(1, args.messages // 10)
+    baseline = None
+    started = time.perf_counter()
+    failures = []
+
+    for i in range(args.messages):
+        suffix = SUFFIXES[i % len(SUFFIXES)]
+        client._on_message(None, None, Message(f"MermaidsTale/SoakProp{i}/{suffix}", str(i % 97).encode()))
+        if i + 1 == warm_up:
+            baseline = rss_mb()
+        if (i + 1) % report_every == 0:
+            rss = rss_mb()
+            sizes = ", ".join(f"{cache.name} {len(cache)}" for cache in caches)
+            print(f"  {i + 1:>10,} topics  rss {rss if rss is None else round(rss, 1)} MB  {sizes}")
+
+    for cache in caches:
+        if len(cache) > cache.maxsize:
+            failures.append(f"{cache.name} holds {len(cache)} entries (maxsize {cache.maxsize})")
+    final = rss_mb()
+    if baseline is not None and final is not None and final - baseline > args.rss_slack:
+        failures.append(f"RSS grew {final - baseline:.1f} MB after warm-up (allowed {args.rss_slack} MB)")
+
+    elapsed = time.perf_counter() - started
+    print()
+    for failure in failures:
+        print(f"  !! {failure}")
+    if baseline is None or final is None:
+        print("  (RSS not measured on this platform)")
+    print(f"{'❌' if failures else '✅'} {args.messages:,} distinct topics in {elapsed:.0f}s, "
+          f"cache evictions: {', '.join(f'{c.name} {c.evictions}' for c in caches)}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
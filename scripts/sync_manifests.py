@@ -43,6 +43,7 @@ import argparse
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import config
+import device_names
 from models import database as db
 
 # =============================================================================
@@ -127,6 +128,8 @@ def parse_manifest(path: str) -> dict | None:
         print(f"  ⚠️  No DEVICE_NAME in {path} — skipping")
         return None
 
+    # MANIFEST.h names drift ("Jungle Door", "CaptainsCuffs"); store the registry name
+    data["device_name"] = device_names.canonical(data["device_name"])
     data["raw_manifest"] = raw[:4000]  # store truncated raw text
     return data
 
@@ -140,7 +143,9 @@ def sync_manifest(manifest_data: dict, dry_run: bool = False) -> bool:
                 print(f"    {k:<28} = {str(v)[:60]}")
         return True
     try:
-        db.upsert_manifest(name, manifest_data)
+        result = db.upsert_manifest(name, manifest_data)
+        if result == "unchanged":
+            print("     = No changes since last sync")
         return True
     except Exception as e:
         print(f"  ❌ DB error for {name}: {e}")
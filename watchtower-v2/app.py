@@ -12,9 +12,13 @@ import time
 import threading
 import logging
 
-from flask import Flask
+from flask import Flask, Response, g, request
 
 import config
+import games
+import metrics
+from models import database as db
+from models import grimoire_loader
 from models.database import init_db
 from mqtt import MQTTClient
 from routes.api import api, set_mqtt_client
@@ -37,9 +41,30 @@ def create_app():
     app.register_blueprint(api)
     app.register_blueprint(pages)
 
-    # Disable caching for development
+    # Per-route request latency for /metrics
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_latency(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            metrics.HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, route, request.method, str(response.status_code))
+        return response
+
+    @app.route("/metrics")
+    def prometheus_metrics():
+        """WatchTower internals in Prometheus text format."""
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    # Disable caching for development (prebuilt grimoire pages set their own headers)
     @app.after_request
     def add_no_cache(response):
+        if response.headers.get("X-WatchTower-Page") == "prebuilt":
+            return response
         response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
         response.headers["Pragma"] = "no-cache"
         response.headers["Expires"] = "0"
@@ -55,6 +80,57 @@ def run_timeout_checker(mqtt_client):
         time.sleep(0.5)
 
 
+def run_mqtt_logger(mqtt_client):
+    """Background thread that batches messages into mqtt_log and rotates partitions."""
+    next_rotation = 0.0
+    while True:
+        try:
+            rows = mqtt_client.drain_log_buffer()
+            if rows:
+                db.log_mqtt_messages(rows)
+            if time.monotonic() >= next_rotation:
+                rotated = db.rotate_mqtt_log()
+                if rotated["archived"] or rotated["dropped"] or rotated["deleted_archives"]:
+                    logger.info(f"mqtt_log rotation: {rotated}")
+                # Hot WAL grows to HOT_WAL_AUTOCHECKPOINT pages between checkpoints; hand the space back
+                db.checkpoint_hot("TRUNCATE")
+                next_rotation = time.monotonic() + config.MQTT_LOG_ROTATE_INTERVAL
+        except Exception as e:
+            logger.error(f"mqtt_log writer error: {e}")
+        time.sleep(config.MQTT_LOG_FLUSH_INTERVAL)
+
+
+def run_event_writer(mqtt_client):
+    """Background thread that records device status changes and game milestones."""
+    while True:
+        try:
+            changes = mqtt_client.drain_status_changes()
+            if changes:
+                db.record_status_changes(changes)
+            events = mqtt_client.drain_game_events()
+            if events:
+                games.record(events)
+        except Exception as e:
+            logger.error(f"Event writer error: {e}")
+        time.sleep(config.MQTT_LOG_FLUSH_INTERVAL)
+
+
+def run_grimoire_indexer():
+    """Background thread that re-indexes library docs for search after a sync."""
+    mtimes = {}  # first pass catches anything synced since the startup reindex
+    while True:
+        time.sleep(config.GRIMOIRE_REINDEX_INTERVAL)
+        try:
+            current = grimoire_loader.get_search_doc_mtimes()
+            if current != mtimes:
+                reindexed = db.reindex_grimoire()
+                if reindexed:
+                    logger.info(f"Search index updated for {', '.join(reindexed)}")
+                mtimes = current
+        except Exception as e:
+            logger.error(f"Grimoire indexer error: {e}")
+
+
 def main():
     print()
     print("=" * 60)
@@ -66,12 +142,15 @@ def main():
     # Initialize database
     init_db(config.DATABASE_PATH)
     logger.info(f"Database initialized at {config.DATABASE_PATH}")
+    reindexed = db.reindex_grimoire()
+    if reindexed:
+        logger.info(f"Search index updated for {', '.join(reindexed)}")
 
     # Initialize MQTT
     mqtt_client = MQTTClient()
     if not mqtt_client.connect():
         print(f"⚠️  Could not connect to MQTT broker at {config.MQTT_BROKER}:{config.MQTT_PORT}")
-        print(f"   Dashboard will work but device status won't update.")
+        print(f"   Retrying in the background - commands sent meanwhile are queued.")
     else:
         print(f"✓  Connected to MQTT broker at {config.MQTT_BROKER}:{config.MQTT_PORT}")
 
@@ -82,6 +161,12 @@ def main():
     timeout_thread = threading.Thread(target=run_timeout_checker, args=(mqtt_client,), daemon=True)
     timeout_thread.start()
 
+    # Persist the message log
+    if config.MQTT_LOG_ENABLED:
+        threading.Thread(target=run_mqtt_logger, args=(mqtt_client,), daemon=True).start()
+    threading.Thread(target=run_event_writer, args=(mqtt_client,), daemon=True).start()
+    threading.Thread(target=run_grimoire_indexer, daemon=True).start()
+
     # Create Flask app
     app = create_app()
 
@@ -0,0 +1,257 @@
+"""
+WatchTower V2 Pre-Game Checklist
+=================================
+Automates the pre-game checklist from system-checker-integration.md as one
+bounded-time run:
+
+    broker        Mosquitto reachable (TCP) and WatchTower connected
+    device_sweep  PING every WatchTower-compliant ESP32, wait for PONGs
+    bac_heartbeat Every BAC has sent a /get/ heartbeat recently
+    firmware      Devices still flagged needs_protocol (firmware update pending)
+    manifests     Synced MANIFEST.h broker IP/port match config
+    debug_issues  No open critical debug-log entries
+
+The database checks run alongside the broker check; the device sweep and
+the BAC heartbeat watch start together once the broker answers. Each run
+and its per-step timings are stored in SQLite, and the latest result is
+kept in memory so /api/checklist/latest loads instantly on the tablets.
+"""
+
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+import config
+from models import database as db
+
+logger = logging.getLogger(__name__)
+
+PASS, WARN, FAIL, SKIPPED = "pass", "warn", "fail", "skipped"
+
+_lock = threading.Lock()
+_NOT_LOADED = object()
+_latest = _NOT_LOADED      # latest run, or None once the database has been found to hold none
+_running = False
+
+
+# =============================================================================
+# STEPS
+# =============================================================================
+
+def check_broker(mqtt_client) -> tuple:
+    try:
+        with socket.create_connection((config.MQTT_BROKER, config.MQTT_PORT),
+                                      timeout=config.CHECKLIST_BROKER_TIMEOUT):
+            pass
+    except OSError as e:
+        return FAIL, f"Broker {config.MQTT_BROKER}:{config.MQTT_PORT} unreachable: {e}", {}
+    if not mqtt_client or not mqtt_client.connected:
+        return FAIL, "Broker is up but WatchTower is not connected", {}
+    return PASS, f"Broker {config.MQTT_BROKER}:{config.MQTT_PORT} reachable", {}
+
+
+def check_device_sweep(mqtt_client) -> tuple:
+    names = [name for name, d in mqtt_client.devices.items()
+             if d.device_type.value == config.DEVICE_TYPE_ESP32 and not d.needs_protocol]
+    for name in names:
+        mqtt_client.ping_device(name)
+
+    stop_at = time.monotonic() + config.ESP32_PING_TIMEOUT + 0.5
+    while time.monotonic() < stop_at:
+        mqtt_client.check_timeouts()
+        statuses = mqtt_client.get_status_summary()["devices"]
+        if not any(statuses[n]["status"] == "testing" for n in names):
+            break
+        time.sleep(0.1)
+
+    statuses = mqtt_client.get_status_summary()["devices"]
+    offline = sorted(n for n in names if statuses[n]["status"] != "online")
+    details = {"pinged": len(names), "offline": offline,
+               "response_ms": {n: statuses[n]["response_ms"] for n in names if statuses[n]["response_ms"]}}
+    if offline:
+        return FAIL, f"{len(offline)} of {len(names)} devices did not respond", details
+    return PASS, f"All {len(names)} devices responded", details
+
+
+def check_bac_heartbeats(mqtt_client) -> tuple:
+    bacs = [name for name, d in mqtt_client.devices.items()
+            if d.device_type.value == config.DEVICE_TYPE_BAC]
+
+    def stale() -> list:
+        now = datetime.now()
+        statuses = mqtt_client.get_status_summary()["devices"]
+        return sorted(
+            n for n in bacs
+            if not statuses[n]["last_test"] or
+            (now - datetime.fromisoformat(statuses[n]["last_test"])).total_seconds() > config.CHECKLIST_BAC_HEARTBEAT_MAX_AGE
+        )
+
+    # Give silent BACs one heartbeat cycle to show up before failing them
+    missing = stale()
+    stop_at = time.monotonic() + config.BAC_PING_TIMEOUT
+    while missing and time.monotonic() < stop_at:
+        time.sleep(0.5)
+        missing = stale()
+
+    details = {"bacs": len(bacs), "missing": missing}
+    if missing:
+        return FAIL, f"No recent heartbeat from {', '.join(missing)}", details
+    return PASS, f"All {len(bacs)} BACs heartbeating", details
+
+
+def check_firmware(mqtt_client) -> tuple:
+    pending = sorted(name for name, d in mqtt_client.devices.items() if d.needs_protocol)
+    if pending:
+        return WARN, f"{len(pending)} devices need a firmware update for PING/PONG", {"devices": pending}
+    return PASS, "All devices speak the WatchTower protocol", {"devices": []}
+
+
+def check_manifests(mqtt_client) -> tuple:
+    manifests = db.get_all_manifests()
+    mismatched = []
+    for m in manifests:
+        ip_ok = not m.get("broker_ip") or m["broker_ip"] == config.MQTT_BROKER
+        port_ok = not m.get("broker_port") or int(m["broker_port"]) == config.MQTT_PORT
+        if not (ip_ok and port_ok):
+            mismatched.append({"device": m["device_name"], "broker_ip": m.get("broker_ip"),
+                               "broker_port": m.get("broker_port")})
+    details = {"manifests": len(manifests), "mismatched": mismatched}
+    if mismatched:
+        return FAIL, f"{len(mismatched)} manifests point at the wrong broker", details
+    if not manifests:
+        return WARN, "No manifests synced yet", details
+    return PASS, f"{len(manifests)} manifests match {config.MQTT_BROKER}:{config.MQTT_PORT}", details
+
+
+def check_debug_issues(mqtt_client) -> tuple:
+    open_entries = db.get_debug_entries(resolved=False, limit=1000)
+    critical = [{"id": e["id"], "device": e["device_name"], "title": e["title"]}
+                for e in open_entries if e["severity"] == "critical"]
+    details = {"open": len(open_entries), "critical": critical}
+    if critical:
+        return WARN, f"{len(critical)} open critical issues", details
+    return PASS, f"No open critical issues ({len(open_entries)} open total)", details
+
+
+# Steps that need a live broker; skipped when the broker check fails
+BROKER_STEPS = [
+    ("device_sweep", check_device_sweep),
+    ("bac_heartbeat", check_bac_heartbeats),
+]
+INDEPENDENT_STEPS = [
+    ("firmware", check_firmware),
+    ("manifests", check_manifests),
+    ("debug_issues", check_debug_issues),
+]
+STEP_ORDER = ["broker"] + [name for name, _ in BROKER_STEPS + INDEPENDENT_STEPS]
+
+
+# =============================================================================
+# RUNNER
+# =============================================================================
+
+def _timed(name: str, step, mqtt_client) -> dict:
+    started = time.perf_counter()
+    try:
+        status, summary, details = step(mqtt_client)
+    except Exception as e:
+        logger.exception(f"Checklist step {name} crashed")
+        status, summary, details = FAIL, f"Step error: {e}", {}
+    return {
+        "step": name,
+        "status": status,
+        "summary": summary,
+        "details": details,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def run_checklist(mqtt_client) -> dict:
+    """Run every step, store the run, and return it."""
+    global _latest
+    started_at = datetime.now()
+    started = time.perf_counter()
+    deadline = time.monotonic() + config.CHECKLIST_DEADLINE
+    results = {}
+
+    # Not a `with` block: its exit joins every worker, so one hung step would
+    # hold the run past the deadline
+    pool = ThreadPoolExecutor(max_workers=len(STEP_ORDER), thread_name_prefix="checklist")
+    submitted = {}
+
+    def submit(steps):
+        for name, step in steps:
+            submitted[name] = time.perf_counter()
+            futures[name] = pool.submit(_timed, name, step, mqtt_client)
+
+    futures = {}
+    try:
+        submit(INDEPENDENT_STEPS)
+        results["broker"] = _timed("broker", check_broker, mqtt_client)
+        if results["broker"]["status"] == PASS:
+            submit(BROKER_STEPS)
+        else:
+            for name, _ in BROKER_STEPS:
+                results[name] = {"step": name, "status": SKIPPED, "summary": "Broker unavailable",
+                                 "details": {}, "duration_ms": 0.0}
+
+        wait(futures.values(), timeout=max(0.0, deadline - time.monotonic()))
+    finally:
+        # A step still running is abandoned; its thread finishes in the background
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    cutoff = time.perf_counter()
+    for name, future in futures.items():
+        if future.done() and not future.cancelled():
+            results[name] = future.result()
+        else:
+            results[name] = {"step": name, "status": FAIL, "summary": "Timed out",
+                             "details": {}, "duration_ms": round((cutoff - submitted[name]) * 1000, 1)}
+
+    steps = [results[name] for name in STEP_ORDER]
+    counts = mqtt_client.get_status_summary()["counts"] if mqtt_client else {}
+    run = {
+        "started_at": started_at.isoformat(),
+        "finished_at": datetime.now().isoformat(),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "passed": all(s["status"] in (PASS, WARN) for s in steps),
+        "device_counts": counts,
+        "steps": steps,
+    }
+    run["id"] = db.save_checklist_run(run)
+    with _lock:
+        _latest = run
+    logger.info(f"Checklist run {run['id']}: {'PASS' if run['passed'] else 'FAIL'} in {run['duration_ms']:.0f}ms")
+    return run
+
+
+def start_checklist(mqtt_client) -> bool:
+    """Run the checklist in the background. Returns False if one is already running."""
+    global _running
+    with _lock:
+        if _running:
+            return False
+        _running = True
+
+    def worker():
+        global _running
+        try:
+            run_checklist(mqtt_client)
+        finally:
+            with _lock:
+                _running = False
+
+    threading.Thread(target=worker, name="checklist", daemon=True).start()
+    return True
+
+
+def get_latest() -> dict:
+    """Latest run from the in-memory cache (loaded from SQLite on first use)."""
+    global _latest
+    with _lock:
+        if _latest is _NOT_LOADED:
+            _latest = db.get_latest_checklist_run()
+        return {"running": _running, "run": _latest}
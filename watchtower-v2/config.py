@@ -26,6 +26,44 @@ SECRET_KEY = os.urandom(24).hex()
 # =============================================================================
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), "watchtower.db")
 
+# High-rate time series (mqtt_log partitions, game events, device status
+# history) live in a second file with its own write lock and WAL, attached
+# to the main database as `hot`. None = "<main>_hot.db" next to DATABASE_PATH.
+HOT_DATABASE_PATH = None
+
+# Connection tuning (models/database.py). Connections are reused across
+# request threads; WAL lets API reads run while the MQTT thread writes.
+SQLITE_BUSY_TIMEOUT_MS = 5000
+SQLITE_CACHE_SIZE_KB = 16384         # page cache per connection
+SQLITE_MMAP_SIZE = 64 * 1024 * 1024
+SQLITE_CACHED_STATEMENTS = 256       # prepared statements kept per connection
+SQLITE_POOL_SIZE = 16                # idle connections kept open
+SQLITE_WAL_AUTOCHECKPOINT = 1000     # pages; main DB (UI edits), SQLite's default
+HOT_WAL_AUTOCHECKPOINT = 10000       # pages; fewer, larger checkpoints for bulk ingest
+
+# Writes to the main database from request threads go through one writer
+# thread, which commits everything queued at that moment as one transaction.
+DB_WRITE_BATCH_MAX = 256             # writes per group commit
+DB_WRITE_TIMEOUT = 30                # seconds a caller waits for its write
+
+# MQTT message log: one SQLite table per day. Days older than MQTT_LOG_HOT_DAYS
+# are moved to gzip NDJSON archives (MQTT_ARCHIVE_DIR, default: next to the DB)
+# and archives are deleted after MQTT_LOG_RETENTION_DAYS.
+MQTT_LOG_ENABLED = True
+MQTT_LOG_HOT_DAYS = 2
+MQTT_LOG_RETENTION_DAYS = 30
+MQTT_ARCHIVE_DIR = None
+MQTT_LOG_BUFFER = 20000              # messages held between flushes
+MQTT_LOG_FLUSH_INTERVAL = 1.0        # seconds
+MQTT_LOG_ROTATE_INTERVAL = 3600      # seconds
+MQTT_REPLAY_MAX_GAP = 5.0            # longest pause (seconds) in /api/mqtt-log/replay
+
+# Reliability analytics: uptime is the share of game hours a prop was online.
+# Game hours are a daily local-time window [start, end); None counts every hour.
+GAME_HOURS = (10, 24)
+STATUS_LOG_BUFFER = 5000             # device status changes held between flushes
+GAME_EVENT_BUFFER = 1000             # game milestones held between flushes (a game has ~40)
+
 # =============================================================================
 # CLICKUP
 # =============================================================================
@@ -34,12 +72,47 @@ CLICKUP_WORKSPACE_ID = "9011667818"
 CLICKUP_LIST_ID = "901113164349"  # WatchTower Issues list
 CLICKUP_API_URL = "https://api.clickup.com/api/v2"
 
+# Reconnect backoff: delay doubles from MIN up to MAX, with jitter
+MQTT_RECONNECT_MIN = 1.0   # seconds
+MQTT_RECONNECT_MAX = 30.0  # seconds
+
+# Commands sent while the broker is down are queued and replayed on reconnect
+OUTAGE_QUEUE_SIZE = 100     # oldest queued commands are dropped beyond this
+OUTAGE_QUEUE_MAX_AGE = 60.0 # seconds - older queued commands are not replayed
+REPROBE_STAGGER = 0.05      # seconds between pings in the post-reconnect sweep
+OUTAGE_HISTORY = 20         # recent outages kept for /api/connection
+
 # =============================================================================
 # DEVICE TIMEOUTS
 # =============================================================================
 ESP32_PING_TIMEOUT = 3.0   # seconds
 BAC_PING_TIMEOUT = 15.0    # seconds (waits for heartbeat cycle)
 HEARTBEAT_STANDARD = 300000  # 5 minutes in ms
+COMMAND_ACK_TIMEOUT = 5.0  # seconds to wait for an ESP32 /status ack (BACs use BAC_PING_TIMEOUT)
+COMMAND_HISTORY = 500      # tracked commands kept for /api/commands
+
+# Replies on an ESP32's /status topic that acknowledge a command (mqtt-protocol.md).
+# None accepts any reply but a heartbeat; unlisted commands expect OK or their own name.
+COMMAND_ACK_PAYLOADS = {
+    "PING": ("PONG",),
+    "STATUS": None,
+    "RESET": ("OK",),
+    "PUZZLE_RESET": ("OK", "PUZZLE_RESET"),
+}
+
+# Bulk commands (/api/command/bulk)
+BULK_COMMAND_CONCURRENCY = 8    # max commands awaiting an ack at once
+BULK_COMMAND_DEADLINE = 10.0    # seconds for the whole fan-out, all stages
+BULK_COMMAND_MAX_CONCURRENCY = 32  # upper bound a request may ask for
+BULK_COMMAND_MAX_DEADLINE = 60.0   # upper bound a request may ask for (seconds)
+BULK_LAST_KEYWORDS = ["door"]   # ordered mode: devices matching these go in the final stage
+
+# =============================================================================
+# PRE-GAME CHECKLIST
+# =============================================================================
+CHECKLIST_DEADLINE = 25.0               # seconds - hard cap on a whole run
+CHECKLIST_BROKER_TIMEOUT = 2.0          # seconds - TCP connect to Mosquitto
+CHECKLIST_BAC_HEARTBEAT_MAX_AGE = 60.0  # seconds - older BAC heartbeats count as missing
 
 # =============================================================================
 # MQTT MESSAGE FILTERING
@@ -49,6 +122,32 @@ DELTA_TOPICS = ["/Hor", "/Ver", "/angle", "/distance"]
 HIDDEN_TOPICS = ["/heartbeat", "/get/heartbeat"]
 DEDUP_TOPICS = ["/Loaded", "/Fired", "/triggered"]
 MAX_MESSAGES = 200
+DEVICE_FEED_MESSAGES = 100  # per-device sub-buffer behind /api/messages?device=
+ROOM_FEED_MESSAGES = 200    # per-room sub-buffer behind /api/messages?room=
+
+# Per-topic filter state (dedup/delta baselines) and per-device feed buffers are
+# LRU-bounded so a flood of unique topics can't grow memory without limit
+FILTER_STATE_MAX_TOPICS = 5000
+FILTER_STATE_TTL = 3600.0    # seconds; an older baseline is treated as unseen
+DEVICE_FEED_MAX_DEVICES = 500
+
+# Rendered grimoire documents (models/grimoire_loader.py), re-rendered when
+# a file's mtime or size changes
+GRIMOIRE_RENDER_CACHE_SIZE = 32
+GRIMOIRE_SECTION_CACHE_SIZE = 256    # device-page sections (ops manual + wiring)
+
+# Prebuilt /library pages (static_pages.py, scripts/build_grimoire_pages.py)
+GRIMOIRE_BUILD_DIR = os.path.join(os.path.dirname(__file__), "build", "grimoire")
+GRIMOIRE_PAGE_MAX_AGE = 300          # seconds browsers may reuse a page before revalidating
+GRIMOIRE_REINDEX_INTERVAL = 30.0     # seconds between checks for re-synced library docs
+
+# Traffic statistics (/api/metrics/topics) - max distinct topics/devices tracked
+TRAFFIC_TOP_K = 200
+
+# Message-path profiler (/api/profiler) - off until enabled at runtime
+PROFILER_SAMPLE_EVERY = 10   # profile 1 in N messages
+PROFILER_WINDOW = 2000       # samples kept per stage
+PROFILER_SLOWEST = 10        # slowest recent messages shown in the report
 
 # =============================================================================
 # DEVICE REGISTRY
@@ -138,6 +237,12 @@ GRIMOIRE_SLUG_MAP = {
     "WaterFountain":     "water-fountain",
 }
 
+# Extra spellings (MANIFEST.h DEVICE_NAME, legacy log entries) -> registry name.
+# Registry names, topic segments and unshared slugs above are resolved
+# automatically by device_names.py, case/space/punctuation-insensitively.
+# e.g. "MermaidMirror": "MirrorSensor"
+DEVICE_ALIASES = {}
+
 # Gravity Games VR Topics (game flow triggers, NOT device management)
 GRAVITY_GAMES_TOPICS = [
     {"topic": "MermaidsTale/GameRestart", "event": "Game Restart", "payload": "triggered", "occurrence": "Continuous"},
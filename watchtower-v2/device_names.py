@@ -0,0 +1,84 @@
+"""
+WatchTower V2 Device Names
+===========================
+One canonical ID per device, shared by the MQTT feed, the debug log, the
+todo list and the manifest table.
+
+The same prop shows up under several spellings: the registry name
+(`Captains-Cuffs`), its topic segment (`CaptainsCuffs`), a MANIFEST.h
+DEVICE_NAME (`Captains Cuffs`) and a grimoire slug (`captains-cuffs`).
+The alias table below is built once from config; canonical() maps any of
+those forms to the registry name with two dict lookups.
+
+Names that match nothing are returned unchanged (stripped), so unknown
+topics still group by their own segment.
+"""
+
+import hashlib
+import re
+from typing import Dict, Optional
+
+import config
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(name: str) -> str:
+    """Case-, space- and punctuation-insensitive key: `Captains-Cuffs` -> `captainscuffs`."""
+    return _NON_ALNUM.sub("", name.lower())
+
+
+def _build_aliases() -> tuple:
+    exact: Dict[str, str] = {}
+    normalized: Dict[str, str] = {}
+
+    def add(alias: str, canonical: str):
+        exact.setdefault(alias, canonical)
+        normalized.setdefault(normalize(alias), canonical)
+
+    # Registry names and topic segments win over everything else
+    for bac in config.BAC_CONTROLLERS:
+        add(bac["name"], bac["name"])
+    for esp in config.ESP32_DEVICES:
+        add(esp["name"], esp["name"])
+        add(esp.get("topic", esp["name"]), esp["name"])
+
+    for alias, canonical in config.DEVICE_ALIASES.items():
+        add(alias, canonical)
+
+    # A grimoire slug only identifies a device if no other device shares it
+    slug_owners: Dict[str, list] = {}
+    for name, slug in config.GRIMOIRE_SLUG_MAP.items():
+        slug_owners.setdefault(slug, []).append(name)
+    for slug, owners in slug_owners.items():
+        if len(owners) == 1:
+            add(slug, owners[0])
+
+    return exact, normalized
+
+
+_EXACT, _NORMALIZED = _build_aliases()
+_VERSION = hashlib.sha256(repr((sorted(_EXACT.items()), sorted(_NORMALIZED.items()))).encode()).hexdigest()[:16]
+
+
+def alias_version() -> str:
+    """Hash of the alias table; changes whenever config adds or remaps a spelling."""
+    return _VERSION
+
+
+def resolve(name: Optional[str]) -> Optional[str]:
+    """Canonical device ID for `name`, or None if it isn't a known device."""
+    if not name:
+        return None
+    canonical = _EXACT.get(name)
+    if canonical is None:
+        canonical = _NORMALIZED.get(normalize(name))
+    return canonical
+
+
+def canonical(name: Optional[str]) -> Optional[str]:
+    """Canonical device ID for `name`; unknown names pass through stripped."""
+    if not name:
+        return name
+    return resolve(name) or name.strip()
+
@@ -0,0 +1,147 @@
+"""
+WatchTower V2 Game Analytics
+=============================
+Per-session puzzle timelines and solve-time distributions from the Gravity
+Games milestone topics (GRAVITY_GAMES_TOPICS).
+
+The MQTT client queues every milestone message (occurrence "Once" or
+"Multiple", plus GameRestart); app.py drains them into game_events, where
+GameStart / GameSuccess / GameFail mark the session boundaries. Continuous
+and repeating topics (cannon angles, motion sensors) are not recorded.
+
+Puzzle statistics come from a single query over every finished session
+(first occurrence of each event, its offset from game start and the split
+since the previous milestone) and are cached until another session finishes.
+"""
+
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+
+import config
+from models import database as db
+
+START_TOPIC = "MermaidsTale/GameStart"
+RESTART_TOPIC = "MermaidsTale/GameRestart"
+BOUNDARIES = {
+    START_TOPIC: "start",
+    RESTART_TOPIC: "restart",
+    "MermaidsTale/GameSuccess": "success",
+    "MermaidsTale/GameFail": "fail",
+}
+
+# topic -> event name for every topic worth keeping
+RECORDED_TOPICS = {
+    t["topic"]: t["event"] for t in config.GRAVITY_GAMES_TOPICS
+    if t["occurrence"] in ("Once", "Multiple") or t["topic"] in BOUNDARIES
+}
+# Session boundaries are recorded with the milestones but aren't puzzles
+_SESSION_EVENTS = tuple(RECORDED_TOPICS[t] for t in BOUNDARIES if t in RECORDED_TOPICS)
+
+_lock = threading.Lock()
+_stats_cache: Optional[tuple] = None    # (finished session count, stats)
+
+
+def record(events: list) -> int:
+    """Store (timestamp, topic, payload) milestones. Returns sessions finished."""
+    finished = db.record_game_events([
+        (at, topic, RECORDED_TOPICS.get(topic, topic), payload, BOUNDARIES.get(topic))
+        for at, topic, payload in events
+    ])
+    if finished:
+        invalidate()
+    return finished
+
+
+def invalidate():
+    global _stats_cache
+    with _lock:
+        _stats_cache = None
+
+
+def percentile(ordered: list, p: float) -> Optional[float]:
+    """Linear-interpolated percentile (0-100) of an already sorted list."""
+    if not ordered:
+        return None
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _distribution(values: list) -> dict:
+    values.sort()
+    return {
+        "count": len(values),
+        "median_s": round(percentile(values, 50), 1) if values else None,
+        "p90_s": round(percentile(values, 90), 1) if values else None,
+        "min_s": round(values[0], 1) if values else None,
+        "max_s": round(values[-1], 1) if values else None,
+    }
+
+
+def _compute_stats() -> dict:
+    from_start = defaultdict(list)
+    splits = defaultdict(list)
+    for event_name, offset, split in db.get_puzzle_splits(exclude_events=_SESSION_EVENTS):
+        from_start[event_name].append(offset)
+        splits[event_name].append(split)
+
+    durations = defaultdict(list)
+    for outcome, seconds in db.get_session_durations():
+        durations[outcome].append(seconds)
+    finished = sum(len(v) for v in durations.values())
+    escapes = durations.get("success", [])
+
+    puzzles = [
+        {"event": name, "reached": _distribution(from_start[name]), "split": _distribution(splits[name])}
+        for name in from_start
+    ]
+    # Slowest props first: the ones that hold a typical game up the longest
+    puzzles.sort(key=lambda p: p["split"]["median_s"] or 0, reverse=True)
+    return {
+        "sessions": finished,
+        "success_rate": round(len(escapes) / finished, 3) if finished else None,
+        "escape_time": _distribution(escapes),
+        "outcomes": {outcome: len(v) for outcome, v in durations.items()},
+        "puzzles": puzzles,
+    }
+
+
+def get_stats() -> dict:
+    """Solve-time distributions over all finished sessions, cached until another session finishes."""
+    global _stats_cache
+    finished = db.get_finished_game_count()
+    with _lock:
+        if _stats_cache is not None and _stats_cache[0] == finished:
+            return _stats_cache[1]
+    stats = _compute_stats()
+    with _lock:
+        _stats_cache = (finished, stats)
+    return stats
+
+
+def get_timeline(session_id: str) -> Optional[dict]:
+    """A session's milestones with their offset from game start and the split since the previous one."""
+    session = db.get_game_session(session_id)
+    if session is None:
+        return None
+
+    started = datetime.fromisoformat(session["started_at"])
+    previous = started
+    seen = set()
+    timeline = []
+    for event in session.pop("events"):
+        at = datetime.fromisoformat(event["timestamp"])
+        entry = dict(event, offset_s=round((at - started).total_seconds(), 1))
+        if event["event_name"] not in seen and event["event_name"] not in _SESSION_EVENTS:
+            entry["split_s"] = round((at - previous).total_seconds(), 1)
+            previous = at
+            seen.add(event["event_name"])
+        timeline.append(entry)
+
+    if session["ended_at"]:
+        session["duration_s"] = round((datetime.fromisoformat(session["ended_at"]) - started).total_seconds(), 1)
+    session["timeline"] = timeline
+    return session
@@ -0,0 +1,229 @@
+"""
+WatchTower V2 Internal Metrics
+===============================
+A small Prometheus-style registry (counters, gauges, histograms with labels)
+rendered in the text exposition format on /metrics.
+
+Everything is plain dicts behind a per-metric lock, so an increment on the
+MQTT hot path costs a dict lookup and an add. No external dependencies.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Tuple
+
+# Latency buckets in seconds: 100 µs up to 10 s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.lock = threading.Lock()
+        self.values: Dict[tuple, object] = {}
+        REGISTRY.append(self)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = list(self.values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount: float = 1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, *label_values):
+        with self.lock:
+            self.values[label_values] = value
+
+    def inc(self, *label_values, amount: float = 1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Evaluate `function` at scrape time instead of storing a value."""
+        self.function = function
+
+    def render(self) -> list:
+        if self.function is not None:
+            try:
+                self.set(float(self.function()))
+            except Exception:
+                pass
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(label_values)
+            if state is None:
+                # [per-bucket counts..., +Inf count, sum]
+                state = self.values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def time(self, *label_values):
+        """Context manager that observes the elapsed wall time of its block."""
+        return _Timer(self, label_values)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = [(k, list(v)) for k, v in self.values.items()]
+        for label_values, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, label_values, le)} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram: Histogram, label_values: tuple):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+
+class TimedLock:
+    """threading.Lock that records how long it is held in LOCK_HOLD_SECONDS."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._acquired_at = 0.0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            self._acquired_at = time.perf_counter()
+        return acquired
+
+    def release(self):
+        held = time.perf_counter() - self._acquired_at
+        self._lock.release()
+        LOCK_HOLD_SECONDS.observe(held, self.name)
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+def render() -> str:
+    """Render every registered metric in Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# =============================================================================
+# METRIC DEFINITIONS
+# =============================================================================
+
+MQTT_MESSAGES = Counter(
+    "watchtower_mqtt_messages_total", "MQTT messages received or sent", ("direction",))
+MQTT_BYTES = Counter(
+    "watchtower_mqtt_bytes_total", "MQTT payload bytes received or sent", ("direction",))
+MQTT_FILTERED = Counter(
+    "watchtower_mqtt_filtered_total", "Messages kept out of the live feed, by filter", ("reason",))
+MQTT_HANDLE_SECONDS = Histogram(
+    "watchtower_mqtt_handle_seconds", "Time spent in the MQTT on_message handler")
+MQTT_CONNECTION_EVENTS = Counter(
+    "watchtower_mqtt_connection_events_total", "Broker connects, failed connects and disconnects", ("event",))
+MQTT_CONNECTED = Gauge(
+    "watchtower_mqtt_connected", "1 while connected to the MQTT broker")
+FEED_MESSAGES = Gauge(
+    "watchtower_feed_messages", "Messages currently held in the live feed buffer")
+CACHE_EVICTIONS = Counter(
+    "watchtower_cache_evictions_total", "Entries dropped from bounded MQTT caches", ("cache", "reason"))
+BUFFER_DROPS = Counter(
+    "watchtower_buffer_drops_total", "Items lost from a full write buffer before the writer drained it", ("buffer",))
+CACHE_LOOKUPS = Counter(
+    "watchtower_cache_lookups_total", "Cache lookups by outcome (hit, miss)", ("cache", "result"))
+LOCK_HOLD_SECONDS = Histogram(
+    "watchtower_lock_hold_seconds", "How long instrumented locks are held", ("lock",))
+DB_TRANSACTION_SECONDS = Histogram(
+    "watchtower_db_transaction_seconds", "Wall time of each SQLite get_db() block")
+DB_COMMIT_SECONDS = Histogram(
+    "watchtower_db_commit_seconds", "Time spent committing SQLite transactions")
+DB_WRITE_BATCH_SIZE = Histogram(
+    "watchtower_db_write_batch_size", "Queued writes committed together by the database writer",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+DB_WRITE_WAIT_SECONDS = Histogram(
+    "watchtower_db_write_wait_seconds", "Time a queued write waits before the writer picks it up")
+DB_WRITE_QUEUE_DEPTH = Gauge(
+    "watchtower_db_write_queue_depth", "Writes waiting for the database writer thread")
+HTTP_REQUEST_SECONDS = Histogram(
+    "watchtower_http_request_seconds", "Flask request latency", ("route", "method", "status"))
+CLICKUP_REQUEST_SECONDS = Histogram(
+    "watchtower_clickup_request_seconds", "ClickUp API call latency", ("endpoint", "status"))
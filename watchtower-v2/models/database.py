@@ -2,22 +2,101 @@
 WatchTower V2 Database
 =======================
 SQLite persistence for debug logs, device manifests, and incident history.
+
+Two files, each with its own write lock, WAL and checkpoint setting:
+
+    watchtower.db      debug log, todos, manifests, checklist runs, search
+                       index, analytics summaries (edited from the UI)
+    watchtower_hot.db  mqtt_log day partitions, game events and sessions,
+                       device status history (written by background threads)
+
+so a debug note saved from a tablet never queues behind a log flush. Main
+connections attach the hot file as `hot` for queries that span both.
 """
 
+import functools
+import gzip
+import hashlib
+import heapq
+import html
+import json
+import queue
 import sqlite3
 import os
-from datetime import datetime
+import re
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from itertools import islice
 from contextlib import contextmanager
 
+import config
+import device_names
+import metrics
+
 DATABASE_PATH = None
+HOT_DATABASE_PATH = None
+
+# Idle connections, reused LIFO by whichever thread needs one next. Flask's
+# threaded server starts a thread per request, so a plain thread-local would
+# still reconnect on every request.
+_pool = []
+_pool_lock = threading.Lock()
+_local = threading.local()
+
 
+def _hot_path_for(db_path):
+    if config.HOT_DATABASE_PATH and db_path == config.DATABASE_PATH:
+        return config.HOT_DATABASE_PATH
+    root, ext = os.path.splitext(db_path)
+    return f"{root}_hot{ext or '.db'}"
 
-def init_db(db_path):
-    """Initialize the database and create tables."""
-    global DATABASE_PATH
+
+def init_db(db_path, hot_path=None):
+    """Initialize both database files and create tables."""
+    global DATABASE_PATH, HOT_DATABASE_PATH
     DATABASE_PATH = db_path
+    HOT_DATABASE_PATH = hot_path or _hot_path_for(db_path)
+    close_connections()
+    with _partitions_lock:
+        _partitions.clear()
+
+    with get_hot_db() as db:
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS game_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+                topic TEXT NOT NULL,
+                event_name TEXT,
+                payload TEXT,
+                game_session_id TEXT
+            );
+
+            CREATE TABLE IF NOT EXISTS game_sessions (
+                id TEXT PRIMARY KEY,
+                started_at TEXT NOT NULL,
+                ended_at TEXT,
+                outcome TEXT
+            );
+
+            CREATE TABLE IF NOT EXISTS device_status_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                device_name TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                status TEXT NOT NULL
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_game_events_session ON game_events(game_session_id, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_game_sessions_started ON game_sessions(started_at);
+            CREATE INDEX IF NOT EXISTS idx_status_history_device_time
+                ON device_status_history(device_name, timestamp, id);
+        """)
 
     with get_db() as db:
+        # WAL is persistent in the file; readers no longer block the writer
+        db.execute("PRAGMA journal_mode=WAL")
         db.executescript("""
             CREATE TABLE IF NOT EXISTS debug_log (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -73,53 +152,379 @@ def init_db(db_path):
                 raw_manifest TEXT
             );
 
-            CREATE TABLE IF NOT EXISTS mqtt_log (
+            CREATE TABLE IF NOT EXISTS manifest_history (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
-                direction TEXT NOT NULL,
-                topic TEXT NOT NULL,
-                payload TEXT,
-                device_name TEXT
+                device_name TEXT NOT NULL,
+                synced_at TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                prev_hash TEXT,
+                changes TEXT NOT NULL
             );
 
-            CREATE TABLE IF NOT EXISTS game_events (
+            CREATE TABLE IF NOT EXISTS checklist_runs (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
-                topic TEXT NOT NULL,
-                event_name TEXT,
-                payload TEXT,
-                game_session_id TEXT
+                started_at TEXT NOT NULL,
+                finished_at TEXT,
+                duration_ms REAL,
+                passed INTEGER NOT NULL DEFAULT 0,
+                device_counts TEXT
+            );
+
+            CREATE TABLE IF NOT EXISTS checklist_steps (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id INTEGER NOT NULL REFERENCES checklist_runs(id),
+                step TEXT NOT NULL,
+                status TEXT NOT NULL,
+                summary TEXT,
+                details TEXT,
+                duration_ms REAL
+            );
+
+            CREATE TABLE IF NOT EXISTS schema_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
             );
 
-            CREATE INDEX IF NOT EXISTS idx_debug_device ON debug_log(device_name);
-            CREATE INDEX IF NOT EXISTS idx_debug_resolved ON debug_log(resolved);
-            CREATE INDEX IF NOT EXISTS idx_todo_status ON todo_items(status);
-            CREATE INDEX IF NOT EXISTS idx_todo_device ON todo_items(device_name);
-            CREATE INDEX IF NOT EXISTS idx_mqtt_timestamp ON mqtt_log(timestamp);
             CREATE INDEX IF NOT EXISTS idx_manifest_device ON device_manifests(device_name);
+            CREATE INDEX IF NOT EXISTS idx_manifest_history_device ON manifest_history(device_name, id);
+            CREATE INDEX IF NOT EXISTS idx_checklist_steps_run ON checklist_steps(run_id);
         """)
+        _add_missing_columns(db)
+        _create_list_indexes(db)
+        _migrate_legacy_mqtt_log(db)
+        _move_hot_tables(db)
+        # Writes are canonical already; older rows only need a pass when the alias table changes
+        aliases = device_names.alias_version()
+        if _get_meta(db, "device_aliases") != aliases:
+            _canonicalize_device_names(db)
+            _set_meta(db, "device_aliases", aliases)
+        _create_search_index(db)
+        _create_reliability_tables(db)
 
 
-@contextmanager
-def get_db():
-    """Context manager for database connections."""
-    conn = sqlite3.connect(DATABASE_PATH)
+# Stored sort key for todo priority, higher = more urgent, so the list order
+# (priority, then newest) is a single descending index scan
+PRIORITY_RANKS = {"urgent": 4, "high": 3, "normal": 2, "low": 1}
+_PRIORITY_RANK_SQL = "CASE {col} " + " ".join(
+    f"WHEN '{p}' THEN {r}" for p, r in PRIORITY_RANKS.items()) + " ELSE 0 END"
+
+
+def _get_meta(db, key):
+    row = db.execute("SELECT value FROM schema_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(db, key, value):
+    db.execute("""INSERT INTO schema_meta (key, value) VALUES (?, ?)
+                  ON CONFLICT(key) DO UPDATE SET value = excluded.value""", (key, value))
+
+
+def _add_missing_columns(db):
+    """Columns added after the first release; CREATE TABLE IF NOT EXISTS won't add them."""
+    def columns(table):
+        return {row["name"] for row in db.execute(f"PRAGMA table_info({table})")}
+
+    if "priority_rank" not in columns("todo_items"):
+        db.execute("ALTER TABLE todo_items ADD COLUMN priority_rank INTEGER NOT NULL DEFAULT 0")
+        db.execute(f"UPDATE todo_items SET priority_rank = {_PRIORITY_RANK_SQL.format(col='priority')}")
+    if "resolved_at" not in columns("debug_log"):
+        db.execute("ALTER TABLE debug_log ADD COLUMN resolved_at TEXT")
+    if "content_hash" not in columns("device_manifests"):
+        db.execute("ALTER TABLE device_manifests ADD COLUMN content_hash TEXT")
+    if "initial" not in columns("manifest_history"):
+        db.execute("ALTER TABLE manifest_history ADD COLUMN initial INTEGER NOT NULL DEFAULT 0")
+        # Before the flag, a missing prev_hash stood in for it; a first sync is
+        # the one whose changes have no old values
+        db.executemany("UPDATE manifest_history SET initial = 1 WHERE id = ?", [
+            (row["id"],) for row in db.execute("SELECT id, changes FROM manifest_history WHERE prev_hash IS NULL")
+            if all(change["old"] is None for change in json.loads(row["changes"]).values())
+        ])
+    for table in ("debug_log", "todo_items"):
+        if "import_key" not in columns(table):
+            db.execute(f"ALTER TABLE {table} ADD COLUMN import_key TEXT")
+            db.execute(f"ALTER TABLE {table} ADD COLUMN content_hash TEXT")
+        db.execute(f"""CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_import_key
+                       ON {table}(import_key) WHERE import_key IS NOT NULL""")
+
+
+def _create_list_indexes(db):
+    """Composite indexes matching each list endpoint's filter + sort (see tests/test_query_plans.py)."""
+    db.executescript(f"""
+        DROP INDEX IF EXISTS idx_debug_device;
+        DROP INDEX IF EXISTS idx_debug_resolved;
+        DROP INDEX IF EXISTS idx_todo_status;
+        DROP INDEX IF EXISTS idx_todo_device;
+
+        CREATE INDEX IF NOT EXISTS idx_debug_time ON debug_log(timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_debug_device_time ON debug_log(device_name, timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_debug_resolved_time ON debug_log(resolved, timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_debug_device_resolved_time ON debug_log(device_name, resolved, timestamp, id);
+
+        CREATE INDEX IF NOT EXISTS idx_todo_rank ON todo_items(priority_rank, timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_todo_device_rank ON todo_items(device_name, priority_rank, timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_todo_status_rank ON todo_items(status, priority_rank, timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_todo_device_status_rank ON todo_items(device_name, status, priority_rank, timestamp, id);
+
+        -- Only rewrite the row when the writer didn't already supply the right rank
+        DROP TRIGGER IF EXISTS todo_items_rank_ai;
+        DROP TRIGGER IF EXISTS todo_items_rank_au;
+        CREATE TRIGGER todo_items_rank_ai AFTER INSERT ON todo_items
+        WHEN new.priority_rank IS NOT {_PRIORITY_RANK_SQL.format(col='new.priority')} BEGIN
+            UPDATE todo_items SET priority_rank = {_PRIORITY_RANK_SQL.format(col='new.priority')} WHERE id = new.id;
+        END;
+        CREATE TRIGGER todo_items_rank_au AFTER UPDATE OF priority ON todo_items
+        WHEN new.priority_rank IS NOT {_PRIORITY_RANK_SQL.format(col='new.priority')} BEGIN
+            UPDATE todo_items SET priority_rank = {_PRIORITY_RANK_SQL.format(col='new.priority')} WHERE id = new.id;
+        END;
+    """)
+
+
+def parse_cursor(after, parts=2):
+    """Split an `after` cursor ("<timestamp>,<id>" or "<rank>,<timestamp>,<id>"). Raises ValueError."""
+    values = after.split(",")
+    if len(values) != parts:
+        raise ValueError(f"Cursor must have {parts} comma-separated parts")
+    values[-1] = int(values[-1])
+    if parts == 3:
+        values[0] = int(values[0])
+    return tuple(values)
+
+
+def next_cursor(rows, limit, keys=("timestamp", "id")):
+    """Cursor for the page after `rows`, or None if this was the last page."""
+    if len(rows) < limit or not rows:
+        return None
+    return ",".join(str(rows[-1][k]) for k in keys)
+
+
+def _canonicalize_device_names(db):
+    """Rewrite device_name columns written before the canonical resolver existed."""
+    for table in ("debug_log", "todo_items", *(f"hot.{t}" for t in _list_partitions(db, "hot"))):
+        names = [row[0] for row in db.execute(
+            f"SELECT DISTINCT device_name FROM {table} WHERE device_name IS NOT NULL")]
+        for name in names:
+            canonical = device_names.canonical(name)
+            if canonical != name:
+                db.execute(f"UPDATE {table} SET device_name = ? WHERE device_name = ?", (canonical, name))
+
+    # device_name is UNIQUE here; leave a legacy row alone if the canonical one already exists
+    for (name,) in db.execute("SELECT device_name FROM device_manifests").fetchall():
+        canonical = device_names.canonical(name)
+        if canonical != name:
+            db.execute(
+                """UPDATE device_manifests SET device_name = ? WHERE device_name = ?
+                   AND NOT EXISTS (SELECT 1 FROM device_manifests WHERE device_name = ?)""",
+                (canonical, name, canonical)
+            )
+
+
+def _connect(path):
+    conn = sqlite3.connect(
+        path,
+        timeout=config.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=config.SQLITE_CACHED_STATEMENTS,
+        check_same_thread=False,   # handed between threads, but only one uses it at a time
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {int(config.SQLITE_BUSY_TIMEOUT_MS)}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{int(config.SQLITE_CACHE_SIZE_KB)}")
+    conn.execute(f"PRAGMA mmap_size = {int(config.SQLITE_MMAP_SIZE)}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    if path == HOT_DATABASE_PATH:
+        conn.execute(f"PRAGMA wal_autocheckpoint = {int(config.HOT_WAL_AUTOCHECKPOINT)}")
+    else:
+        conn.execute(f"PRAGMA wal_autocheckpoint = {int(config.SQLITE_WAL_AUTOCHECKPOINT)}")
+        # Read access to the hot tables for cross-database queries; writing
+        # them from here would take the hot file's lock as well
+        conn.execute("ATTACH DATABASE ? AS hot", (HOT_DATABASE_PATH,))
+    return conn
+
+
+def _checkout(path):
+    with _pool_lock:
+        for i in range(len(_pool) - 1, -1, -1):
+            if _pool[i][0] == path:
+                return _pool.pop(i)[1]
+    return _connect(path)
+
+
+def _checkin(path, conn):
+    with _pool_lock:
+        if sum(1 for p, _ in _pool if p == path) < config.SQLITE_POOL_SIZE:
+            _pool.append((path, conn))
+            return
+    conn.close()
+
+
+def close_connections():
+    """Close every idle pooled connection (e.g. after switching databases)."""
+    with _pool_lock:
+        idle = [conn for _, conn in _pool]
+        _pool.clear()
+    for conn in idle:
+        conn.close()
+
+
+@contextmanager
+def _transaction(path):
+    """
+    A pooled connection to `path` that stays with this thread until the
+    outermost block for the same file exits, which commits (or rolls back).
+    Nested blocks share the outer transaction.
+    """
+    held = getattr(_local, "held", None)
+    if held is None:
+        held = _local.held = {}
+    entry = held.get(path)
+    if entry is not None:
+        entry[1] += 1
+        try:
+            yield entry[0]
+        finally:
+            entry[1] -= 1
+        return
+
+    started = time.perf_counter()
+    conn = _checkout(path)
+    held[path] = [conn, 1]
+    healthy = True
     try:
         yield conn
-        conn.commit()
+        with metrics.DB_COMMIT_SECONDS.time():
+            conn.commit()
     except Exception:
-        conn.rollback()
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            healthy = False
         raise
     finally:
-        conn.close()
+        del held[path]
+        if healthy:
+            _checkin(path, conn)
+        else:
+            # Don't hand a connection in an unknown state to the next request
+            conn.close()
+        metrics.DB_TRANSACTION_SECONDS.observe(time.perf_counter() - started)
+
+
+def get_db():
+    """
+    Transaction on the main database (debug log, todos, manifests, search,
+    checklist, analytics summaries). The hot database is attached as `hot`
+    for reads that join across the two.
+    """
+    return _transaction(DATABASE_PATH)
+
+
+def get_hot_db():
+    """Transaction on the hot database only (mqtt_log partitions, game events, status history)."""
+    return _transaction(HOT_DATABASE_PATH)
+
+
+def checkpoint_hot(mode="PASSIVE"):
+    """Checkpoint the hot database's WAL; TRUNCATE also shrinks the -wal file back to zero."""
+    with get_hot_db() as db:
+        return tuple(db.execute(f"PRAGMA wal_checkpoint({mode})").fetchone())
+
+
+# =============================================================================
+# WRITE QUEUE
+# =============================================================================
+# Flask serves every request on its own thread. Instead of each one taking
+# the main file's write lock itself (and sleeping in SQLite's busy handler
+# behind the others), functions marked @_queued hand their work to a single
+# writer thread. The writer runs everything waiting at that moment in one
+# transaction, each write inside its own savepoint so a failing write is
+# rolled back alone, commits once, then resolves the callers' futures.
+
+_write_queue = queue.SimpleQueue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _start_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_run_writer, name="db-writer", daemon=True)
+            _writer.start()
+
+
+def submit_write(fn, *args, **kwargs):
+    """Queue fn(*args, **kwargs) for the writer thread. Returns a Future resolved after commit."""
+    future = Future()
+    metrics.DB_WRITE_QUEUE_DEPTH.inc()
+    _write_queue.put((fn, args, kwargs, future, time.perf_counter()))
+    if _writer is None or not _writer.is_alive():
+        _start_writer()
+    return future
+
+
+def _queued(fn):
+    """Run a main-database write on the writer thread; the caller blocks for its result."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        # Inside a main-file transaction already (the writer itself, or a caller
+        # grouping several writes): join it rather than wait behind it
+        if DATABASE_PATH in getattr(_local, "held", {}):
+            return fn(*args, **kwargs)
+        return submit_write(fn, *args, **kwargs).result(config.DB_WRITE_TIMEOUT)
+    return wrapper
+
+
+def _run_writer():
+    while True:
+        batch = [_write_queue.get()]
+        while len(batch) < config.DB_WRITE_BATCH_MAX:
+            try:
+                batch.append(_write_queue.get_nowait())
+            except queue.Empty:
+                break
+        metrics.DB_WRITE_QUEUE_DEPTH.inc(amount=-len(batch))
+        metrics.DB_WRITE_BATCH_SIZE.observe(len(batch))
+        _commit_batch(batch)
+
+
+def _commit_batch(batch):
+    started = time.perf_counter()
+    outcomes = []
+    try:
+        with get_db() as db:
+            # Savepoints outside a transaction would each commit on release
+            db.execute("BEGIN")
+            for fn, args, kwargs, future, queued_at in batch:
+                metrics.DB_WRITE_WAIT_SECONDS.observe(started - queued_at)
+                if not future.set_running_or_notify_cancel():
+                    continue
+                db.execute("SAVEPOINT queued_write")
+                try:
+                    outcomes.append((future, fn(*args, **kwargs), None))
+                except Exception as e:
+                    db.execute("ROLLBACK TO queued_write")
+                    outcomes.append((future, None, e))
+                db.execute("RELEASE queued_write")
+    except Exception as e:
+        # BEGIN, a savepoint or the commit failed: nothing in the batch was written
+        for *_, future, _ in batch:
+            if not future.done():
+                future.set_exception(e)
+        return
+    for future, result, error in outcomes:
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
 
 
 # =============================================================================
 # DEBUG LOG OPERATIONS
 # =============================================================================
 
+@_queued
 def add_debug_entry(device_name, severity, title, description=None, resolution=None, created_by="system"):
+    device_name = device_names.canonical(device_name)
     with get_db() as db:
         cursor = db.execute(
             """INSERT INTO debug_log (device_name, severity, title, description, resolution, created_by)
@@ -129,28 +534,35 @@ def add_debug_entry(device_name, severity, title, description=None, resolution=N
         return cursor.lastrowid
 
 
-def get_debug_entries(device_name=None, resolved=None, limit=100):
+def get_debug_entries(device_name=None, resolved=None, limit=100, after=None):
+    """Newest first. `after` is the (timestamp, id) of the last row already seen."""
     with get_db() as db:
         query = "SELECT * FROM debug_log WHERE 1=1"
         params = []
 
         if device_name:
             query += " AND device_name = ?"
-            params.append(device_name)
+            params.append(device_names.canonical(device_name))
         if resolved is not None:
             query += " AND resolved = ?"
             params.append(int(resolved))
+        if after:
+            query += " AND (timestamp, id) < (?, ?)"
+            params.extend(after)
 
-        query += " ORDER BY timestamp DESC LIMIT ?"
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
         params.append(limit)
 
         return [dict(row) for row in db.execute(query, params).fetchall()]
 
 
+@_queued
 def resolve_debug_entry(entry_id, resolution=None):
     with get_db() as db:
         db.execute(
-            "UPDATE debug_log SET resolved = 1, resolution = ? WHERE id = ?",
+            """UPDATE debug_log SET resolved = 1, resolution = ?,
+                   resolved_at = coalesce(resolved_at, datetime('now', 'localtime'))
+               WHERE id = ?""",
             (resolution, entry_id)
         )
 
@@ -159,8 +571,10 @@ def resolve_debug_entry(entry_id, resolution=None):
 # TODO OPERATIONS
 # =============================================================================
 
+@_queued
 def add_todo(title, device_name=None, description=None, priority="normal",
              due_date=None, assigned_to=None, clickup_task_id=None, clickup_task_url=None):
+    device_name = device_names.canonical(device_name)
     with get_db() as db:
         cursor = db.execute(
             """INSERT INTO todo_items
@@ -171,29 +585,35 @@ def add_todo(title, device_name=None, description=None, priority="normal",
         return cursor.lastrowid
 
 
-def get_todos(device_name=None, status=None, limit=100):
+def get_todos(device_name=None, status=None, limit=100, after=None):
+    """Most urgent first, then newest. `after` is the (priority_rank, timestamp, id) of the last row seen."""
     with get_db() as db:
         query = "SELECT * FROM todo_items WHERE 1=1"
         params = []
 
         if device_name:
             query += " AND device_name = ?"
-            params.append(device_name)
+            params.append(device_names.canonical(device_name))
         if status:
             query += " AND status = ?"
             params.append(status)
+        if after:
+            query += " AND (priority_rank, timestamp, id) < (?, ?, ?)"
+            params.extend(after)
 
-        query += " ORDER BY CASE priority WHEN 'urgent' THEN 1 WHEN 'high' THEN 2 WHEN 'normal' THEN 3 WHEN 'low' THEN 4 END, timestamp DESC LIMIT ?"
+        query += " ORDER BY priority_rank DESC, timestamp DESC, id DESC LIMIT ?"
         params.append(limit)
 
         return [dict(row) for row in db.execute(query, params).fetchall()]
 
 
+@_queued
 def update_todo_status(todo_id, status):
     with get_db() as db:
         db.execute("UPDATE todo_items SET status = ? WHERE id = ?", (status, todo_id))
 
 
+@_queued
 def update_todo_clickup(todo_id, clickup_task_id, clickup_task_url):
     with get_db() as db:
         db.execute(
@@ -202,39 +622,252 @@ def update_todo_clickup(todo_id, clickup_task_id, clickup_task_url):
         )
 
 
+# =============================================================================
+# GRIMOIRE IMPORT
+# =============================================================================
+# Rows seeded from debug-log.md / todo.md carry an import_key (which item
+# this is: table, device, title and occurrence) and a content_hash (what it
+# said when last imported). Re-running the seeder inserts new items, rewrites
+# items whose markdown changed, and leaves everything else alone, including
+# edits made in WatchTower since the last import.
+
+_IMPORT_FIELDS = {
+    "debug_log": ("device_name", "severity", "title", "description", "resolution", "resolved"),
+    "todo_items": ("device_name", "title", "description", "priority"),
+}
+_IMPORT_DEFAULTS = {"severity": "info", "priority": "normal"}
+# Columns written alongside the imported fields but not part of the content hash
+_IMPORT_DERIVED = {
+    "debug_log": {},
+    "todo_items": {"priority_rank": lambda values: PRIORITY_RANKS.get(values["priority"], 0)},
+}
+
+
+def _short_hash(value):
+    return hashlib.sha256(value.encode()).hexdigest()[:16]
+
+
+def _import_identity(device_name, title):
+    return (device_name or "", " ".join((title or "").lower().split()))
+
+
+def _import_content_hash(values):
+    return _short_hash(repr(values))
+
+
+def _adopt_legacy_imports(db, table, legacy_created_by, keys):
+    """Give rows seeded before import keys existed the key and hash they'd get today (if `keys` has it)."""
+    fields = _IMPORT_FIELDS[table]
+    rows = db.execute(
+        f"""SELECT id, {", ".join(fields)} FROM {table}
+            WHERE import_key IS NULL AND created_by = ? ORDER BY id""",
+        (legacy_created_by,)
+    ).fetchall()
+    seen = {}
+    updates = []
+    for row in rows:
+        identity = _import_identity(row["device_name"], row["title"])
+        seen[identity] = seen.get(identity, 0) + 1
+        key = _short_hash(f"{table}|{identity}|{seen[identity]}")
+        if key in keys:
+            updates.append((key, _import_content_hash([row[f] for f in fields]), row["id"]))
+    db.executemany(f"UPDATE OR IGNORE {table} SET import_key = ?, content_hash = ? WHERE id = ?", updates)
+
+
+@contextmanager
+def _search_index_deferred(db, table, import_keys):
+    """
+    Index the rows for `import_keys` in {table}_fts once, after the block,
+    instead of through the per-row insert/update triggers. Runs inside the
+    caller's transaction, so the dropped triggers are back before anything
+    else can see the table.
+    """
+    columns = next(cols for t, cols, _ in SEARCH_SOURCES.values() if t == table)
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    keys = json.dumps(import_keys)
+    triggers = {name: sql for name, sql in _search_triggers(table, columns).items() if name != f"{table}_fts_ad"}
+
+    # One set-based statement each way; per-row FTS writes are what make the triggers slow
+    db.execute(
+        f"""INSERT INTO {fts}({fts}, rowid, {cols})
+            SELECT 'delete', id, {cols} FROM {table}
+            WHERE import_key IN (SELECT value FROM json_each(?))""", (keys,))
+    for name in triggers:
+        db.execute(f"DROP TRIGGER IF EXISTS {name}")
+    yield
+    db.execute(
+        f"""INSERT INTO {fts}(rowid, {cols})
+            SELECT id, {cols} FROM {table}
+            WHERE import_key IN (SELECT value FROM json_each(?))""", (keys,))
+    for sql in triggers.values():
+        db.execute(sql)
+
+
+def _bulk_import(table, items, legacy_created_by, force=False):
+    fields = _IMPORT_FIELDS[table]
+    derived = _IMPORT_DERIVED[table]
+    rows = []
+    seen = {}
+    for item in items:
+        values = {f: item.get(f) if item.get(f) is not None else _IMPORT_DEFAULTS.get(f) for f in fields}
+        values["device_name"] = device_names.canonical(values["device_name"])
+        if "resolved" in values:
+            values["resolved"] = 1 if values["resolved"] else 0
+        identity = _import_identity(values["device_name"], values["title"])
+        seen[identity] = seen.get(identity, 0) + 1
+        key = _short_hash(f"{table}|{identity}|{seen[identity]}")
+        rows.append((key, _import_content_hash([values[f] for f in fields]), values))
+
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    with get_db() as db:
+        _adopt_legacy_imports(db, table, legacy_created_by, {key for key, _, _ in rows})
+        existing = dict(db.execute(
+            f"SELECT import_key, content_hash FROM {table} WHERE import_key IS NOT NULL"
+        ).fetchall())
+
+        batch = []
+        for key, content_hash, values in rows:
+            if key not in existing:
+                counts["inserted"] += 1
+            elif existing[key] != content_hash or force:
+                counts["updated"] += 1
+            else:
+                counts["unchanged"] += 1
+                continue
+            batch.append([values[f] for f in fields]
+                         + [compute(values) for compute in derived.values()]
+                         + [key, content_hash])
+        if not batch:
+            return counts
+
+        written = fields + tuple(derived)
+        columns = ", ".join(written)
+        updates = ", ".join(f"{f} = excluded.{f}" for f in written)
+        with _search_index_deferred(db, table, [row[-2] for row in batch]):
+            db.executemany(
+                f"""INSERT INTO {table} ({columns}, created_by, import_key, content_hash)
+                    VALUES ({", ".join("?" * len(written))}, 'grimoire_import', ?, ?)
+                    ON CONFLICT(import_key) WHERE import_key IS NOT NULL
+                    DO UPDATE SET {updates}, content_hash = excluded.content_hash""",
+                batch
+            )
+    return counts
+
+
+def import_debug_entries(issues, force=False):
+    """Upsert parsed debug-log.md issues in one transaction. Returns inserted/updated/unchanged counts."""
+    return _bulk_import("debug_log", issues, legacy_created_by="grimoire_import", force=force)
+
+
+def import_todos(todos, force=False):
+    """Upsert parsed todo.md items in one transaction. Returns inserted/updated/unchanged counts."""
+    # Before import keys, the seeder went through add_todo() and its rows kept the default created_by
+    return _bulk_import("todo_items", todos, legacy_created_by="watchtower", force=force)
+
+
 # =============================================================================
 # MANIFEST OPERATIONS
 # =============================================================================
 
+# Columns that don't describe the device and are left out of the content hash
+# and the history diffs
+_MANIFEST_UNHASHED = {"id", "device_name", "last_synced", "raw_manifest", "content_hash"}
+
+
+def manifest_hash(manifest_data):
+    """Stable hash of a manifest's descriptive fields."""
+    fields = {k: v for k, v in manifest_data.items() if k not in _MANIFEST_UNHASHED}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+@_queued
 def upsert_manifest(device_name, manifest_data):
-    with get_db() as db:
-        fields = ", ".join(f"{k} = ?" for k in manifest_data.keys())
-        values = list(manifest_data.values())
+    """
+    Store a synced manifest. Returns "inserted", "updated" or "unchanged".
+
+    An unchanged manifest (same content hash) costs one indexed read and no
+    writes. Otherwise the row is written with a single INSERT ... ON CONFLICT
+    and the changed fields are appended to manifest_history.
+    """
+    device_name = device_names.canonical(device_name)
+    data = {k: v for k, v in manifest_data.items() if k not in ("id", "content_hash", "last_synced")}
+    data["device_name"] = device_name
+    content_hash = manifest_hash(data)
 
-        existing = db.execute(
-            "SELECT id FROM device_manifests WHERE device_name = ?", (device_name,)
+    with get_db() as db:
+        current = db.execute(
+            "SELECT * FROM device_manifests WHERE device_name = ?", (device_name,)
         ).fetchone()
+        if current is not None and current["content_hash"] == content_hash:
+            return "unchanged"
 
-        if existing:
-            db.execute(
-                f"UPDATE device_manifests SET {fields}, last_synced = datetime('now', 'localtime') WHERE device_name = ?",
-                values + [device_name]
-            )
-        else:
-            manifest_data["device_name"] = device_name
-            manifest_data["last_synced"] = datetime.now().isoformat()
-            placeholders = ", ".join("?" * len(manifest_data))
-            columns = ", ".join(manifest_data.keys())
-            db.execute(
-                f"INSERT INTO device_manifests ({columns}) VALUES ({placeholders})",
-                list(manifest_data.values())
-            )
+        current = dict(current) if current is not None else {}
+        changes = {
+            k: {"old": current.get(k), "new": v}
+            for k, v in data.items()
+            if k not in _MANIFEST_UNHASHED and current.get(k) != v
+        }
+        synced_at = datetime.now().isoformat(timespec="seconds")
+
+        row = dict(data, content_hash=content_hash, last_synced=synced_at)
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" * len(row))
+        updates = ", ".join(f"{k} = excluded.{k}" for k in row if k != "device_name")
+        db.execute(
+            f"""INSERT INTO device_manifests ({columns}) VALUES ({placeholders})
+                ON CONFLICT(device_name) DO UPDATE SET {updates}""",
+            list(row.values())
+        )
+        # A row stored before content hashes existed has no hash, but the
+        # diff against it is still a real one
+        db.execute(
+            """INSERT INTO manifest_history (device_name, synced_at, content_hash, prev_hash, initial, changes)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (device_name, synced_at, content_hash, current.get("content_hash"), int(not current),
+             json.dumps(changes, default=str))
+        )
+    return "updated" if current else "inserted"
+
+
+def get_manifest_history(device_name, fields=None, limit=50):
+    """
+    Change timeline for a device's manifest, newest first.
+
+    Each entry holds only the fields that changed in that sync. With
+    `fields` (e.g. ["firmware_version", "pin_config"]) entries that touched
+    none of them are skipped and the rest are trimmed to those fields.
+    """
+    with get_db() as db:
+        rows = db.execute(
+            """SELECT id, synced_at, content_hash, prev_hash, initial, changes FROM manifest_history
+               WHERE device_name = ? ORDER BY id DESC""",
+            (device_names.canonical(device_name),)
+        )
+        history = []
+        for row in rows:
+            changes = json.loads(row["changes"])
+            if fields:
+                changes = {k: v for k, v in changes.items() if k in fields}
+                if not changes:
+                    continue
+            history.append({
+                "id": row["id"],
+                "synced_at": row["synced_at"],
+                "content_hash": row["content_hash"],
+                "prev_hash": row["prev_hash"],
+                "initial": bool(row["initial"]),
+                "changes": changes,
+            })
+            if len(history) >= limit:
+                break
+        return history
 
 
 def get_manifest(device_name):
     with get_db() as db:
         row = db.execute(
-            "SELECT * FROM device_manifests WHERE device_name = ?", (device_name,)
+            "SELECT * FROM device_manifests WHERE device_name = ?", (device_names.canonical(device_name),)
         ).fetchone()
         return dict(row) if row else None
 
@@ -248,30 +881,1021 @@ def get_all_manifests():
 # MQTT LOG OPERATIONS
 # =============================================================================
 
-def log_mqtt_message(direction, topic, payload, device_name=None):
-    with get_db() as db:
+# mqtt_log lives in one table per day (mqtt_log_YYYYMMDD), so expiring a day
+# is a DROP TABLE rather than a DELETE over the whole log. Days older than
+# MQTT_LOG_HOT_DAYS are exported to read-only gzip NDJSON archives and
+# dropped; archives past MQTT_LOG_RETENTION_DAYS are deleted.
+
+_PARTITION_PREFIX = "mqtt_log_"
+_partitions = set()
+_partitions_lock = threading.Lock()
+
+
+def _log_timestamp(value=None):
+    """Sortable local timestamp string used in mqtt_log (millisecond precision)."""
+    if value is None:
+        value = datetime.now()
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="milliseconds")
+    return str(value).replace("T", " ")
+
+
+def _partition_name(day):
+    return _PARTITION_PREFIX + day.replace("-", "")
+
+
+def _partition_day(table):
+    digits = table[len(_PARTITION_PREFIX):]
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:8]}"
+
+
+def _list_partitions(db, schema="main"):
+    rows = db.execute(
+        f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table' AND name GLOB 'mqtt_log_[0-9]*'"
+    ).fetchall()
+    return sorted(row[0] for row in rows)
+
+
+def _ensure_partition(db, day, schema="main"):
+    """Create the day's partition in `schema` (the hot file is "main" on a hot connection, "hot" otherwise)."""
+    table = _partition_name(day)
+    if table in _partitions:
+        return table
+    db.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.{table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            direction TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            payload TEXT,
+            device_name TEXT
+        )
+    """)
+    db.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_timestamp ON {table}(timestamp, id)")
+    db.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_device ON {table}(device_name, timestamp, id)")
+    with _partitions_lock:
+        _partitions.add(table)
+    return table
+
+
+def _migrate_legacy_mqtt_log(db):
+    """Move rows from the old single mqtt_log table into day partitions in the hot file."""
+    if not db.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = 'mqtt_log'").fetchone():
+        return
+    days = [row[0] for row in db.execute(
+        "SELECT DISTINCT date(timestamp) FROM main.mqtt_log WHERE timestamp IS NOT NULL")]
+    for day in days:
+        table = _ensure_partition(db, day, "hot")
         db.execute(
-            "INSERT INTO mqtt_log (direction, topic, payload, device_name) VALUES (?, ?, ?, ?)",
-            (direction, topic, payload[:500] if payload else "", device_name)
+            f"""INSERT INTO hot.{table} (timestamp, direction, topic, payload, device_name)
+                SELECT timestamp, direction, topic, payload, device_name FROM main.mqtt_log
+                WHERE date(timestamp) = ? ORDER BY id""",
+            (day,)
         )
-        # Trim old messages - keep last 5000
-        db.execute("""
-            DELETE FROM mqtt_log WHERE id NOT IN (
-                SELECT id FROM mqtt_log ORDER BY id DESC LIMIT 5000
+    db.execute("DROP TABLE main.mqtt_log")
+
+
+def _move_hot_tables(db):
+    """Move time-series tables created in the main file before the hot/cold split."""
+    partitions = _list_partitions(db, "main")
+    for table in ("game_events", "game_sessions", "device_status_history", *partitions):
+        if not db.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+            continue
+        if table in partitions:
+            _ensure_partition(db, _partition_day(table), "hot")
+        db.execute(f"INSERT OR IGNORE INTO hot.{table} SELECT * FROM main.{table}")
+        db.execute(f"DROP TABLE main.{table}")
+
+
+def _archive_dir():
+    return config.MQTT_ARCHIVE_DIR or os.path.join(os.path.dirname(os.path.abspath(DATABASE_PATH)), "mqtt_archive")
+
+
+def _archive_path(day):
+    return os.path.join(_archive_dir(), f"{_partition_name(day)}.ndjson.gz")
+
+
+def _list_archives():
+    """(day, path) for every archive file, oldest first."""
+    directory = _archive_dir()
+    if not os.path.isdir(directory):
+        return []
+    archives = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.startswith(_PARTITION_PREFIX) and filename.endswith(".ndjson.gz"):
+            archives.append((_partition_day(filename.split(".")[0]), os.path.join(directory, filename)))
+    return archives
+
+
+def log_mqtt_message(direction, topic, payload, device_name=None, timestamp=None):
+    log_mqtt_messages([(timestamp, direction, topic, payload, device_name)])
+
+
+def log_mqtt_messages(rows):
+    """Append (timestamp, direction, topic, payload, device_name) rows, one executemany per day."""
+    by_day = {}
+    for timestamp, direction, topic, payload, device_name in rows:
+        timestamp = _log_timestamp(timestamp)
+        by_day.setdefault(timestamp[:10], []).append(
+            (timestamp, direction, topic, payload[:500] if payload else "", device_names.canonical(device_name))
+        )
+    with get_hot_db() as db:
+        for day, day_rows in by_day.items():
+            table = _ensure_partition(db, day)
+            db.executemany(
+                f"INSERT INTO {table} (timestamp, direction, topic, payload, device_name) VALUES (?, ?, ?, ?, ?)",
+                day_rows
             )
-        """)
 
 
-def get_mqtt_log(limit=100, device_name=None):
+def get_mqtt_log(limit=100, device_name=None, after=None):
+    """
+    Most recent messages across the live partitions, newest first.
+
+    `after` is the (timestamp, id) of the last row already seen; partitions
+    for later days are skipped outright.
+    """
+    results = []
+    with get_hot_db() as db:
+        for table in reversed(_list_partitions(db)):
+            if after and _partition_day(table) > after[0][:10]:
+                continue
+            where, params = [], []
+            if device_name:
+                where.append("device_name = ?")
+                params.append(device_names.canonical(device_name))
+            if after:
+                where.append("(timestamp, id) < (?, ?)")
+                params.extend(after)
+            query = f"SELECT * FROM {table}"
+            if where:
+                query += " WHERE " + " AND ".join(where)
+            query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+            params.append(limit - len(results))
+            results.extend(dict(row) for row in db.execute(query, params).fetchall())
+            if len(results) >= limit:
+                break
+    return results
+
+
+def _archive_rows(path, start, end, device_name, topic):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            if start and row["timestamp"] < start:
+                continue
+            if end and row["timestamp"] >= end:
+                break
+            if device_name and row["device_name"] != device_name:
+                continue
+            if topic and row["topic"] != topic:
+                continue
+            yield row
+
+
+def _partition_rows(table, start, end, device_name, topic, batch=1000):
+    """Rows of one partition in time order, fetched in keyset batches."""
+    where, params = [], []
+    if start:
+        where.append("timestamp >= ?")
+        params.append(start)
+    if end:
+        where.append("timestamp < ?")
+        params.append(end)
+    if device_name:
+        where.append("device_name = ?")
+        params.append(device_name)
+    if topic:
+        where.append("topic = ?")
+        params.append(topic)
+
+    after = None
+    while True:
+        clauses = list(where)
+        args = list(params)
+        if after:
+            clauses.append("(timestamp, id) > (?, ?)")
+            args.extend(after)
+        query = f"SELECT * FROM {table}"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY timestamp, id LIMIT ?"
+        args.append(batch)
+        try:
+            with get_hot_db() as db:
+                rows = [dict(row) for row in db.execute(query, args).fetchall()]
+        except sqlite3.OperationalError:
+            return  # partition archived and dropped mid-scan
+        yield from rows
+        if len(rows) < batch:
+            return
+        after = (rows[-1]["timestamp"], rows[-1]["id"])
+
+
+def iter_mqtt_log(start=None, end=None, device_name=None, topic=None):
+    """
+    Messages in time order across archives and live partitions.
+
+    `start` is inclusive and `end` exclusive (datetimes or timestamp
+    strings); only archives and partitions whose day overlaps the range are
+    opened.
+    """
+    start = _log_timestamp(start) if start else None
+    end = _log_timestamp(end) if end else None
+    device_name = device_names.canonical(device_name) if device_name else None
+    first_day = start[:10] if start else None
+    last_day = end[:10] if end else None
+
+    def in_range(day):
+        return (not first_day or day >= first_day) and (not last_day or day <= last_day)
+
+    with get_hot_db() as db:
+        live_days = {_partition_day(t) for t in _list_partitions(db)}
+    sources = {}
+    for day, source in [(day, "live") for day in live_days] + _list_archives():
+        if in_range(day):
+            sources.setdefault(day, []).append(source)
+
+    for day in sorted(sources):
+        streams = [
+            _partition_rows(_partition_name(day), start, end, device_name, topic) if source == "live"
+            else _archive_rows(source, start, end, device_name, topic)
+            for source in sources[day]
+        ]
+        # A day can have both: late rows written after it was archived
+        yield from heapq.merge(*streams, key=lambda row: row["timestamp"])
+
+
+def query_mqtt_log(start=None, end=None, device_name=None, topic=None, limit=1000):
+    return list(islice(iter_mqtt_log(start, end, device_name, topic), limit))
+
+
+def _archive_partition(table, day):
+    """Write a partition to a read-only gzip NDJSON file, then drop it."""
+    path = _archive_path(day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    rows = _partition_rows(table, None, None, None, None)
+    if os.path.exists(path):
+        rows = heapq.merge(_archive_rows(path, None, None, None, None), rows, key=lambda r: r["timestamp"])
+    count = 0
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, separators=(",", ":")) + "\n")
+            count += 1
+    os.chmod(tmp_path, 0o444)
+    os.replace(tmp_path, path)
+    _drop_partition(table)
+    return count
+
+
+def _drop_partition(table):
+    with _partitions_lock:
+        _partitions.discard(table)
+    with get_hot_db() as db:
+        db.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def rotate_mqtt_log(today=None):
+    """Archive partitions past the hot window and delete archives past retention."""
+    today = today or datetime.now().date()
+    hot_from = (today - timedelta(days=config.MQTT_LOG_HOT_DAYS - 1)).isoformat()
+    keep_from = (today - timedelta(days=config.MQTT_LOG_RETENTION_DAYS - 1)).isoformat()
+    result = {"archived": {}, "dropped": [], "deleted_archives": []}
+
+    with get_hot_db() as db:
+        tables = _list_partitions(db)
+    for table in tables:
+        day = _partition_day(table)
+        if day >= hot_from:
+            continue
+        if day < keep_from:
+            _drop_partition(table)
+            result["dropped"].append(day)
+        else:
+            result["archived"][day] = _archive_partition(table, day)
+
+    for day, path in _list_archives():
+        if day < keep_from:
+            os.remove(path)
+            result["deleted_archives"].append(day)
+    return result
+
+
+def _file_bytes(path):
+    """Size of a database file plus its WAL."""
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def get_mqtt_log_storage():
+    """Live partitions with row counts, and archive files with sizes."""
+    with get_hot_db() as db:
+        partitions = [
+            {"day": _partition_day(t), "rows": db.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]}
+            for t in _list_partitions(db)
+        ]
+    archives = [{"day": day, "bytes": os.path.getsize(path)} for day, path in _list_archives()]
+    return {
+        "database_bytes": {"main": _file_bytes(DATABASE_PATH), "hot": _file_bytes(HOT_DATABASE_PATH)},
+        "hot_days": config.MQTT_LOG_HOT_DAYS,
+        "retention_days": config.MQTT_LOG_RETENTION_DAYS,
+        "partitions": partitions,
+        "archives": archives,
+    }
+
+
+# =============================================================================
+# FULL-TEXT SEARCH
+# =============================================================================
+# One external-content FTS5 table per source, kept in sync by triggers, so
+# the index never stores a second copy of the text. Grimoire markdown is
+# split into heading sections in grimoire_sections and re-indexed whenever
+# a document's mtime changes.
+
+# source -> (content table, indexed columns, bm25 column weights)
+SEARCH_SOURCES = {
+    "debug": ("debug_log", ("title", "description", "resolution", "device_name"), (5.0, 1.0, 1.0, 2.0)),
+    "todo": ("todo_items", ("title", "description", "device_name"), (5.0, 1.0, 2.0)),
+    "manifest": ("device_manifests", ("device_name", "description", "known_quirks", "components"), (3.0, 1.0, 2.0, 1.0)),
+    "grimoire": ("grimoire_sections", ("heading", "body"), (4.0, 1.0)),
+}
+
+
+def _search_triggers(table, columns):
+    """CREATE TRIGGER statements that keep {table}_fts in step with `table`, by trigger name."""
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new_cols = ", ".join(f"new.{c}" for c in columns)
+    old_cols = ", ".join(f"old.{c}" for c in columns)
+    return {
+        f"{table}_fts_ai": f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+            END""",
+        f"{table}_fts_ad": f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+            END""",
+        f"{table}_fts_au": f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE OF {cols} ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+                INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+            END""",
+    }
+
+
+def _create_search_index(db):
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS grimoire_sections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            doc TEXT NOT NULL,
+            tab TEXT,
+            heading TEXT NOT NULL,
+            anchor TEXT,
+            body TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS grimoire_docs (
+            doc TEXT PRIMARY KEY,
+            mtime REAL NOT NULL,
+            sections INTEGER NOT NULL DEFAULT 0
+        );
+    """)
+
+    for table, columns, _ in SEARCH_SOURCES.values():
+        fts = f"{table}_fts"
+        exists = db.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (fts,)).fetchone()
+        db.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {", ".join(columns)}, content='{table}', content_rowid='id', tokenize='porter unicode61'
+            )""")
+        for trigger in _search_triggers(table, columns).values():
+            db.execute(trigger)
+        if not exists:
+            # Index rows written before the search index existed
+            db.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def reindex_grimoire(force=False):
+    """Re-split and re-index any library document whose mtime changed. Returns docs re-indexed."""
+    from models import grimoire_loader
+
+    mtimes = grimoire_loader.get_search_doc_mtimes()
     with get_db() as db:
-        query = "SELECT * FROM mqtt_log"
-        params = []
+        indexed = {row["doc"]: row["mtime"] for row in db.execute("SELECT doc, mtime FROM grimoire_docs")}
+    changed = [doc for doc, mtime in mtimes.items() if force or indexed.get(doc) != mtime]
+    removed = [doc for doc in indexed if doc not in mtimes]
+    if not changed and not removed:
+        return []
+
+    # Reading and splitting the markdown happens here; the writer thread only
+    # swaps the rows, so queued UI writes never wait on file IO
+    sections = {doc: (mtimes[doc], grimoire_loader.split_sections(doc)) for doc in changed}
+    _replace_grimoire_sections(removed, sections)
+    return changed + removed
+
+
+@_queued
+def _replace_grimoire_sections(removed, sections):
+    """Drop the `removed` docs and swap in {doc: (mtime, sections)} for the rest."""
+    with get_db() as db:
+        for doc in [*removed, *sections]:
+            db.execute("DELETE FROM grimoire_sections WHERE doc = ?", (doc,))
+            db.execute("DELETE FROM grimoire_docs WHERE doc = ?", (doc,))
+        for doc, (mtime, doc_sections) in sections.items():
+            db.executemany(
+                "INSERT INTO grimoire_sections (doc, tab, heading, anchor, body) VALUES (?, ?, ?, ?, ?)",
+                [(s["doc"], s["tab"], s["heading"], s["anchor"], s["body"]) for s in doc_sections]
+            )
+            db.execute("INSERT INTO grimoire_docs (doc, mtime, sections) VALUES (?, ?, ?)",
+                       (doc, mtime, len(doc_sections)))
+
+
+def _fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last as a prefix."""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return " ".join(f'"{w}"' for w in words) + "*"
+
+
+def _highlight(snippet):
+    # snippet() markers are control characters so the text can be escaped safely
+    return html.escape(snippet or "").replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+
+def search(text, kinds=None, limit=20):
+    """Ranked full-text hits across debug log, todos, manifests and grimoire sections."""
+    query = _fts_query(text)
+    if not query:
+        return []
+
+    results = []
+    with get_db() as db:
+        for kind, (table, columns, weights) in SEARCH_SOURCES.items():
+            if kinds and kind not in kinds:
+                continue
+            fts = f"{table}_fts"
+            title_col = "heading" if kind == "grimoire" else "device_name" if kind == "manifest" else "title"
+            extra = {
+                "debug": "t.device_name, t.severity, t.resolved",
+                "todo": "t.device_name, t.priority, t.status",
+                "manifest": "t.device_name, t.room",
+                "grimoire": "t.doc, t.tab, t.anchor",
+            }[kind]
+            rows = db.execute(
+                f"""SELECT t.id, t.{title_col} AS title, {extra},
+                           snippet({fts}, -1, char(2), char(3), '…', 16) AS snippet,
+                           bm25({fts}, {", ".join(str(w) for w in weights)}) AS rank
+                    FROM {fts} JOIN {table} t ON t.id = {fts}.rowid
+                    WHERE {fts} MATCH ?
+                    ORDER BY rank LIMIT ?""",
+                (query, limit)
+            ).fetchall()
+            for row in rows:
+                hit = dict(row)
+                hit["kind"] = kind
+                hit["snippet"] = _highlight(hit["snippet"])
+                hit["rank"] = round(hit["rank"], 3)
+                results.append(hit)
+
+    results.sort(key=lambda hit: hit["rank"])
+    return results[:limit]
+
+
+# =============================================================================
+# PRE-GAME CHECKLIST OPERATIONS
+# =============================================================================
+
+@_queued
+def save_checklist_run(run):
+    with get_db() as db:
+        cursor = db.execute(
+            """INSERT INTO checklist_runs (started_at, finished_at, duration_ms, passed, device_counts)
+               VALUES (?, ?, ?, ?, ?)""",
+            (run["started_at"], run["finished_at"], run["duration_ms"], int(run["passed"]),
+             json.dumps(run.get("device_counts") or {}))
+        )
+        run_id = cursor.lastrowid
+        db.executemany(
+            """INSERT INTO checklist_steps (run_id, step, status, summary, details, duration_ms)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            [(run_id, s["step"], s["status"], s["summary"], json.dumps(s["details"]), s["duration_ms"])
+             for s in run["steps"]]
+        )
+        return run_id
+
 
+def _checklist_run_dict(db, row):
+    run = dict(row)
+    run["passed"] = bool(run["passed"])
+    run["device_counts"] = json.loads(run["device_counts"] or "{}")
+    run["steps"] = []
+    for step in db.execute(
+        "SELECT step, status, summary, details, duration_ms FROM checklist_steps WHERE run_id = ? ORDER BY id",
+        (run["id"],)
+    ).fetchall():
+        step = dict(step)
+        step["details"] = json.loads(step["details"] or "{}")
+        run["steps"].append(step)
+    return run
+
+
+def get_checklist_run(run_id):
+    with get_db() as db:
+        row = db.execute("SELECT * FROM checklist_runs WHERE id = ?", (run_id,)).fetchone()
+        return _checklist_run_dict(db, row) if row else None
+
+
+def get_latest_checklist_run():
+    with get_db() as db:
+        row = db.execute("SELECT * FROM checklist_runs ORDER BY id DESC LIMIT 1").fetchone()
+        return _checklist_run_dict(db, row) if row else None
+
+
+def get_checklist_runs(limit=20, after=None):
+    """Run summaries (without step details), newest first; `after` is the last run id seen."""
+    with get_db() as db:
+        if after:
+            rows = db.execute("SELECT * FROM checklist_runs WHERE id < ? ORDER BY id DESC LIMIT ?",
+                              (after, limit)).fetchall()
+        else:
+            rows = db.execute("SELECT * FROM checklist_runs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        runs = []
+        for row in rows:
+            run = dict(row)
+            run["passed"] = bool(run["passed"])
+            run["device_counts"] = json.loads(run["device_counts"] or "{}")
+            runs.append(run)
+        return runs
+
+
+# =============================================================================
+# RELIABILITY ANALYTICS
+# =============================================================================
+# Per-device and per-month summaries that are kept current as data arrives,
+# so /api/analytics/devices reads one small table instead of scanning history:
+#
+#   - debug_log triggers add each row's contribution (incident, resolved,
+#     time to resolve) on insert and swap old for new on update/delete
+#   - status changes from the MQTT client are appended to
+#     device_status_history and folded into online/game-hour totals
+#
+# rebuild_reliability() recomputes both from the raw tables.
+
+_RELIABILITY_STATES = ("online", "offline", "unknown")
+_OBSERVED_STATES = ("online", "offline")
+
+
+def _incident_upserts(row, sign):
+    """Statements adding (sign=1) or removing (sign=-1) one debug_log row's contribution."""
+    timed = f"({row}.resolved != 0 AND {row}.resolved_at IS NOT NULL)"
+    seconds = (f"CASE WHEN {timed} THEN max(0, (julianday({row}.resolved_at) - julianday({row}.timestamp)) * 86400)"
+               f" ELSE 0 END")
+    shared = f"{sign}, {sign} * ({row}.resolved != 0), {sign} * {timed}, {sign} * {seconds}"
+    summed = "incidents = incidents + excluded.incidents, " \
+             "resolved_incidents = resolved_incidents + excluded.resolved_incidents, " \
+             "mttr_samples = mttr_samples + excluded.mttr_samples, " \
+             "resolve_seconds = resolve_seconds + excluded.resolve_seconds"
+    if sign > 0:
+        first_incident = "min(coalesce(first_incident, excluded.first_incident), excluded.first_incident)"
+        emptied = ""
+    else:
+        # The removed row may have been the earliest: look the new minimum up
+        # (one seek on idx_debug_device_time), and drop a month left with no
+        # incidents, as a rebuild would
+        first_incident = "(SELECT min(timestamp) FROM debug_log WHERE device_name = excluded.device_name)"
+        emptied = f"""
+        DELETE FROM device_incidents_monthly
+        WHERE device_name = {row}.device_name AND month = substr({row}.timestamp, 1, 7) AND incidents = 0;"""
+    return f"""
+        INSERT INTO device_reliability
+            (device_name, incidents, resolved_incidents, mttr_samples, resolve_seconds, first_incident)
+        SELECT {row}.device_name, {shared}, {row}.timestamp WHERE {row}.device_name IS NOT NULL
+        ON CONFLICT(device_name) DO UPDATE SET {summed}, first_incident = {first_incident};
+        INSERT INTO device_incidents_monthly
+            (device_name, month, incidents, resolved_incidents, mttr_samples, resolve_seconds)
+        SELECT {row}.device_name, substr({row}.timestamp, 1, 7), {shared} WHERE {row}.device_name IS NOT NULL
+        ON CONFLICT(device_name, month) DO UPDATE SET {summed};{emptied}
+    """
+
+
+def _reliability_triggers():
+    """CREATE TRIGGER statements keeping the incident summaries in step with debug_log, by trigger name."""
+    return {
+        "debug_log_reliability_ai": f"""
+            CREATE TRIGGER debug_log_reliability_ai AFTER INSERT ON debug_log BEGIN
+                {_incident_upserts("new", 1)}
+            END""",
+        "debug_log_reliability_ad": f"""
+            CREATE TRIGGER debug_log_reliability_ad AFTER DELETE ON debug_log BEGIN
+                {_incident_upserts("old", -1)}
+            END""",
+        "debug_log_reliability_au": f"""
+            CREATE TRIGGER debug_log_reliability_au
+            AFTER UPDATE OF device_name, timestamp, resolved, resolved_at ON debug_log BEGIN
+                {_incident_upserts("old", -1)}
+                {_incident_upserts("new", 1)}
+            END""",
+    }
+
+
+def _create_reliability_tables(db):
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS device_reliability (
+            device_name TEXT PRIMARY KEY,
+            incidents INTEGER NOT NULL DEFAULT 0,
+            resolved_incidents INTEGER NOT NULL DEFAULT 0,
+            mttr_samples INTEGER NOT NULL DEFAULT 0,
+            resolve_seconds REAL NOT NULL DEFAULT 0,
+            first_incident TEXT,
+            game_seconds REAL NOT NULL DEFAULT 0,
+            online_seconds REAL NOT NULL DEFAULT 0,
+            last_status TEXT,
+            last_status_at TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS device_incidents_monthly (
+            device_name TEXT NOT NULL,
+            month TEXT NOT NULL,
+            incidents INTEGER NOT NULL DEFAULT 0,
+            resolved_incidents INTEGER NOT NULL DEFAULT 0,
+            mttr_samples INTEGER NOT NULL DEFAULT 0,
+            resolve_seconds REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (device_name, month)
+        );
+    """)
+
+    # New databases, and databases whose triggers predate the current
+    # definitions, get the triggers (re)created and the summaries recomputed
+    # once, so drift left by an older trigger doesn't linger
+    triggers = _reliability_triggers()
+    version = _short_hash("".join(triggers.values()))
+    if _get_meta(db, "reliability_triggers") != version:
+        for name, sql in triggers.items():
+            db.execute(f"DROP TRIGGER IF EXISTS {name}")
+            db.execute(sql)
+        _rebuild_incidents(db)
+        _set_meta(db, "reliability_triggers", version)
+
+
+def _game_seconds(start, end):
+    """Seconds of [start, end) that fall inside config.GAME_HOURS."""
+    if end <= start:
+        return 0.0
+    if config.GAME_HOURS is None:
+        return (end - start).total_seconds()
+    open_hour, close_hour = config.GAME_HOURS
+    total = 0.0
+    day = datetime.combine(start.date(), datetime.min.time())
+    while day < end:
+        window_start = max(start, day + timedelta(hours=open_hour))
+        window_end = min(end, day + timedelta(hours=close_hour))
+        if window_end > window_start:
+            total += (window_end - window_start).total_seconds()
+        day += timedelta(days=1)
+    return total
+
+
+def _fold_status_changes(states, changes):
+    """
+    Advance per-device uptime state over (timestamp, device, status) changes,
+    in time order. `states` maps device -> dict(game_seconds, online_seconds,
+    last_status, last_status_at) and is updated in place.
+
+    TESTING is a ping in flight, not a verdict, so it keeps the previous state.
+    UNKNOWN time (e.g. while WatchTower itself was down) counts toward neither
+    side of the uptime ratio.
+    """
+    for at, device, status in changes:
+        state = states.setdefault(device, {
+            "game_seconds": 0.0, "online_seconds": 0.0, "last_status": None, "last_status_at": None})
+        if state["last_status"] in _OBSERVED_STATES:
+            span = _game_seconds(datetime.fromisoformat(state["last_status_at"]), datetime.fromisoformat(at))
+            state["game_seconds"] += span
+            if state["last_status"] == "online":
+                state["online_seconds"] += span
+        if status in _RELIABILITY_STATES:
+            state["last_status"] = status
+        elif state["last_status"] is None:
+            state["last_status"] = "unknown"
+        state["last_status_at"] = at
+
+
+def _save_uptime_states(db, states):
+    db.executemany(
+        """INSERT INTO device_reliability (device_name, game_seconds, online_seconds, last_status, last_status_at)
+           VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT(device_name) DO UPDATE SET
+               game_seconds = excluded.game_seconds, online_seconds = excluded.online_seconds,
+               last_status = excluded.last_status, last_status_at = excluded.last_status_at""",
+        [(device, s["game_seconds"], s["online_seconds"], s["last_status"], s["last_status_at"])
+         for device, s in states.items()]
+    )
+
+
+def record_status_changes(changes):
+    """
+    Append (timestamp, device, status) changes to device_status_history (hot
+    file) and update the uptime totals (main file). A change that repeats the
+    device's last recorded status (e.g. UNKNOWN again after a restart) is dropped.
+    """
+    rows = sorted((_log_timestamp(at), device_names.canonical(device), status) for at, device, status in changes)
+    if not rows:
+        return
+    with get_hot_db() as db:
+        last = {}
+        for device in {device for _, device, _ in rows}:
+            row = db.execute(
+                """SELECT status FROM device_status_history WHERE device_name = ?
+                   ORDER BY timestamp DESC, id DESC LIMIT 1""", (device,)
+            ).fetchone()
+            last[device] = row["status"] if row else None
+        changed = []
+        for at, device, status in rows:
+            if status != last[device]:
+                changed.append((at, device, status))
+                last[device] = status
+        db.executemany(
+            "INSERT INTO device_status_history (timestamp, device_name, status) VALUES (?, ?, ?)", changed)
+
+    # Summaries live in the main file; a failure here leaves drift that rebuild_reliability() repairs
+    _save_status_summaries(changed)
+
+
+@_queued
+def _save_status_summaries(changed):
+    with get_db() as db:
+        states = {}
+        for device in {device for _, device, _ in changed}:
+            row = db.execute(
+                """SELECT game_seconds, online_seconds, last_status, last_status_at
+                   FROM device_reliability WHERE device_name = ?""", (device,)
+            ).fetchone()
+            if row is not None:
+                states[device] = dict(row)
+        _fold_status_changes(states, changed)
+        _save_uptime_states(db, states)
+
+
+def _rebuild_incidents(db):
+    db.execute("DELETE FROM device_incidents_monthly")
+    db.execute("""UPDATE device_reliability SET incidents = 0, resolved_incidents = 0,
+                  mttr_samples = 0, resolve_seconds = 0, first_incident = NULL""")
+    timed = "(resolved != 0 AND resolved_at IS NOT NULL)"
+    seconds = f"CASE WHEN {timed} THEN max(0, (julianday(resolved_at) - julianday(timestamp)) * 86400) ELSE 0 END"
+    aggregates = f"count(*), sum(resolved != 0), sum({timed}), total({seconds})"
+    db.execute(f"""
+        INSERT INTO device_incidents_monthly
+            (device_name, month, incidents, resolved_incidents, mttr_samples, resolve_seconds)
+        SELECT device_name, substr(timestamp, 1, 7), {aggregates}
+        FROM debug_log WHERE device_name IS NOT NULL GROUP BY 1, 2""")
+    db.execute(f"""
+        INSERT INTO device_reliability
+            (device_name, incidents, resolved_incidents, mttr_samples, resolve_seconds, first_incident)
+        SELECT device_name, {aggregates}, min(timestamp)
+        FROM debug_log WHERE device_name IS NOT NULL GROUP BY 1
+        ON CONFLICT(device_name) DO UPDATE SET
+            incidents = excluded.incidents, resolved_incidents = excluded.resolved_incidents,
+            mttr_samples = excluded.mttr_samples, resolve_seconds = excluded.resolve_seconds,
+            first_incident = excluded.first_incident""")
+
+
+def rebuild_reliability():
+    """Recompute every reliability summary from debug_log and device_status_history."""
+    with get_db() as db:
+        _rebuild_incidents(db)
+        states = {}
+        _fold_status_changes(states, db.execute(
+            "SELECT timestamp, device_name, status FROM hot.device_status_history ORDER BY device_name, timestamp, id"))
+        db.execute("""UPDATE device_reliability SET game_seconds = 0, online_seconds = 0,
+                      last_status = NULL, last_status_at = NULL""")
+        _save_uptime_states(db, states)
+
+
+def _reliability_dict(row, now):
+    """API shape for one device_reliability row, counting the still-open status interval up to `now`."""
+    game, online = row["game_seconds"], row["online_seconds"]
+    if row["last_status"] in _OBSERVED_STATES:
+        span = _game_seconds(datetime.fromisoformat(row["last_status_at"]), now)
+        game += span
+        if row["last_status"] == "online":
+            online += span
+
+    months = None
+    if row["first_incident"]:
+        first = datetime.fromisoformat(row["first_incident"])
+        months = max(1, (now.year - first.year) * 12 + now.month - first.month + 1)
+
+    return {
+        "device": row["device_name"],
+        "incidents": row["incidents"],
+        "open_incidents": row["incidents"] - row["resolved_incidents"],
+        "resolved_incidents": row["resolved_incidents"],
+        "incidents_per_month": round(row["incidents"] / months, 2) if months else 0.0,
+        "mttr_hours": round(row["resolve_seconds"] / row["mttr_samples"] / 3600, 2) if row["mttr_samples"] else None,
+        "mttr_samples": row["mttr_samples"],
+        "uptime_pct": round(100 * online / game, 2) if game else None,
+        "game_hours_observed": round(game / 3600, 1),
+        "status": row["last_status"],
+        "status_since": row["last_status_at"],
+    }
+
+
+def get_device_reliability(device_name=None):
+    """Reliability summary for every device (or one), read straight from the summary table."""
+    now = datetime.now()
+    with get_db() as db:
         if device_name:
-            query += " WHERE device_name = ?"
-            params.append(device_name)
+            rows = db.execute("SELECT * FROM device_reliability WHERE device_name = ?",
+                              (device_names.canonical(device_name),)).fetchall()
+        else:
+            rows = db.execute("SELECT * FROM device_reliability ORDER BY device_name").fetchall()
+        return [_reliability_dict(row, now) for row in rows]
 
-        query += " ORDER BY id DESC LIMIT ?"
-        params.append(limit)
 
-        return [dict(row) for row in db.execute(query, params).fetchall()]
+def get_monthly_incidents(device_name, months=12):
+    """Incident count and MTTR per month for one device, newest month first."""
+    with get_db() as db:
+        rows = db.execute(
+            """SELECT month, incidents, resolved_incidents, mttr_samples, resolve_seconds
+               FROM device_incidents_monthly WHERE device_name = ? ORDER BY month DESC LIMIT ?""",
+            (device_names.canonical(device_name), months)
+        ).fetchall()
+        return [{
+            "month": row["month"],
+            "incidents": row["incidents"],
+            "resolved_incidents": row["resolved_incidents"],
+            "mttr_hours": round(row["resolve_seconds"] / row["mttr_samples"] / 3600, 2) if row["mttr_samples"] else None,
+        } for row in rows]
+
+
+def get_status_timeline(device_name, start, end=None):
+    """
+    Time spent online/offline/unknown and every outage for one device in
+    [start, end). Reads one row before the window (the state it opened in)
+    and the changes inside it, both by range on idx_status_history_device_time,
+    so the cost follows the number of changes in the window, not the table size.
+    """
+    device_name = device_names.canonical(device_name)
+    now = datetime.now()
+    end = min(end or now, now)
+    with get_hot_db() as db:
+        opening = db.execute(
+            """SELECT timestamp, status FROM device_status_history
+               WHERE device_name = ? AND timestamp < ? AND status != 'testing'
+               ORDER BY timestamp DESC, id DESC LIMIT 1""",
+            (device_name, _log_timestamp(start))
+        ).fetchone()
+        rows = db.execute(
+            """SELECT timestamp, status FROM device_status_history
+               WHERE device_name = ? AND timestamp >= ? AND timestamp < ?
+               ORDER BY timestamp, id""",
+            (device_name, _log_timestamp(start), _log_timestamp(end))
+        ).fetchall()
+
+    seconds = {state: 0.0 for state in _RELIABILITY_STATES}
+    outages = []
+    state = opening["status"] if opening else "unknown"
+    state_began = datetime.fromisoformat(opening["timestamp"]) if opening else start
+    since = start
+
+    def close(until):
+        seconds[state] += (until - since).total_seconds()
+        if state == "offline":
+            outages.append({
+                "start": state_began.isoformat(sep=" ", timespec="seconds"),
+                "end": until.isoformat(sep=" ", timespec="seconds") if until < now else None,
+                "duration_s": round((until - state_began).total_seconds(), 1),
+            })
+
+    for timestamp, status in rows:
+        if status == "testing" or status == state:
+            continue
+        at = datetime.fromisoformat(timestamp)
+        close(at)
+        state, state_began, since = status, at, at
+    close(end)
+
+    observed = seconds["online"] + seconds["offline"]
+    return {
+        "device": device_name,
+        "start": start.isoformat(sep=" ", timespec="seconds"),
+        "end": end.isoformat(sep=" ", timespec="seconds"),
+        "uptime_pct": round(100 * seconds["online"] / observed, 2) if observed else None,
+        "seconds": {k: round(v, 1) for k, v in seconds.items()},
+        "changes": len(rows),
+        "outages": outages,
+    }
+
+
+# =============================================================================
+# GAME SESSIONS
+# =============================================================================
+# Gravity Games milestone events, grouped into sessions: GameStart opens one,
+# GameSuccess / GameFail close it, GameRestart (or a new GameStart) abandons
+# whatever was open. Events outside a session are kept with no session id.
+
+
+def _session_id(started_at):
+    return started_at[:19].replace("-", "").replace(":", "").replace(" ", "-")
+
+
+def record_game_events(events):
+    """
+    Store (timestamp, topic, event_name, payload, boundary) events, where
+    boundary is "start", "restart", "success", "fail" or None. Returns the
+    number of sessions that finished in this batch.
+    """
+    if not events:
+        return 0
+    finished = 0
+    with get_hot_db() as db:
+        row = db.execute(
+            "SELECT id FROM game_sessions WHERE ended_at IS NULL ORDER BY started_at DESC LIMIT 1"
+        ).fetchone()
+        session = row["id"] if row else None
+
+        rows = []
+        for at, topic, event_name, payload, boundary in sorted(events, key=lambda e: e[0]):
+            at = _log_timestamp(at)
+            if boundary in ("start", "restart") and session:
+                db.execute("UPDATE game_sessions SET ended_at = ?, outcome = ? WHERE id = ?",
+                           (at, "restarted" if boundary == "restart" else "abandoned", session))
+                session = None
+            if boundary == "start":
+                session = _session_id(at)
+                db.execute("INSERT OR IGNORE INTO game_sessions (id, started_at) VALUES (?, ?)", (session, at))
+            rows.append((at, topic, event_name, payload, session))
+            if boundary in ("success", "fail") and session:
+                db.execute("UPDATE game_sessions SET ended_at = ?, outcome = ? WHERE id = ?",
+                           (at, boundary, session))
+                session = None
+                finished += 1
+
+        db.executemany(
+            """INSERT INTO game_events (timestamp, topic, event_name, payload, game_session_id)
+               VALUES (?, ?, ?, ?, ?)""", rows)
+    return finished
+
+
+def get_game_sessions(limit=50, after=None):
+    """Sessions newest first; `after` is the started_at of the last session seen."""
+    with get_hot_db() as db:
+        if after:
+            rows = db.execute("SELECT * FROM game_sessions WHERE started_at < ? ORDER BY started_at DESC LIMIT ?",
+                              (after, limit))
+        else:
+            rows = db.execute("SELECT * FROM game_sessions ORDER BY started_at DESC LIMIT ?", (limit,))
+        return [dict(row) for row in rows]
+
+
+def get_game_session(session_id):
+    """One session and its events in time order, or None."""
+    with get_hot_db() as db:
+        session = db.execute("SELECT * FROM game_sessions WHERE id = ?", (session_id,)).fetchone()
+        if session is None:
+            return None
+        events = db.execute(
+            """SELECT timestamp, topic, event_name, payload FROM game_events
+               WHERE game_session_id = ? ORDER BY timestamp, id""", (session_id,)
+        ).fetchall()
+        return dict(session, events=[dict(e) for e in events])
+
+
+def get_finished_game_count():
+    with get_hot_db() as db:
+        return db.execute("SELECT count(*) FROM game_sessions WHERE ended_at IS NOT NULL").fetchone()[0]
+
+
+def get_puzzle_splits(exclude_events=()):
+    """
+    (event_name, seconds from game start, seconds since the previous
+    milestone) for the first occurrence of every event in every finished
+    session, computed in one query with a window function.
+    """
+    excluded = ", ".join("?" * len(exclude_events)) or "NULL"
+    with get_hot_db() as db:
+        return db.execute(
+            f"""WITH firsts AS (
+                    SELECT e.game_session_id AS session, e.event_name, min(e.timestamp) AS at
+                    FROM game_events e JOIN game_sessions s ON s.id = e.game_session_id
+                    WHERE s.ended_at IS NOT NULL AND e.event_name NOT IN ({excluded})
+                    GROUP BY 1, 2
+                )
+                SELECT f.event_name,
+                       (julianday(f.at) - julianday(s.started_at)) * 86400 AS from_start,
+                       (julianday(f.at) - julianday(coalesce(
+                           lag(f.at) OVER (PARTITION BY f.session ORDER BY f.at), s.started_at))) * 86400 AS split
+                FROM firsts f JOIN game_sessions s ON s.id = f.session""",
+            list(exclude_events)
+        ).fetchall()
+
+
+def get_session_durations():
+    """(outcome, seconds) for every finished session."""
+    with get_hot_db() as db:
+        return db.execute(
+            """SELECT outcome, (julianday(ended_at) - julianday(started_at)) * 86400
+               FROM game_sessions WHERE ended_at IS NOT NULL"""
+        ).fetchall()
@@ -3,13 +3,20 @@ Grimoire Loader
 ===============
 Reads markdown files from the grimoire/ directory and renders them to HTML.
 When live manifest data exists for a device, it takes priority over static content.
+Rendered documents are cached until the file's mtime or size changes.
 """
 
 import os
 import re
+import threading
 import markdown
+from markdown.extensions.toc import slugify as _slugify
 from datetime import datetime
 
+import config
+import metrics
+from mqtt.lru import BoundedCache
+
 GRIMOIRE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "grimoire")
 
 MD_EXTENSIONS = [
@@ -20,14 +27,60 @@ MD_EXTENSIONS = [
 ]
 
 
+# Rendered documents, parsed device indexes and rendered device sections,
+# each entry stamped with its file's (mtime_ns, size). A stat() per request
+# is all it takes to notice an edited file; the next lookup rebuilds it.
+_rendered = BoundedCache("grimoire_html", config.GRIMOIRE_RENDER_CACHE_SIZE)
+_indexes = BoundedCache("grimoire_index", 8)
+_sections = BoundedCache("grimoire_sections", config.GRIMOIRE_SECTION_CACHE_SIZE)
+_cache_lock = threading.Lock()
+_lookups = {cache.name: {"hits": 0, "misses": 0} for cache in (_rendered, _indexes, _sections)}
+
+
+def _stamp(path: str):
+    """(mtime_ns, size) of a file, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _cached(cache: BoundedCache, key, stamp, build):
+    """cache[key] if it was built from the file version `stamp`, else build() and store it."""
+    with _cache_lock:
+        cached = cache.get(key)
+        hit = cached is not None and cached[0] == stamp
+        _lookups[cache.name]["hits" if hit else "misses"] += 1
+    metrics.CACHE_LOOKUPS.inc(cache.name, "hit" if hit else "miss")
+    if hit:
+        return cached[1]
+    value = build()
+    with _cache_lock:
+        cache[key] = (stamp, value)
+    return value
+
+
+def get_cache_stats() -> dict:
+    """Occupancy, evictions and hit/miss counts of the grimoire caches."""
+    with _cache_lock:
+        return {cache.name: dict(cache.stats(), **_lookups[cache.name])
+                for cache in (_rendered, _indexes, _sections)}
+
+
+def _read(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
 def _render(filename: str) -> str:
-    """Read a markdown file and render it to HTML."""
+    """Read a markdown file and render it to HTML, reusing the last render while the file is unchanged."""
     path = os.path.join(GRIMOIRE_DIR, filename)
-    if not os.path.exists(path):
+    stamp = _stamp(path)
+    if stamp is None:
         return f'<p class="grimoire-missing">⚠️ Document not found: {filename}</p>'
-    with open(path, "r", encoding="utf-8") as f:
-        text = f.read()
-    return markdown.markdown(text, extensions=MD_EXTENSIONS)
+    return _cached(_rendered, (path, tuple(MD_EXTENSIONS)), stamp,
+                   lambda: markdown.markdown(_read(path), extensions=MD_EXTENSIONS))
 
 
 def get_operations_manual() -> str:
@@ -276,155 +329,215 @@ def _room_icon(room: str) -> str:
             return icon
     return "📍"
 
-def get_device_index() -> list:
-    path = os.path.join(GRIMOIRE_DIR, "operations-manual.md")
-    if not os.path.exists(path):
-        return []
 
-    with open(path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
+SKIP_ROOMS = {"TABLE OF CONTENTS", "QUICK REFERENCE", "APPENDIX", "REVISION", "KNOWN ISSUES"}
+SKIP_SECTIONS = {"Overview", "Overview Table", "Compilation", "Logic Errors",
+                 "Protocol", "Ambiguous", "Device Health", "MQTT Broker",
+                 "WiFi Network", "Serial", "Common Commands", "Firmware"}
+_DEVICE_HEADING = _re.compile(r'^(\d+)\.\s+([A-Z][A-Z0-9\-]+)(.*)')
 
-    devices = []
-    current_room = "General"
-    i = 0
 
-    SKIP_ROOMS = {"TABLE OF CONTENTS", "QUICK REFERENCE", "APPENDIX", "REVISION", "KNOWN ISSUES"}
-    SKIP_SECTIONS = {"Overview", "Overview Table", "Compilation", "Logic Errors",
-                     "Protocol", "Ambiguous", "Device Health", "MQTT Broker",
-                     "WiFi Network", "Serial", "Common Commands", "Firmware"}
+def _index_operations_manual(text: str) -> dict:
+    """
+    One pass over operations-manual.md: every numbered ### device heading
+    with its room, aliases, description and the line range of its section.
+    """
+    lines = text.split("\n")
+    devices = {}
+    current_room = "General"
+    heading = None     # slug of the section being read
 
-    while i < len(lines):
-        line = lines[i].rstrip()
+    for i, raw in enumerate(lines):
+        line = raw.rstrip()
+        if not (line.startswith("## ") or line.startswith("### ")):
+            continue
+        if heading is not None:
+            devices[heading]["end"] = i
+            heading = None
 
-        if line.startswith("## ") and not line.startswith("### "):
+        if not line.startswith("### "):
             room_name = line[3:].strip()
             if not any(s in room_name.upper() for s in SKIP_ROOMS):
                 current_room = room_name.title()
-            i += 1
             continue
 
-        if line.startswith("### "):
-            section_title = line[4:].strip()
-            if any(section_title.startswith(s) for s in SKIP_SECTIONS):
-                i += 1
-                continue
+        section_title = line[4:].strip()
+        if any(section_title.startswith(s) for s in SKIP_SECTIONS):
+            continue
+        m = _DEVICE_HEADING.match(section_title)
+        if not m:
+            continue
 
-            m = _re.match(r'^(\d+)\.\s+([A-Z][A-Z0-9\-]+)(.*)', section_title)
-            if not m:
-                i += 1
-                continue
+        device_key = m.group(2)
+        suffix = m.group(3).strip()
+        slug = device_key.lower()
+        if slug in devices:
+            continue    # first heading wins, as a device link always opened the first one
+
+        description = ""
+        in_desc = False
+        for l in lines[i + 1:i + 40]:
+            l = l.rstrip()
+            if "**Description:**" in l:
+                in_desc = True
+            elif in_desc and l.strip() and not l.startswith("#") and not l.startswith("|") and not l.startswith("**") and not l.startswith("-"):
+                description = l.strip()
+                break
 
-            num = int(m.group(1))
-            device_key = m.group(2)
-            suffix = m.group(3).strip()
-            display_name = device_key.replace("-", " ").title()
-            aliases = suffix.strip("()") if suffix.startswith("(") else ""
+        alias_match = _re.search(r'\(([^)]+)\)', section_title)
+        devices[slug] = {
+            "num": int(m.group(1)),
+            "slug": slug,
+            "key": device_key,
+            "name": device_key.replace("-", " ").title(),
+            "aliases": suffix.strip("()") if suffix.startswith("(") else "",
+            "page_aliases": alias_match.group(1) if alias_match else "",
+            "room": current_room,
+            "room_icon": _room_icon(current_room),
+            "description": description,
+            "start": i,
+            "end": len(lines),
+        }
+        heading = slug
 
-            description = ""
-            j = i + 1
-            in_desc = False
-            while j < min(i + 40, len(lines)):
-                l = lines[j].rstrip()
-                if "**Description:**" in l:
-                    in_desc = True
-                elif in_desc and l.strip() and not l.startswith("#") and not l.startswith("|") and not l.startswith("**") and not l.startswith("-"):
-                    description = l.strip()
-                    break
-                j += 1
+    return {"lines": lines, "devices": devices}
 
-            slug = device_key.lower()
-            devices.append({
-                "num": num,
-                "slug": slug,
-                "key": device_key,
-                "name": display_name,
-                "aliases": aliases,
-                "room": current_room,
-                "room_icon": _room_icon(current_room),
-                "description": description,
-            })
 
-        i += 1
+def _index_wiring_reference(text: str) -> dict:
+    """Every ## / ### heading of wiring-reference.md with the line range of its section."""
+    lines = text.split("\n")
+    starts = [i for i, line in enumerate(lines) if line.startswith("## ") or line.startswith("### ")]
+    return {
+        "lines": lines,
+        "headings": [(lines[s].lower(), s, end) for s, end in zip(starts, starts[1:] + [len(lines)])],
+    }
 
-    return devices
 
+_INDEXERS = {
+    "operations-manual.md": _index_operations_manual,
+    "wiring-reference.md": _index_wiring_reference,
+}
 
-def get_device_section(slug: str):
-    path = os.path.join(GRIMOIRE_DIR, "operations-manual.md")
-    if not os.path.exists(path):
-        return None
 
-    with open(path, "r", encoding="utf-8") as f:
-        content = f.read()
+def _document_index(filename: str):
+    """(stamp, index) for a document, re-parsed only when the file changes; None if it is missing."""
+    path = os.path.join(GRIMOIRE_DIR, filename)
+    stamp = _stamp(path)
+    if stamp is None:
+        return None
+    return stamp, _cached(_indexes, path, stamp, lambda: _INDEXERS[filename](_read(path)))
 
-    lines = content.split("\n")
-    slug_upper = slug.upper()
-    start_line = None
-    device_title = ""
-    current_room = "General"
 
-    for i, line in enumerate(lines):
-        if line.startswith("## ") and not line.startswith("### "):
-            current_room = line[3:].strip().title()
-        if line.startswith("### "):
-            pattern = r'^\#\#\# \d+\.\s+' + _re.escape(slug_upper)
-            if _re.match(pattern, line, _re.IGNORECASE):
-                start_line = i
-                device_title = line[4:].strip()
-                break
+def _render_lines(lines: list, start: int, end: int) -> str:
+    return markdown.markdown("\n".join(lines[start:end]), extensions=MD_EXTENSIONS)
 
-    if start_line is None:
-        return None
 
-    section_lines = []
-    for i, line in enumerate(lines):
-        if i < start_line:
-            continue
-        if i > start_line and (line.startswith("### ") or line.startswith("## ")):
-            break
-        section_lines.append(line)
+def get_device_index() -> list:
+    found = _document_index("operations-manual.md")
+    if found is None:
+        return []
+    keys = ("num", "slug", "key", "name", "aliases", "room", "room_icon", "description")
+    return [{k: device[k] for k in keys} for device in found[1]["devices"].values()]
 
-    html = markdown.markdown("\n".join(section_lines), extensions=MD_EXTENSIONS)
 
-    alias_match = _re.search(r'\(([^)]+)\)', device_title)
-    aliases = alias_match.group(1) if alias_match else ""
-    wiring_html = _get_wiring_section(slug_upper)
+def get_device_section(slug: str):
+    found = _document_index("operations-manual.md")
+    if found is None:
+        return None
+    stamp, index = found
+    device = index["devices"].get(slug.lower())
+    if device is None:
+        return None
 
+    html = _cached(_sections, ("operations-manual.md", device["slug"]), stamp,
+                   lambda: _render_lines(index["lines"], device["start"], device["end"]))
     return {
         "slug": slug,
-        "name": slug_upper.replace("-", " ").title(),
-        "room": current_room,
-        "aliases": aliases,
+        "name": device["name"],
+        "room": device["room"],
+        "aliases": device["page_aliases"],
         "html": html,
-        "wiring_html": wiring_html,
+        "wiring_html": _get_wiring_section(device["key"]),
     }
 
 
 def _get_wiring_section(device_key: str) -> str:
-    path = os.path.join(GRIMOIRE_DIR, "wiring-reference.md")
-    if not os.path.exists(path):
+    found = _document_index("wiring-reference.md")
+    if found is None:
         return ""
+    stamp, index = found
+    needle = device_key.lower()
+    for heading, start, end in index["headings"]:
+        if needle in heading:
+            return _cached(_sections, ("wiring-reference.md", needle), stamp,
+                           lambda: _render_lines(index["lines"], start, end))
+    return ""
 
-    with open(path, "r", encoding="utf-8") as f:
-        content = f.read()
 
-    lines = content.split("\n")
-    start_line = None
+# =============================================================================
+# SEARCH INDEX — split library docs into heading sections for FTS5
+# =============================================================================
 
-    for i, line in enumerate(lines):
-        if device_key.lower() in line.lower() and (line.startswith("## ") or line.startswith("### ")):
-            start_line = i
-            break
+# Library documents indexed by /api/search, with the library tab they render in
+SEARCH_DOCS = {
+    "operations-manual.md": "operations",
+    "wiring-reference.md": "wiring",
+    "network-infrastructure.md": "network",
+    "debug-log.md": "debug_history",
+    "code-health-report.md": "code_health",
+    "system-checker-integration.md": "watchtower_doc",
+}
 
-    if start_line is None:
-        return ""
+_HEADING = _re.compile(r"^(#{1,4})\s+(.+?)\s*#*\s*$")
+
+
+def get_search_doc_mtimes() -> dict:
+    """{filename: mtime} for every indexed document that exists."""
+    mtimes = {}
+    for filename in SEARCH_DOCS:
+        path = os.path.join(GRIMOIRE_DIR, filename)
+        if os.path.exists(path):
+            mtimes[filename] = os.path.getmtime(path)
+    return mtimes
 
-    section_lines = []
-    for i, line in enumerate(lines):
-        if i < start_line:
-            continue
-        if i > start_line and (line.startswith("### ") or line.startswith("## ")):
-            break
-        section_lines.append(line)
 
-    return markdown.markdown("\n".join(section_lines), extensions=MD_EXTENSIONS) if section_lines else ""
+def split_sections(filename: str) -> list[dict]:
+    """
+    Split a markdown document at its h1-h4 headings.
+
+    Each section carries the anchor the toc extension gives its heading, so
+    a search hit can link straight to it. Headings inside fenced code blocks
+    are ignored.
+    """
+    path = os.path.join(GRIMOIRE_DIR, filename)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.read().split("\n")
+
+    sections = []
+    heading, body = filename, []
+    in_fence = False
+
+    def flush():
+        text = "\n".join(body).strip()
+        if text:
+            sections.append({
+                "doc": filename,
+                "tab": SEARCH_DOCS.get(filename),
+                "heading": heading,
+                "anchor": _slugify(heading, "-"),
+                "body": text,
+            })
+
+    for line in lines:
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        m = None if in_fence else _HEADING.match(line)
+        if m:
+            flush()
+            heading, body = m.group(2), []
+        else:
+            body.append(line)
+    flush()
+    return sections
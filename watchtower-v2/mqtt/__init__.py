@@ -6,18 +6,30 @@ Ported from V1 system_checker.py with cleaner architecture.
 """
 
 import re
+import random
 import time
 import uuid
 import threading
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from fnmatch import fnmatchcase
+from itertools import islice
 from enum import Enum
 from dataclasses import dataclass, field
-from typing import Dict, Optional, List, Callable
+from typing import Deque, Dict, Optional, List, Callable
 
 import paho.mqtt.client as mqtt
 
 import config
+import device_names
+import metrics
+import games
+from mqtt.commands import CommandTracker
+from mqtt.lru import BoundedCache
+from mqtt.profiler import StageProfiler
+from mqtt.traffic import TrafficStats
 
 logger = logging.getLogger(__name__)
 
@@ -57,16 +69,51 @@ class MQTTClient:
         self.devices: Dict[str, Device] = {}
         self.client: Optional[mqtt.Client] = None
         self.connected = False
-        self.lock = threading.Lock()
+        self.lock = metrics.TimedLock("mqtt_client")
 
         # Message feed (in-memory ring buffer for live UI)
-        self.message_feed: List[dict] = []
+        self.message_feed: Deque[dict] = deque(maxlen=config.MAX_MESSAGES)
         self.max_feed_messages = config.MAX_MESSAGES
 
+        # Per-device and per-room sub-buffers, maintained at ingest so filtered
+        # feed queries never have to scan the global feed
+        self.device_feeds = BoundedCache("device_feeds", config.DEVICE_FEED_MAX_DEVICES)
+        # Keyed by lower-cased room, so ?room=jungle finds the same feed send_bulk targets
+        self.room_feeds: Dict[str, Deque[dict]] = {}
+        self.device_rooms: Dict[str, str] = {}    # registry name -> lower-cased room
+
         # Smart filtering state
         self.recent_sent: List[tuple] = []
-        self.last_values: Dict[str, float] = {}
-        self.last_payloads: Dict[str, str] = {}
+        self.last_values = BoundedCache("last_values", config.FILTER_STATE_MAX_TOPICS,
+                                        config.FILTER_STATE_TTL)
+        self.last_payloads = BoundedCache("last_payloads", config.FILTER_STATE_MAX_TOPICS,
+                                          config.FILTER_STATE_TTL)
+
+        # Per-topic / per-device traffic rates (every message, before filtering)
+        self.traffic = TrafficStats()
+
+        # Opt-in stage timing for _on_message (toggled via /api/profiler)
+        self.profiler = StageProfiler()
+
+        # Every RX/TX message, drained into the day-partitioned mqtt_log by app.py
+        self.log_buffer: Deque[tuple] = deque(maxlen=config.MQTT_LOG_BUFFER)
+
+        # (timestamp, device, status) for every status change, drained by app.py
+        self.status_changes: Deque[tuple] = deque(maxlen=config.STATUS_LOG_BUFFER)
+
+        # (timestamp, topic, payload) for Gravity Games milestones, drained by app.py
+        self.game_events: Deque[tuple] = deque(maxlen=config.GAME_EVENT_BUFFER)
+
+        # Sent commands awaiting a device acknowledgement
+        self.tracker = CommandTracker()
+
+        # Broker outage handling: queued commands, backoff and recovery timing
+        self.outage_queue: Deque = deque()
+        self.outage_history: Deque[dict] = deque(maxlen=config.OUTAGE_HISTORY)
+        self.connected_since: Optional[datetime] = None
+        self.reconnect_attempts = 0
+        self._down_since: Optional[float] = None
+        self._down_at: Optional[datetime] = None
 
         # External callback for new messages (used by SSE)
         self.on_message_callback = on_message_callback
@@ -74,6 +121,13 @@ class MQTTClient:
         # Load devices from config
         self._load_devices()
 
+        # Whatever the history last said, nothing is known about any device yet
+        started = datetime.now()
+        for device in self.devices.values():
+            self.status_changes.append((started, device.name, device.status.value))
+
+        metrics.FEED_MESSAGES.set_function(lambda: len(self.message_feed))
+
     def _load_devices(self):
         """Load device registry from config."""
         for bac in config.BAC_CONTROLLERS:
@@ -98,52 +152,187 @@ class MQTTClient:
                 needs_protocol=esp.get("needs_protocol", False)
             )
 
+        for name, device in self.devices.items():
+            self.device_rooms[name] = device.room.lower()
+
     def connect(self) -> bool:
-        """Connect to MQTT broker."""
+        """
+        Connect to MQTT broker.
+
+        The network thread is started either way: if the broker is down right
+        now, it keeps retrying in the background with capped, jittered backoff.
+        """
         try:
             self.client = mqtt.Client(client_id=f"watchtower_v2_{uuid.uuid4().hex[:8]}")
             self.client.on_connect = self._on_connect
             self.client.on_disconnect = self._on_disconnect
             self.client.on_message = self._on_message
+            self.client.on_publish = self._on_publish
+        except Exception as e:
+            logger.error(f"Failed to create MQTT client: {e}")
+            return False
 
+        connected = True
+        try:
             logger.info(f"Connecting to MQTT broker at {config.MQTT_BROKER}:{config.MQTT_PORT}")
             self.client.connect(config.MQTT_BROKER, config.MQTT_PORT, 60)
-            self.client.loop_start()
-            return True
         except Exception as e:
+            metrics.MQTT_CONNECTION_EVENTS.inc("connect_failed")
             logger.error(f"Failed to connect to MQTT broker: {e}")
-            return False
+            self._mark_down()
+            connected = False
+
+        threading.Thread(target=self._network_loop, name="mqtt-network", daemon=True).start()
+        return connected
+
+    def _network_loop(self):
+        """Drive the paho client; on any connection loss, reconnect with backoff."""
+        while True:
+            rc = self.client.loop(timeout=1.0)
+            if rc == mqtt.MQTT_ERR_SUCCESS:
+                continue
+
+            delay = self._backoff_delay(self.reconnect_attempts)
+            self.reconnect_attempts += 1
+            logger.info(f"MQTT reconnect attempt {self.reconnect_attempts} in {delay:.1f}s")
+            time.sleep(delay)
+            metrics.MQTT_CONNECTION_EVENTS.inc("reconnect_attempt")
+            try:
+                self.client.reconnect()
+            except Exception as e:
+                logger.warning(f"MQTT reconnect failed: {e}")
+
+    @staticmethod
+    def _backoff_delay(attempt: int) -> float:
+        """Exponential backoff capped at MQTT_RECONNECT_MAX, with equal jitter."""
+        ceiling = min(config.MQTT_RECONNECT_MAX, config.MQTT_RECONNECT_MIN * (2 ** min(attempt, 16)))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    def _mark_down(self):
+        if self._down_since is None:
+            self._down_since = time.monotonic()
+            self._down_at = datetime.now()
 
     def _on_connect(self, client, userdata, flags, rc):
         if rc == 0:
             self.connected = True
+            metrics.MQTT_CONNECTION_EVENTS.inc("connect")
+            metrics.MQTT_CONNECTED.set(1)
             logger.info("Connected to MQTT broker")
+            self.connected_since = datetime.now()
+            attempts, self.reconnect_attempts = self.reconnect_attempts, 0
             # Subscribe to everything for the live feed
             client.subscribe("#")
             # Specific subscriptions for device responses
             client.subscribe("MermaidsTale/+/status")
             client.subscribe("MermaidsTale/+/command")
             client.subscribe("+/get/#")
+
+            if self._down_since is not None:
+                outage = {
+                    "disconnected_at": self._down_at.isoformat(),
+                    "reconnected_at": self.connected_since.isoformat(),
+                    "outage_s": round(time.monotonic() - self._down_since, 2),
+                    "reconnect_attempts": attempts,
+                }
+                threading.Thread(target=self._recover, args=(outage, self._down_since),
+                                 name="mqtt-recover", daemon=True).start()
+                self._down_since = None
         else:
+            metrics.MQTT_CONNECTION_EVENTS.inc("connect_failed")
             logger.error(f"MQTT connection failed with code {rc}")
 
     def _on_disconnect(self, client, userdata, rc):
         self.connected = False
+        self.connected_since = None
+        self._mark_down()
+        metrics.MQTT_CONNECTION_EVENTS.inc("disconnect")
+        metrics.MQTT_CONNECTED.set(0)
         logger.warning(f"Disconnected from MQTT broker (rc={rc})")
 
+    def _recover(self, outage: dict, down_since: float):
+        """After a reconnect: replay queued commands, then re-probe every device."""
+        outage["replayed"], outage["expired"] = self._replay_outage_queue()
+
+        reprobe_started = time.monotonic()
+        for name in list(self.devices):
+            if not self.connected:
+                break
+            self.ping_device(name)
+            time.sleep(config.REPROBE_STAGGER)
+
+        stop_at = time.monotonic() + max(config.ESP32_PING_TIMEOUT, config.BAC_PING_TIMEOUT)
+        while time.monotonic() < stop_at:
+            self.check_timeouts()
+            with self.lock:
+                testing = any(d.status == DeviceStatus.TESTING for d in self.devices.values())
+            if not testing:
+                break
+            time.sleep(0.1)
+
+        with self.lock:
+            outage["devices_online"] = sum(1 for d in self.devices.values() if d.status == DeviceStatus.ONLINE)
+            outage["reprobe_s"] = round(time.monotonic() - reprobe_started, 2)
+            # Time to recover: broker drop until every device has been re-probed
+            outage["recovered_s"] = round(time.monotonic() - down_since, 2)
+            self.outage_history.append(outage)
+        logger.info(f"MQTT recovered in {outage['recovered_s']}s "
+                    f"({outage['replayed']} replayed, {outage['devices_online']} devices online)")
+
+    def _replay_outage_queue(self) -> tuple:
+        with self.lock:
+            queued = list(self.outage_queue)
+            self.outage_queue.clear()
+
+        replayed = expired = 0
+        for tracked in queued:
+            age = (datetime.now() - tracked.queued_at).total_seconds()
+            if age > config.OUTAGE_QUEUE_MAX_AGE:
+                self.tracker.fail(tracked, f"Expired in outage queue after {age:.0f}s")
+                expired += 1
+                continue
+            self.tracker.mark_sent(tracked)
+            self._publish_command(tracked)
+            replayed += 1
+        return replayed, expired
+
+    def _on_publish(self, client, userdata, mid):
+        """Broker PUBACK for a QoS 1 publish."""
+        self.tracker.mark_delivered(mid)
+
     def _on_message(self, client, userdata, msg):
         """Handle incoming MQTT messages."""
+        started = time.perf_counter()
         topic = msg.topic
+        sample = self.profiler.sample(topic)
         try:
             payload = msg.payload.decode("utf-8").strip()
         except:
             payload = str(msg.payload)
+        if sample:
+            sample.mark("decode")
 
         now = datetime.now()
+        device_name = self._extract_device_name(topic)
+        self.traffic.record(topic, device_name, len(msg.payload))
+        if config.MQTT_LOG_ENABLED:
+            self.log_buffer.append((now, "RX", topic, payload, device_name))
+        if topic in games.RECORDED_TOPICS:
+            if len(self.game_events) == self.game_events.maxlen:
+                metrics.BUFFER_DROPS.inc("game_events")
+                logger.warning(f"Game event buffer full - oldest milestone dropped for {topic}")
+            self.game_events.append((now, topic, payload))
+        metrics.MQTT_MESSAGES.inc("rx")
+        metrics.MQTT_BYTES.inc("rx", amount=len(msg.payload))
+        if sample:
+            sample.mark("stats")
 
         # Add to feed if it passes filters
-        if self._should_show_message(topic, payload):
-            device_name = self._extract_device_name(topic)
+        show = self._should_show_message(topic, payload)
+        if sample:
+            sample.mark("filter")
+
+        if show:
             message = {
                 "timestamp": now.strftime("%H:%M:%S"),
                 "timestamp_full": now.isoformat(),
@@ -152,19 +341,26 @@ class MQTTClient:
                 "payload": payload[:200] if payload else "",
                 "device": device_name
             }
-            with self.lock:
-                self.message_feed.insert(0, message)
-                if len(self.message_feed) > self.max_feed_messages:
-                    self.message_feed.pop()
+            self._append_feed(message)
+            if sample:
+                sample.mark("feed_insert")
 
             if self.on_message_callback:
                 try:
                     self.on_message_callback(message)
                 except:
                     pass
+                if sample:
+                    sample.mark("callback")
 
         # Process device health responses
         self._process_device_response(topic, payload, now)
+        if self.tracker.pending_count:
+            self._process_command_ack(topic, payload, device_name)
+        metrics.MQTT_HANDLE_SECONDS.observe(time.perf_counter() - started)
+        if sample:
+            sample.mark("device_response")
+            self.profiler.finish(sample)
 
     def _process_device_response(self, topic: str, payload: str, now: datetime):
         """Check if message is a response to a ping or a BAC heartbeat."""
@@ -177,7 +373,7 @@ class MQTTClient:
                        (device.topic_base.lower() in topic.lower() and "/get/" in topic.lower()):
                         if device.status != DeviceStatus.ONLINE:
                             logger.info(f"✓ BAC {device_name} heartbeat detected")
-                        device.status = DeviceStatus.ONLINE
+                        self._set_status(device, DeviceStatus.ONLINE, now)
                         device.last_error = None
                         device.last_test = now
                         continue
@@ -200,20 +396,30 @@ class MQTTClient:
                     if device.last_test:
                         response_ms = int((now - device.last_test).total_seconds() * 1000)
                         device.response_time_ms = response_ms
-                    device.status = DeviceStatus.ONLINE
+                    self._set_status(device, DeviceStatus.ONLINE, now)
                     device.last_error = None
                     logger.info(f"✓ {device_name} responded ({device.response_time_ms}ms)")
                     return
 
+    def _process_command_ack(self, topic: str, payload: str, device_name: Optional[str]):
+        """Match a device response to the oldest pending command it answers."""
+        if not device_name:
+            return
+        cmd = self.tracker.resolve(device_name, topic, payload)
+        if cmd:
+            logger.info(f"✓ {device_name} acked {cmd.command} ({cmd.ack_ms}ms): {payload[:40]}")
+
     def _should_show_message(self, topic: str, payload: str) -> bool:
         """Smart filtering - ported from V1."""
         # Only show device-related topics
         if not ("MermaidsTale" in topic or
                 any(d in topic for d in ["Shattic", "Captain", "Cove", "Jungle"])):
+            metrics.MQTT_FILTERED.inc("not_device")
             return False
 
         # Hidden topics (heartbeats)
         if any(pattern in topic for pattern in config.HIDDEN_TOPICS):
+            metrics.MQTT_FILTERED.inc("hidden")
             return False
 
         # Echo suppression
@@ -221,6 +427,7 @@ class MQTTClient:
             for sent_topic, sent_payload in self.recent_sent:
                 if sent_topic == topic and sent_payload == payload:
                     self.recent_sent.remove((sent_topic, sent_payload))
+                    metrics.MQTT_FILTERED.inc("echo")
                     return False
 
         # Duplicate suppression
@@ -229,6 +436,7 @@ class MQTTClient:
                 last = self.last_payloads.get(topic)
                 self.last_payloads[topic] = payload
                 if last == payload:
+                    metrics.MQTT_FILTERED.inc("duplicate")
                     return False
 
         # Delta filtering for sensor data
@@ -240,6 +448,7 @@ class MQTTClient:
                     with self.lock:
                         last_val = self.last_values.get(topic)
                         if last_val is not None and abs(value - last_val) < config.DELTA_THRESHOLD:
+                            metrics.MQTT_FILTERED.inc("delta")
                             return False
                         self.last_values[topic] = value
             except (ValueError, IndexError):
@@ -248,12 +457,12 @@ class MQTTClient:
         return True
 
     def _extract_device_name(self, topic: str) -> Optional[str]:
-        """Extract device name from MQTT topic."""
+        """Extract the canonical device ID from an MQTT topic."""
         parts = topic.split("/")
         if len(parts) > 1 and parts[0] == "MermaidsTale":
-            return parts[1]
+            return device_names.canonical(parts[1])
         elif len(parts) > 0:
-            return parts[0]
+            return device_names.canonical(parts[0])
         return None
 
     # =========================================================================
@@ -262,13 +471,14 @@ class MQTTClient:
 
     def ping_device(self, device_name: str) -> bool:
         """Send a ping to a specific device."""
+        device_name = device_names.canonical(device_name)
         if device_name not in self.devices or not self.connected:
             return False
 
         device = self.devices[device_name]
         with self.lock:
-            device.status = DeviceStatus.TESTING
             device.last_test = datetime.now()
+            self._set_status(device, DeviceStatus.TESTING, device.last_test)
             device.response_time_ms = None
 
         if device.device_type == DeviceType.ESP32:
@@ -286,41 +496,179 @@ class MQTTClient:
         for name in self.devices:
             self.ping_device(name)
 
-    def send_command(self, device_name: str, command: str) -> dict:
-        """Send a command to a device."""
+    def send_command(self, device_name: str, command: str, qos: int = 0) -> dict:
+        """
+        Send a command to a device and start tracking its acknowledgement.
+
+        The returned `command_id` can be looked up with get_command() or
+        waited on with wait_for_command(). qos 1 or 2 is passed to the broker
+        as is and the command is marked delivered once the broker confirms it.
+        """
+        device_name = device_names.canonical(device_name)
         if device_name not in self.devices:
             return {"error": f"Unknown device: {device_name}"}
-        if not self.connected:
+        if not self.client:
             return {"error": "MQTT not connected"}
+        if qos not in (0, 1, 2):
+            return {"error": f"Invalid qos: {qos}"}
 
         device = self.devices[device_name]
 
         if device.device_type == DeviceType.ESP32:
             topic = f"MermaidsTale/{device.topic_base}/command"
+            ack_topic = f"MermaidsTale/{device.topic_base}/status"
+            timeout = config.COMMAND_ACK_TIMEOUT
+            ack_payloads = config.COMMAND_ACK_PAYLOADS.get(command.upper(), ("OK", command.upper()))
         else:
             topic = f"{device.topic_base}/set/{command.lower()}"
+            ack_topic = f"{device.topic_base}/get/{command.lower()}"
+            timeout = config.BAC_PING_TIMEOUT
+            ack_payloads = None     # the /get/<command> topic only carries this command's answer
 
-        self.client.publish(topic, command)
-        self._track_sent(topic, command)
+        # Broker down: hold the command and replay it on reconnect
+        if not self.connected:
+            tracked = self.tracker.track(device_name, command, topic, ack_topic, qos, timeout,
+                                         queued=True, ack_payloads=ack_payloads)
+            with self.lock:
+                if len(self.outage_queue) >= config.OUTAGE_QUEUE_SIZE:
+                    dropped = self.outage_queue.popleft()
+                    self.tracker.fail(dropped, "Dropped: outage queue full")
+                self.outage_queue.append(tracked)
+            logger.warning(f"⏸ Broker down - queued {command} for {device_name}")
+            return {"device": device_name, "command": command, "topic": topic, "sent": False,
+                    "queued": True, "command_id": tracked.id, "qos": qos}
+
+        tracked = self.tracker.track(device_name, command, topic, ack_topic, qos, timeout,
+                                     ack_payloads=ack_payloads)
+        if not self._publish_command(tracked):
+            return {"device": device_name, "command": command, "topic": topic, "sent": False,
+                    "command_id": tracked.id, "error": tracked.error}
+
+        return {"device": device_name, "command": command, "topic": topic, "sent": True,
+                "command_id": tracked.id, "qos": qos}
+
+    def _publish_command(self, tracked) -> bool:
+        """Publish a tracked command and add it to the feed as TX."""
+        info = self.client.publish(tracked.topic, tracked.command, qos=tracked.qos)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            self.tracker.fail(tracked, mqtt.error_string(info.rc))
+            return False
+        self.tracker.set_mid(tracked, info.mid)
+        self._track_sent(tracked.topic, tracked.command)
 
         # Add TX to feed
         message = {
             "timestamp": datetime.now().strftime("%H:%M:%S"),
             "timestamp_full": datetime.now().isoformat(),
             "direction": "TX",
-            "topic": topic,
-            "payload": command,
-            "device": device_name
+            "topic": tracked.topic,
+            "payload": tracked.command,
+            "device": tracked.device
         }
-        with self.lock:
-            self.message_feed.insert(0, message)
-            if len(self.message_feed) > self.max_feed_messages:
-                self.message_feed.pop()
+        self._append_feed(message)
+        return True
 
-        return {"device": device_name, "command": command, "topic": topic, "sent": True}
+    def send_bulk(self, command: str, devices: Optional[List[str]] = None, room: Optional[str] = None,
+                  ordered: bool = False, qos: int = 0, deadline: Optional[float] = None,
+                  concurrency: Optional[int] = None) -> dict:
+        """
+        Send one command to a room, a list of devices, or every device.
+
+        Commands go out with at most `concurrency` awaiting an ack at once, and
+        acks are collected in parallel against a single `deadline` for the
+        whole fan-out. With `ordered`, devices matching BULK_LAST_KEYWORDS
+        (the doors) are only sent to after every other prop has answered or
+        timed out; each stage gets an equal share of the time left, so one
+        dead prop can't starve the doors. Commands still pending at the
+        deadline keep being tracked and show up in /api/commands.
+        """
+        if not self.connected:
+            return {"error": "MQTT not connected"}
+
+        deadline = deadline or config.BULK_COMMAND_DEADLINE
+        concurrency = max(1, concurrency or config.BULK_COMMAND_CONCURRENCY)
+        started = time.monotonic()
+        stop_at = started + deadline
+
+        results: Dict[str, dict] = {}
+        if devices:
+            targets = []
+            for name in devices:
+                name = device_names.canonical(name)
+                if name in targets or name in results:
+                    continue
+                if name in self.devices:
+                    targets.append(name)
+                else:
+                    results[name] = {"status": "failed", "error": f"Unknown device: {name}"}
+        elif room:
+            targets = [name for name, d in self.devices.items() if d.room.lower() == room.lower()]
+        else:
+            targets = list(self.devices)
+
+        if ordered:
+            last = [n for n in targets if any(k.lower() in n.lower() for k in config.BULK_LAST_KEYWORDS)]
+            stages = [("props", [n for n in targets if n not in last]), ("last", last)]
+        else:
+            stages = [("all", targets)]
+
+        def send_and_wait(name: str, stage_stop: float) -> dict:
+            if time.monotonic() >= stage_stop:
+                return {"status": "skipped", "error": "Deadline reached before send"}
+            sent = self.send_command(name, command, qos=qos)
+            if not sent.get("sent"):
+                return {"status": "failed", "error": sent.get("error"), "command_id": sent.get("command_id")}
+            result = self.wait_for_command(sent["command_id"], max(0.0, stage_stop - time.monotonic()))
+            return result or {"status": "failed", "error": "Command not tracked"}
+
+        stages = [(stage_name, names) for stage_name, names in stages if names]
+        stage_report = []
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bulk-cmd") as pool:
+            for index, (stage_name, names) in enumerate(stages):
+                stage_started = time.monotonic()
+                stage_stop = stage_started + (stop_at - stage_started) / (len(stages) - index)
+                stage_results = pool.map(lambda n: send_and_wait(n, stage_stop), names)
+                for name, result in zip(names, stage_results):
+                    result["stage"] = stage_name
+                    results[name] = result
+                stage_report.append({
+                    "stage": stage_name,
+                    "devices": len(names),
+                    "acked": sum(1 for n in names if results[n].get("status") == "acked"),
+                    "elapsed_ms": round((time.monotonic() - stage_started) * 1000, 1),
+                })
+
+        counts = {"acked": 0, "pending": 0, "timeout": 0, "failed": 0, "skipped": 0}
+        for result in results.values():
+            status = result.get("status", "failed")
+            counts[status] = counts.get(status, 0) + 1
+
+        logger.info(f"→ Bulk {command} to {len(results)} device(s): {counts['acked']} acked "
+                    f"in {(time.monotonic() - started) * 1000:.0f}ms")
+        return {
+            "command": command,
+            "targets": len(results),
+            "ordered": ordered,
+            "deadline_s": deadline,
+            "concurrency": concurrency,
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+            "counts": counts,
+            "stages": stage_report,
+            "results": results,
+        }
+
+    def get_command(self, command_id: str) -> Optional[dict]:
+        """Current state of a tracked command."""
+        return self.tracker.get(command_id)
+
+    def wait_for_command(self, command_id: str, timeout: float) -> Optional[dict]:
+        """Block up to `timeout` seconds for a command to be acked or time out."""
+        cmd = self.tracker.wait(command_id, timeout)
+        return cmd.to_dict() if cmd else None
 
     def check_timeouts(self):
-        """Mark devices as offline if they didn't respond in time."""
+        """Mark devices as offline and commands as unacked if they didn't respond in time."""
+        self.tracker.expire()
         now = datetime.now()
         with self.lock:
             for device in self.devices.values():
@@ -328,7 +676,7 @@ class MQTTClient:
                     elapsed = (now - device.last_test).total_seconds()
                     timeout = config.BAC_PING_TIMEOUT if device.device_type == DeviceType.BAC else config.ESP32_PING_TIMEOUT
                     if elapsed > timeout:
-                        device.status = DeviceStatus.OFFLINE
+                        self._set_status(device, DeviceStatus.OFFLINE, now)
                         device.last_error = "No response"
 
     def get_status_summary(self) -> dict:
@@ -363,13 +711,124 @@ class MQTTClient:
 
         return summary
 
-    def get_feed(self, limit=50) -> list:
-        """Get recent messages from the feed."""
+    def get_connection_status(self) -> dict:
+        """Broker connection state, outage queue and recent recovery times."""
+        with self.lock:
+            history = list(self.outage_history)
+            queued = len(self.outage_queue)
+        down_for = round(time.monotonic() - self._down_since, 1) if self._down_since is not None else None
+        return {
+            "connected": self.connected,
+            "broker_host": config.MQTT_BROKER,
+            "broker_port": config.MQTT_PORT,
+            "connected_since": self.connected_since.isoformat() if self.connected_since else None,
+            "disconnected_at": self._down_at.isoformat() if down_for is not None else None,
+            "down_for_s": down_for,
+            "reconnect_attempts": self.reconnect_attempts,
+            "queued_commands": queued,
+            "outages": history,
+            "last_recovery_s": history[-1]["recovered_s"] if history else None,
+        }
+
+    def _set_status(self, device: Device, status: DeviceStatus, now: datetime):
+        """Change a device's status, queueing the transition for the status history. Call under self.lock."""
+        if device.status != status:
+            device.status = status
+            self.status_changes.append((now, device.name, status.value))
+
+    def drain_status_changes(self) -> list:
+        """Take every queued status change for the status history writer."""
+        rows = []
+        while True:
+            try:
+                rows.append(self.status_changes.popleft())
+            except IndexError:
+                return rows
+
+    def drain_game_events(self) -> list:
+        """Take every queued game milestone for the game event writer."""
+        rows = []
+        while True:
+            try:
+                rows.append(self.game_events.popleft())
+            except IndexError:
+                return rows
+
+    def drain_log_buffer(self) -> list:
+        """Take every buffered message for the mqtt_log writer."""
+        rows = []
+        while True:
+            try:
+                rows.append(self.log_buffer.popleft())
+            except IndexError:
+                return rows
+
+    def get_cache_stats(self) -> dict:
+        """Size, limits and eviction counts of the bounded per-topic caches."""
+        with self.lock:
+            return {cache.name: cache.stats()
+                    for cache in (self.last_values, self.last_payloads, self.device_feeds)}
+
+    def get_feed(self, limit=50, device=None, room=None, direction=None, topic=None) -> list:
+        """
+        Get recent messages from the feed, newest first.
+
+        Device and room filters read straight from the per-device / per-room
+        buffers, so `device=JungleDoor` costs O(limit) regardless of how busy
+        the rest of the building is. `topic` is a shell-style glob
+        (e.g. `MermaidsTale/Cannon*/status`).
+        """
+        device_key = device_names.canonical(device) if device else None
+        direction = direction.upper() if direction else None
+        room = room.lower() if room else None
+
+        with self.lock:
+            if device_key:
+                source = self.device_feeds.get(device_key, ())
+            elif room:
+                source = self.room_feeds.get(room, ())
+            else:
+                source = self.message_feed
+
+            if not direction and not topic and not (device_key and room):
+                return list(islice(source, limit))
+
+            results = []
+            for message in source:
+                if direction and message["direction"] != direction:
+                    continue
+                if topic and not fnmatchcase(message["topic"], topic):
+                    continue
+                if device_key and room and self.device_rooms.get(message["device"]) != room:
+                    continue
+                results.append(message)
+                if len(results) >= limit:
+                    break
+            return results
+
+    def _append_feed(self, message: dict):
+        """Add a message to the live feed and its device/room indexes."""
+        device = message.get("device")
+        room = self.device_rooms.get(device) if device else None
+
         with self.lock:
-            return self.message_feed[:limit]
+            self.message_feed.appendleft(message)
+            if device:
+                feed = self.device_feeds.get_or_create(
+                    device, lambda: deque(maxlen=config.DEVICE_FEED_MESSAGES))
+                feed.appendleft(message)
+            if room:
+                feed = self.room_feeds.get(room)
+                if feed is None:
+                    feed = self.room_feeds[room] = deque(maxlen=config.ROOM_FEED_MESSAGES)
+                feed.appendleft(message)
 
     def _track_sent(self, topic, payload):
         """Track sent messages for echo suppression."""
+        metrics.MQTT_MESSAGES.inc("tx")
+        metrics.MQTT_BYTES.inc("tx", amount=len(payload))
+        if config.MQTT_LOG_ENABLED:
+            self.log_buffer.append((datetime.now(), "TX", topic, payload, self._extract_device_name(topic)))
         with self.lock:
             self.recent_sent.insert(0, (topic, payload))
             if len(self.recent_sent) > 20:
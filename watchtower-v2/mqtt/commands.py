@@ -0,0 +1,261 @@
+"""
+WatchTower V2 Command Tracking
+================================
+Gives every command sent through MQTTClient.send_command an ID and follows
+it until the prop answers (or doesn't).
+
+A command is `pending` until a matching response arrives, then `acked` with
+the command→ack latency recorded, or `timeout` once its deadline passes.
+ESP32 props answer on MermaidsTale/<Device>/status with the reply
+config.COMMAND_ACK_PAYLOADS expects (OK, PUZZLE_RESET, ...), PINGs with PONG
+on the command topic; BACs answer on <Device>/get/<command>.
+With QoS 1 the broker's PUBACK is recorded separately as `delivered`, so a
+missing ack can be told apart from a message that never left WatchTower.
+Commands issued while the broker is down start out `queued` and keep their
+original ID and queue time when they are replayed after reconnect.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Deque, Dict, Optional
+
+import config
+
+
+@dataclass
+class TrackedCommand:
+    id: str
+    device: str
+    command: str
+    topic: str
+    ack_topic: str
+    qos: int
+    timeout: float
+    sent_at: datetime
+    sent_monotonic: float
+    status: str = "pending"          # [queued ->] pending -> acked | timeout | failed
+    queued_at: Optional[datetime] = None
+    mid: Optional[int] = None
+    delivered_ms: Optional[float] = None
+    ack_payload: Optional[str] = None
+    ack_ms: Optional[float] = None
+    error: Optional[str] = None
+    ack_payloads: Optional[tuple] = None   # accepted replies on ack_topic; None = any
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def matches(self, topic: str, payload: str) -> bool:
+        if payload == "PONG":
+            # Every PING gets a PONG, including pings sent outside the tracker
+            # (ping_device, checklist sweep, reconnect probe), so only a PING takes it
+            return self.command.upper() == "PING" and topic in (self.topic, self.ack_topic)
+        if topic != self.ack_topic or payload.startswith("HEARTBEAT"):
+            return False
+        if self.ack_payloads is None:
+            return True
+        reply = payload.upper()
+        return any(reply == p or reply.startswith(p + ":") for p in self.ack_payloads)
+
+    def to_dict(self) -> dict:
+        return {
+            "command_id": self.id,
+            "device": self.device,
+            "command": self.command,
+            "topic": self.topic,
+            "qos": self.qos,
+            "sent_at": self.sent_at.isoformat() if self.status != "queued" else None,
+            "queued_at": self.queued_at.isoformat() if self.queued_at else None,
+            "queued_ms": round((self.sent_at - self.queued_at).total_seconds() * 1000, 1)
+            if self.queued_at and self.status != "queued" else None,
+            "status": self.status,
+            "delivered": self.delivered_ms is not None,
+            "delivered_ms": self.delivered_ms,
+            "ack_payload": self.ack_payload,
+            "ack_ms": self.ack_ms,
+            "error": self.error,
+        }
+
+
+def _new_device_stats() -> dict:
+    return {"sent": 0, "acked": 0, "timeouts": 0, "failed": 0,
+            "latency_total_ms": 0.0, "min_ms": None, "max_ms": None, "last_ms": None}
+
+
+class CommandTracker:
+    """Correlates sent commands with device acknowledgements."""
+
+    def __init__(self, history: int = config.COMMAND_HISTORY):
+        self.lock = threading.Lock()
+        self.history = history
+        self.commands: "OrderedDict[str, TrackedCommand]" = OrderedDict()
+        self.pending: Dict[str, Deque[TrackedCommand]] = {}
+        self.pending_count = 0
+        self.by_mid: Dict[int, TrackedCommand] = {}
+        self._early_mids: Dict[int, float] = {}
+        self.device_stats: Dict[str, dict] = {}
+
+    def track(self, device: str, command: str, topic: str, ack_topic: str,
+              qos: int, timeout: float, queued: bool = False,
+              ack_payloads: Optional[tuple] = None) -> TrackedCommand:
+        """
+        Register a command. `queued` commands wait for mark_sent() before their
+        ack clock starts; `ack_payloads` limits which replies on ack_topic count.
+        """
+        cmd = TrackedCommand(
+            id=uuid.uuid4().hex[:12],
+            device=device,
+            command=command,
+            topic=topic,
+            ack_topic=ack_topic,
+            qos=qos,
+            timeout=timeout,
+            sent_at=datetime.now(),
+            sent_monotonic=time.monotonic(),
+            ack_payloads=ack_payloads,
+        )
+        if queued:
+            cmd.status = "queued"
+            cmd.queued_at = cmd.sent_at
+        with self.lock:
+            self.commands[cmd.id] = cmd
+            while len(self.commands) > self.history:
+                _, old = self.commands.popitem(last=False)
+                if old.mid is not None:
+                    self.by_mid.pop(old.mid, None)
+            self.device_stats.setdefault(device, _new_device_stats())
+            if not queued:
+                self._add_pending(cmd)
+        return cmd
+
+    def mark_sent(self, cmd: TrackedCommand):
+        """A queued command has been published; start waiting for its ack."""
+        with self.lock:
+            cmd.status = "pending"
+            cmd.sent_at = datetime.now()
+            cmd.sent_monotonic = time.monotonic()
+            self._add_pending(cmd)
+
+    def _add_pending(self, cmd: TrackedCommand):
+        self.pending.setdefault(cmd.device, deque()).append(cmd)
+        self.pending_count += 1
+        self.device_stats[cmd.device]["sent"] += 1
+
+    def set_mid(self, cmd: TrackedCommand, mid: int):
+        """Record the paho message id so a QoS 1 PUBACK can be matched."""
+        with self.lock:
+            cmd.mid = mid
+            acked_at = self._early_mids.pop(mid, None)
+            if acked_at is not None:
+                cmd.delivered_ms = round((acked_at - cmd.sent_monotonic) * 1000, 1)
+            elif cmd.qos > 0:
+                self.by_mid[mid] = cmd
+
+    def mark_delivered(self, mid: int):
+        now = time.monotonic()
+        with self.lock:
+            cmd = self.by_mid.pop(mid, None)
+            if cmd is None:
+                # PUBACK raced ahead of set_mid(); remember it briefly
+                self._early_mids[mid] = now
+                if len(self._early_mids) > self.history:
+                    self._early_mids.pop(next(iter(self._early_mids)))
+                return
+            cmd.delivered_ms = round((now - cmd.sent_monotonic) * 1000, 1)
+
+    def resolve(self, device: str, topic: str, payload: str) -> Optional[TrackedCommand]:
+        """Ack the oldest pending command for `device` that this message answers."""
+        now = time.monotonic()
+        with self.lock:
+            queue = self.pending.get(device)
+            if not queue:
+                return None
+            for cmd in queue:
+                if cmd.matches(topic, payload):
+                    break
+            else:
+                return None
+            queue.remove(cmd)
+            self.pending_count -= 1
+            cmd.status = "acked"
+            cmd.ack_payload = payload[:200]
+            cmd.ack_ms = round((now - cmd.sent_monotonic) * 1000, 1)
+
+            stats = self.device_stats[device]
+            stats["acked"] += 1
+            stats["latency_total_ms"] += cmd.ack_ms
+            stats["last_ms"] = cmd.ack_ms
+            stats["min_ms"] = cmd.ack_ms if stats["min_ms"] is None else min(stats["min_ms"], cmd.ack_ms)
+            stats["max_ms"] = cmd.ack_ms if stats["max_ms"] is None else max(stats["max_ms"], cmd.ack_ms)
+        cmd.done.set()
+        return cmd
+
+    def fail(self, cmd: TrackedCommand, error: str):
+        with self.lock:
+            queue = self.pending.get(cmd.device)
+            if queue and cmd in queue:
+                queue.remove(cmd)
+                self.pending_count -= 1
+            cmd.status = "failed"
+            cmd.error = error
+            self.device_stats[cmd.device]["failed"] += 1
+        cmd.done.set()
+
+    def expire(self):
+        """Time out pending commands whose deadline has passed."""
+        if not self.pending_count:
+            return
+        now = time.monotonic()
+        expired = []
+        with self.lock:
+            for device, queue in self.pending.items():
+                while queue and now - queue[0].sent_monotonic > queue[0].timeout:
+                    cmd = queue.popleft()
+                    self.pending_count -= 1
+                    cmd.status = "timeout"
+                    cmd.error = "No acknowledgement"
+                    self.device_stats[device]["timeouts"] += 1
+                    expired.append(cmd)
+        for cmd in expired:
+            cmd.done.set()
+
+    def wait(self, command_id: str, timeout: float) -> Optional[TrackedCommand]:
+        """Block until the command is acked, failed or timed out (or `timeout`)."""
+        with self.lock:
+            cmd = self.commands.get(command_id)
+        if cmd is not None and cmd.status == "pending":
+            cmd.done.wait(timeout)
+        return cmd
+
+    def get(self, command_id: str) -> Optional[dict]:
+        with self.lock:
+            cmd = self.commands.get(command_id)
+            return cmd.to_dict() if cmd else None
+
+    def recent(self, device: Optional[str] = None, limit: int = 50) -> list:
+        with self.lock:
+            results = []
+            for cmd in reversed(self.commands.values()):
+                if device and cmd.device != device:
+                    continue
+                results.append(cmd.to_dict())
+                if len(results) >= limit:
+                    break
+            return results
+
+    def stats(self, device: Optional[str] = None) -> dict:
+        with self.lock:
+            if device:
+                names = [device] if device in self.device_stats else []
+            else:
+                names = list(self.device_stats)
+            out = {}
+            for name in names:
+                stats = self.device_stats[name]
+                entry = {k: v for k, v in stats.items() if k != "latency_total_ms"}
+                entry["pending"] = len(self.pending.get(name, ()))
+                entry["avg_ms"] = round(stats["latency_total_ms"] / stats["acked"], 1) if stats["acked"] else None
+                out[name] = entry
+            return out
@@ -0,0 +1,81 @@
+"""
+WatchTower V2 Bounded Caches
+=============================
+Size-bounded, time-aware LRU mapping for per-topic state in the MQTT client.
+
+With `#` subscribed, every distinct topic name a device ever publishes would
+otherwise become a permanent dict key. BoundedCache evicts the least recently
+used entry once `maxsize` is reached and drops entries older than `ttl`
+seconds on access, counting both so the soak behaviour is visible on /metrics.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import metrics
+
+_MISSING = object()
+
+
+class BoundedCache:
+    """LRU dict with a hard size limit and an optional per-entry TTL."""
+
+    def __init__(self, name: str, maxsize: int, ttl: Optional[float] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            return default
+        value, stamp = item
+        if self.ttl is not None and time.monotonic() - stamp > self.ttl:
+            del self._data[key]
+            self.expirations += 1
+            metrics.CACHE_EVICTIONS.inc(self.name, "ttl")
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+            metrics.CACHE_EVICTIONS.inc(self.name, "size")
+
+    def get_or_create(self, key, factory: Callable[[], Any]):
+        """Return the value for `key`, inserting `factory()` if it is missing or expired."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self[key] = value
+        return value
+
+    def pop(self, key, default=None):
+        item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[0]
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def keys(self) -> list:
+        return list(self._data.keys())
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_s": self.ttl,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,134 @@
+"""
+WatchTower V2 Message-Path Profiler
+=====================================
+Opt-in, sampled stage timing for MQTTClient._on_message.
+
+When enabled, 1 in `sample_every` messages carries a Sample through the
+handler; each stage boundary calls `sample.mark(stage)`, which costs one
+perf_counter() read. Disabled, the only overhead is an attribute check.
+The report gives per-stage percentiles plus the slowest recent messages
+with their topics, so a lagging dashboard can be pinned to a filter rule,
+a callback or a device.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Optional
+
+import config
+
+
+class Sample:
+    """Stage timings for a single sampled message."""
+
+    __slots__ = ("topic", "started", "last", "stages")
+
+    def __init__(self, topic: str):
+        self.topic = topic
+        self.started = self.last = time.perf_counter()
+        self.stages = []
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+
+def _percentile(ordered: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _us(seconds: float) -> float:
+    return round(seconds * 1_000_000, 1)
+
+
+class StageProfiler:
+    """Collects sampled per-stage durations for the MQTT message path."""
+
+    def __init__(self, sample_every: int = config.PROFILER_SAMPLE_EVERY,
+                 window: int = config.PROFILER_WINDOW):
+        self.enabled = False
+        self.sample_every = max(1, sample_every)
+        self.window = window
+        self.lock = threading.Lock()
+        self._counter = 0
+        self._reset()
+
+    def _reset(self):
+        self.enabled_at: Optional[datetime] = datetime.now() if self.enabled else None
+        self.sampled = 0
+        self.stage_times: Dict[str, Deque[float]] = {}
+        self.recent: Deque[tuple] = deque(maxlen=self.window)
+
+    def configure(self, enabled: Optional[bool] = None, sample_every: Optional[int] = None,
+                  reset: bool = False):
+        with self.lock:
+            if sample_every:
+                self.sample_every = max(1, int(sample_every))
+            if enabled is not None and enabled != self.enabled:
+                self.enabled = enabled
+                reset = reset or enabled
+            if reset:
+                self._reset()
+
+    def sample(self, topic: str) -> Optional[Sample]:
+        """Return a Sample if this message should be profiled, else None."""
+        if not self.enabled:
+            return None
+        self._counter += 1
+        if self._counter % self.sample_every:
+            return None
+        return Sample(topic)
+
+    def finish(self, sample: Sample):
+        total = sample.last - sample.started
+        with self.lock:
+            self.sampled += 1
+            for stage, elapsed in sample.stages:
+                times = self.stage_times.get(stage)
+                if times is None:
+                    times = self.stage_times[stage] = deque(maxlen=self.window)
+                times.append(elapsed)
+            self.recent.append((total, sample.topic, sample.stages, datetime.now()))
+
+    def report(self, slowest: int = config.PROFILER_SLOWEST) -> dict:
+        with self.lock:
+            stage_times = {stage: sorted(times) for stage, times in self.stage_times.items()}
+            recent = list(self.recent)
+            sampled = self.sampled
+
+        stages = {}
+        for stage, ordered in stage_times.items():
+            stages[stage] = {
+                "samples": len(ordered),
+                "mean_us": _us(sum(ordered) / len(ordered)),
+                "p50_us": _us(_percentile(ordered, 50)),
+                "p90_us": _us(_percentile(ordered, 90)),
+                "p99_us": _us(_percentile(ordered, 99)),
+                "max_us": _us(ordered[-1]),
+            }
+
+        recent.sort(key=lambda r: r[0], reverse=True)
+        return {
+            "enabled": self.enabled,
+            "enabled_at": self.enabled_at.isoformat() if self.enabled_at else None,
+            "sample_every": self.sample_every,
+            "sampled": sampled,
+            "stages": stages,
+            "slowest": [
+                {
+                    "topic": topic,
+                    "timestamp": when.isoformat(),
+                    "total_us": _us(total),
+                    "stages": {stage: _us(elapsed) for stage, elapsed in stage_list},
+                }
+                for total, topic, stage_list, when in recent[:slowest]
+            ],
+        }
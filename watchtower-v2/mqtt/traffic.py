@@ -0,0 +1,186 @@
+"""
+WatchTower V2 Topic Traffic Statistics
+========================================
+Always-on message and byte rates per topic and per device, in bounded memory.
+
+Rates are exponentially decaying counters (the Unix load-average trick) over
+1 m, 5 m and 1 h horizons, so there are no per-message buckets to keep around.
+Keys live in a Space-Saving heavy-hitter table of fixed capacity: when a new
+topic shows up and the table is full, the coldest entry is evicted and the
+newcomer inherits its weight as an error bound. Memory stays flat however many
+distinct topics appear, and the real heavy hitters never fall out.
+"""
+
+import heapq
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+import config
+
+# (label, time constant in seconds)
+WINDOWS = (("1m", 60.0), ("5m", 300.0), ("1h", 3600.0))
+_SLOWEST = len(WINDOWS) - 1
+
+
+def _decay(elapsed: float, tau: float) -> float:
+    return math.exp(-elapsed / tau) if elapsed > 0 else 1.0
+
+
+class DecayingRate:
+    """Message/byte counters that decay over each window in WINDOWS."""
+
+    __slots__ = ("since", "updated", "count", "msgs", "bytes", "error")
+
+    def __init__(self, now: float, error: float = 0.0):
+        self.since = now
+        self.updated = now
+        self.count = 0
+        self.msgs = [0.0] * len(WINDOWS)
+        self.bytes = [0.0] * len(WINDOWS)
+        # Space-Saving overestimate inherited from the evicted entry (1 h scale)
+        self.error = error
+
+    def add(self, now: float, nbytes: int):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            for i, (_, tau) in enumerate(WINDOWS):
+                factor = math.exp(-elapsed / tau)
+                self.msgs[i] *= factor
+                self.bytes[i] *= factor
+            self.error *= math.exp(-elapsed / WINDOWS[_SLOWEST][1])
+            self.updated = now
+        for i in range(len(WINDOWS)):
+            self.msgs[i] += 1
+            self.bytes[i] += nbytes
+        self.count += 1
+
+    def weight(self, now: float) -> float:
+        """Decayed 1 h message count plus inherited error, used for eviction."""
+        factor = _decay(now - self.updated, WINDOWS[_SLOWEST][1])
+        return (self.msgs[_SLOWEST] + self.error) * factor
+
+    def rates(self, now: float, origin: float) -> dict:
+        """Per-second rates for every window, corrected for warm-up since `origin`."""
+        out = {}
+        age = now - origin
+        for i, (label, tau) in enumerate(WINDOWS):
+            factor = _decay(now - self.updated, tau)
+            # Right after startup a window hasn't filled yet; scale up to compensate
+            warmup = 1.0 - _decay(age, tau) if age > 0 else 1.0
+            scale = tau * max(warmup, 1e-9)
+            out[label] = {
+                "msgs_per_s": round(self.msgs[i] * factor / scale, 4),
+                "bytes_per_s": round(self.bytes[i] * factor / scale, 2),
+            }
+        return out
+
+
+class HeavyHitters:
+    """Space-Saving table of DecayingRate counters with a fixed capacity."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.entries: Dict[str, DecayingRate] = {}
+        self.evictions = 0
+        # Min-heap of (rank, key) for finding the coldest entry without a scan.
+        # An entry's rank changes on every add, so older heap items go stale and
+        # are skipped on pop (ranks[key] holds the current one).
+        self._heap = []
+        self._ranks: Dict[str, float] = {}
+
+    @staticmethod
+    def _rank(entry: DecayingRate) -> float:
+        # log of weight(now) plus now/tau: the same order as weight() at any
+        # instant, but constant until the entry is next updated
+        return math.log(entry.msgs[_SLOWEST] + entry.error) + entry.updated / WINDOWS[_SLOWEST][1]
+
+    def _evict_coldest(self, now: float) -> float:
+        """Drop the lowest-weight entry and return its weight (the newcomer's error bound)."""
+        while True:
+            rank, key = heapq.heappop(self._heap)
+            if self._ranks.get(key) == rank:
+                del self._ranks[key]
+                return self.entries.pop(key).weight(now)
+
+    def add(self, key: str, now: float, nbytes: int):
+        entry = self.entries.get(key)
+        if entry is None:
+            error = 0.0
+            if len(self.entries) >= self.capacity:
+                error = self._evict_coldest(now)
+                self.evictions += 1
+            entry = self.entries[key] = DecayingRate(now, error)
+        entry.add(now, nbytes)
+        rank = self._rank(entry)
+        self._ranks[key] = rank
+        heapq.heappush(self._heap, (rank, key))
+        if len(self._heap) > 4 * self.capacity + 64:
+            self._heap = [(r, k) for k, r in self._ranks.items()]
+            heapq.heapify(self._heap)
+
+    def top(self, now: float, origin: float, limit: int, window: int, key_name: str) -> list:
+        tau = WINDOWS[window][1]
+        ranked = sorted(
+            self.entries.items(),
+            key=lambda kv: kv[1].msgs[window] * _decay(now - kv[1].updated, tau),
+            reverse=True,
+        )
+        return [
+            {
+                key_name: key,
+                "messages": entry.count,
+                "tracked_s": round(now - entry.since, 1),
+                "error": round(entry.error * _decay(now - entry.updated, WINDOWS[_SLOWEST][1]), 2),
+                "rates": entry.rates(now, origin),
+            }
+            for key, entry in ranked[:limit]
+        ]
+
+
+class TrafficStats:
+    """Per-topic and per-device traffic counters for every message received."""
+
+    def __init__(self, capacity: int = config.TRAFFIC_TOP_K):
+        now = time.monotonic()
+        self.lock = threading.Lock()
+        self.started = now
+        self.total = DecayingRate(now)
+        self.total_bytes = 0
+        self.topics = HeavyHitters(capacity)
+        self.devices = HeavyHitters(capacity)
+
+    def record(self, topic: str, device: Optional[str], nbytes: int):
+        now = time.monotonic()
+        with self.lock:
+            self.total.add(now, nbytes)
+            self.total_bytes += nbytes
+            self.topics.add(topic, now, nbytes)
+            if device:
+                self.devices.add(device, now, nbytes)
+
+    def snapshot(self, limit: int = 20, sort: str = "1m") -> dict:
+        """Top topics and devices by message rate over the `sort` window."""
+        labels = [label for label, _ in WINDOWS]
+        window = labels.index(sort) if sort in labels else 0
+        now = time.monotonic()
+        with self.lock:
+            return {
+                "uptime_s": round(now - self.started, 1),
+                "sorted_by": labels[window],
+                "totals": {
+                    "messages": self.total.count,
+                    "bytes": self.total_bytes,
+                    "rates": self.total.rates(now, self.started),
+                },
+                "topics": self.topics.top(now, self.started, limit, window, "topic"),
+                "devices": self.devices.top(now, self.started, limit, window, "device"),
+                "tracked": {
+                    "topics": len(self.topics.entries),
+                    "devices": len(self.devices.entries),
+                    "capacity": self.topics.capacity,
+                    "topic_evictions": self.topics.evictions,
+                    "device_evictions": self.devices.evictions,
+                },
+            }
@@ -4,14 +4,20 @@ WatchTower V2 API Routes
 REST endpoints for the frontend to consume.
 """
 
+import csv
+import io
 import json
+import time
 import requests
 import logging
-from datetime import datetime
-from flask import Blueprint, jsonify, request
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 
+import checklist
 import config
-from models import database as db
+import games
+import metrics
+from models import database as db, grimoire_loader
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +32,15 @@ def set_mqtt_client(client):
     mqtt_client = client
 
 
+def _page_args(default_limit=100, cursor_parts=2):
+    """(limit, after) from ?limit= and ?after= keyset cursor; raises ValueError on a bad cursor."""
+    limit = max(1, min(request.args.get("limit", default_limit, type=int), 1000))
+    after = request.args.get("after")
+    if after:
+        after = db.parse_cursor(after, cursor_parts)
+    return limit, after
+
+
 # =============================================================================
 # DEVICE STATUS
 # =============================================================================
@@ -37,6 +52,14 @@ def get_status():
     return jsonify({"error": "MQTT client not initialized"}), 500
 
 
+@api.route("/connection")
+def get_connection():
+    """Broker connection state, queued commands and time-to-recover history."""
+    if not mqtt_client:
+        return jsonify({"error": "MQTT client not initialized"}), 500
+    return jsonify(mqtt_client.get_connection_status())
+
+
 @api.route("/ping/<device_name>")
 def ping_device(device_name):
     if not mqtt_client:
@@ -57,7 +80,91 @@ def ping_all():
 def send_command(device_name, command):
     if not mqtt_client:
         return jsonify({"error": "MQTT client not initialized"}), 500
-    result = mqtt_client.send_command(device_name, command)
+    qos = request.args.get("qos", 0, type=int)
+    if qos not in (0, 1, 2):
+        return jsonify({"error": "qos must be 0, 1 or 2"}), 400
+    result = mqtt_client.send_command(device_name, command, qos=qos)
+    return jsonify(result)
+
+
+@api.route("/command/bulk", methods=["POST"])
+def send_bulk_command():
+    """
+    Fan one command out to many devices and collect the acks.
+
+    Body: {"command": "PUZZLE_RESET", "room": "Jungle" | "devices": [...] | "all": true,
+           "ordered": true, "qos": 1, "deadline": 10, "concurrency": 8}
+    """
+    if not mqtt_client:
+        return jsonify({"error": "MQTT client not initialized"}), 500
+    data = request.get_json() or {}
+    if not data.get("command"):
+        return jsonify({"error": "Command is required"}), 400
+    if not (data.get("room") or data.get("devices") or data.get("all")):
+        return jsonify({"error": "Specify room, devices or all"}), 400
+
+    devices = data.get("devices")
+    if devices is not None:
+        if not isinstance(devices, list) or not all(isinstance(d, str) for d in devices):
+            return jsonify({"error": "devices must be a list of device names"}), 400
+        devices = list(dict.fromkeys(devices))
+    try:
+        qos = int(data.get("qos", 0))
+        deadline = float(data.get("deadline", config.BULK_COMMAND_DEADLINE))
+        concurrency = int(data.get("concurrency", config.BULK_COMMAND_CONCURRENCY))
+    except (TypeError, ValueError):
+        return jsonify({"error": "qos, deadline and concurrency must be numbers"}), 400
+    if qos not in (0, 1, 2):
+        return jsonify({"error": "qos must be 0, 1 or 2"}), 400
+    if not 0 < deadline <= config.BULK_COMMAND_MAX_DEADLINE:
+        return jsonify({"error": f"deadline must be between 0 and {config.BULK_COMMAND_MAX_DEADLINE:g} seconds"}), 400
+    if not 1 <= concurrency <= config.BULK_COMMAND_MAX_CONCURRENCY:
+        return jsonify({"error": f"concurrency must be between 1 and {config.BULK_COMMAND_MAX_CONCURRENCY}"}), 400
+
+    result = mqtt_client.send_bulk(
+        data["command"],
+        devices=devices,
+        room=data.get("room"),
+        ordered=bool(data.get("ordered")),
+        qos=qos,
+        deadline=deadline,
+        concurrency=concurrency,
+    )
+    if "error" in result:
+        return jsonify(result), 503
+    return jsonify(result)
+
+
+@api.route("/commands")
+def list_commands():
+    """Recently sent commands with their ack status, newest first."""
+    if not mqtt_client:
+        return jsonify({"error": "MQTT client not initialized"}), 500
+    device = request.args.get("device")
+    limit = max(1, min(request.args.get("limit", 50, type=int), config.COMMAND_HISTORY))
+    return jsonify({"commands": mqtt_client.tracker.recent(device=device, limit=limit)})
+
+
+@api.route("/commands/stats")
+def command_stats():
+    """Per-device command counts, timeouts and command->ack latency."""
+    if not mqtt_client:
+        return jsonify({"error": "MQTT client not initialized"}), 500
+    return jsonify({"devices": mqtt_client.tracker.stats(device=request.args.get("device"))})
+
+
+@api.route("/commands/<command_id>")
+def get_command(command_id):
+    """One tracked command. `?wait=2` long-polls until it is acked or times out."""
+    if not mqtt_client:
+        return jsonify({"error": "MQTT client not initialized"}), 500
+    wait = min(request.args.get("wait", 0, type=float), config.BAC_PING_TIMEOUT)
+    if wait > 0:
+        result = mqtt_client.wait_for_command(command_id, wait)
+    else:
+        result = mqtt_client.get_command(command_id)
+    if result is None:
+        return jsonify({"error": f"Unknown command: {command_id}"}), 404
     return jsonify(result)
 
 
@@ -70,7 +177,219 @@ def get_messages():
     if not mqtt_client:
         return jsonify({"error": "MQTT client not initialized"}), 500
     limit = request.args.get("limit", 50, type=int)
-    return jsonify({"messages": mqtt_client.get_feed(limit)})
+    messages = mqtt_client.get_feed(
+        limit,
+        device=request.args.get("device"),
+        room=request.args.get("room"),
+        direction=request.args.get("direction"),
+        topic=request.args.get("topic"),
+    )
+    return jsonify({"messages": messages})
+
+
+@api.route("/metrics/topics")
+def get_topic_metrics():
+    """Per-topic and per-device message/byte rates over 1 m, 5 m and 1 h."""
+    if not mqtt_client:
+        return jsonify({"error": "MQTT client not initialized"}), 500
+    limit = request.args.get("limit", 20, type=int)
+    sort = request.args.get("sort", "1m")
+    return jsonify(mqtt_client.traffic.snapshot(limit=limit, sort=sort))
+
+
+@api.route("/metrics/caches")
+def get_cache_metrics():
+    """Occupancy and eviction counters for the MQTT filter-state caches and the grimoire caches."""
+    if not mqtt_client:
+        return jsonify({"error": "MQTT client not initialized"}), 500
+    return jsonify(dict(mqtt_client.get_cache_stats(), **grimoire_loader.get_cache_stats()))
+
+
+@api.route("/profiler", methods=["GET"])
+def get_profiler_report():
+    """Per-stage percentiles and slowest recent messages for _on_message."""
+    if not mqtt_client:
+        return jsonify({"error": "MQTT client not initialized"}), 500
+    slowest = request.args.get("slowest", config.PROFILER_SLOWEST, type=int)
+    return jsonify(mqtt_client.profiler.report(slowest=slowest))
+
+
+@api.route("/profiler", methods=["POST"])
+def configure_profiler():
+    """Toggle profiling at runtime: {"enabled": true, "sample_every": 10, "reset": false}"""
+    if not mqtt_client:
+        return jsonify({"error": "MQTT client not initialized"}), 500
+    data = request.get_json() or {}
+    mqtt_client.profiler.configure(
+        enabled=data.get("enabled"),
+        sample_every=data.get("sample_every"),
+        reset=bool(data.get("reset")),
+    )
+    return jsonify(mqtt_client.profiler.report(slowest=0))
+
+
+# =============================================================================
+# SEARCH
+# =============================================================================
+
+@api.route("/search")
+def search():
+    """
+    Full-text search over debug log, todos, manifests and grimoire sections.
+    `kinds` narrows the sources (comma-separated: debug,todo,manifest,grimoire).
+    Snippets are HTML-escaped with matches wrapped in <mark>.
+    """
+    q = request.args.get("q", "").strip()
+    if not q:
+        return jsonify({"error": "q is required"}), 400
+    kinds = [k for k in request.args.get("kinds", "").split(",") if k] or None
+    limit = min(request.args.get("limit", 20, type=int), 100)
+
+    started = time.perf_counter()
+    results = db.search(q, kinds=kinds, limit=limit)
+    return jsonify({
+        "query": q,
+        "results": results,
+        "count": len(results),
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    })
+
+
+# =============================================================================
+# MQTT LOG
+# =============================================================================
+
+@api.route("/mqtt-log")
+def get_mqtt_log():
+    """
+    Persisted MQTT traffic. Without a time range: newest first from the live
+    partitions. With `start`/`end` (ISO timestamps): oldest first, reading
+    archived days as well.
+    """
+    device = request.args.get("device")
+    topic = request.args.get("topic")
+    start = request.args.get("start")
+    end = request.args.get("end")
+    if start or end:
+        limit = min(request.args.get("limit", 100, type=int), 10000)
+        messages = db.query_mqtt_log(start=start, end=end, device_name=device, topic=topic, limit=limit)
+        return jsonify({"messages": messages, "count": len(messages)})
+
+    try:
+        limit, after = _page_args()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid cursor: {e}"}), 400
+    messages = db.get_mqtt_log(limit=limit, device_name=device, after=after)
+    return jsonify({"messages": messages, "count": len(messages), "next": db.next_cursor(messages, limit)})
+
+
+@api.route("/mqtt-log/storage")
+def get_mqtt_log_storage():
+    """Live day partitions and compressed archives."""
+    return jsonify(db.get_mqtt_log_storage())
+
+
+EXPORT_COLUMNS = ("timestamp", "direction", "topic", "payload", "device_name")
+EXPORT_CHUNK_ROWS = 500
+
+
+def _log_range_args():
+    """(from, to, device, topic) for export/replay; raises ValueError on a bad timestamp."""
+    start, end = request.args.get("from"), request.args.get("to")
+    for value in (start, end):
+        if value:
+            datetime.fromisoformat(value)
+    return start, end, request.args.get("device"), request.args.get("topic")
+
+
+def _export_stream(rows, fmt):
+    """Serialize rows in chunks of EXPORT_CHUNK_ROWS; only one chunk is ever held in memory."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for i, row in enumerate(rows, 1):
+            writer.writerow([row[c] for c in EXPORT_COLUMNS])
+            if i % EXPORT_CHUNK_ROWS == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+        return
+
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps({c: row[c] for c in EXPORT_COLUMNS}, separators=(",", ":")))
+        if len(chunk) == EXPORT_CHUNK_ROWS:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+@api.route("/mqtt-log/export")
+def export_mqtt_log():
+    """
+    Stream stored MQTT traffic between `from` and `to` (ISO timestamps),
+    oldest first, as NDJSON or ?format=csv. Rows go from the keyset-batched
+    log iterator straight to the response, so memory stays flat whatever
+    the range.
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    try:
+        start, end, device, topic = _log_range_args()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid timestamp: {e}"}), 400
+
+    rows = db.iter_mqtt_log(start=start, end=end, device_name=device, topic=topic)
+    filename = f"mqtt-log-{(start or 'all')[:10]}.{fmt}"
+    return Response(
+        stream_with_context(_export_stream(rows, fmt)),
+        mimetype="text/csv" if fmt == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@api.route("/mqtt-log/replay")
+def replay_mqtt_log():
+    """
+    Server-sent events replaying a stored time range in the live feed's
+    message format, e.g. to review a game afterwards. `speed` scales the
+    original gaps (1 = real time, 10 = ten times faster, 0 = no waiting);
+    quiet stretches are cut to MQTT_REPLAY_MAX_GAP seconds.
+    """
+    try:
+        start, end, device, topic = _log_range_args()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid timestamp: {e}"}), 400
+    if not start:
+        return jsonify({"error": "from is required"}), 400
+    speed = max(0.0, min(request.args.get("speed", 1.0, type=float), 1000.0))
+
+    def events():
+        previous = None
+        count = 0
+        for row in db.iter_mqtt_log(start=start, end=end, device_name=device, topic=topic):
+            at = datetime.fromisoformat(row["timestamp"])
+            if speed and previous is not None:
+                time.sleep(min((at - previous).total_seconds() / speed, config.MQTT_REPLAY_MAX_GAP))
+            previous = at
+            count += 1
+            message = {
+                "timestamp": at.strftime("%H:%M:%S"),
+                "timestamp_full": at.isoformat(),
+                "direction": row["direction"],
+                "topic": row["topic"],
+                "payload": row["payload"] or "",
+                "device": row["device_name"],
+            }
+            yield f"data: {json.dumps(message)}\n\n"
+        yield f"event: end\ndata: {json.dumps({'messages': count})}\n\n"
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"X-Accel-Buffering": "no"})
 
 
 # =============================================================================
@@ -83,8 +402,12 @@ def get_debug_log():
     resolved = request.args.get("resolved")
     if resolved is not None:
         resolved = resolved.lower() == "true"
-    entries = db.get_debug_entries(device_name=device, resolved=resolved)
-    return jsonify({"entries": entries})
+    try:
+        limit, after = _page_args()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid cursor: {e}"}), 400
+    entries = db.get_debug_entries(device_name=device, resolved=resolved, limit=limit, after=after)
+    return jsonify({"entries": entries, "next": db.next_cursor(entries, limit)})
 
 
 @api.route("/debug-log", methods=["POST"])
@@ -111,6 +434,73 @@ def resolve_debug_log(entry_id):
     return jsonify({"status": "resolved"})
 
 
+# =============================================================================
+# RELIABILITY ANALYTICS
+# =============================================================================
+
+@api.route("/analytics/devices")
+def get_device_analytics():
+    """
+    Incidents per month, mean time to resolve and game-hour uptime per device,
+    from incrementally maintained summaries. ?device= adds a monthly breakdown.
+    """
+    device = request.args.get("device")
+    if not device:
+        return jsonify({"devices": db.get_device_reliability(), "game_hours": config.GAME_HOURS})
+
+    summary = db.get_device_reliability(device)
+    if not summary:
+        return jsonify({"error": f"No reliability data for {device}"}), 404
+    months = request.args.get("months", 12, type=int)
+    return jsonify(dict(summary[0], monthly=db.get_monthly_incidents(device, months=months)))
+
+
+@api.route("/devices/<device_name>/uptime")
+def get_device_uptime(device_name):
+    """
+    Uptime percentage and outage intervals for one device over `start`/`end`
+    (ISO timestamps, default the last 24 hours), from device_status_history.
+    """
+    try:
+        end = datetime.fromisoformat(request.args["end"]) if "end" in request.args else datetime.now()
+        start = datetime.fromisoformat(request.args["start"]) if "start" in request.args else end - timedelta(days=1)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid timestamp: {e}"}), 400
+    if start >= end:
+        return jsonify({"error": "start must be before end"}), 400
+    return jsonify(db.get_status_timeline(device_name, start, end))
+
+
+# =============================================================================
+# GAME ANALYTICS
+# =============================================================================
+
+@api.route("/games")
+def list_games():
+    """Recorded game sessions, newest first. `after` is the last started_at seen."""
+    limit = max(1, min(request.args.get("limit", 50, type=int), 1000))
+    sessions = db.get_game_sessions(limit=limit, after=request.args.get("after"))
+    return jsonify({
+        "sessions": sessions,
+        "next": sessions[-1]["started_at"] if len(sessions) == limit else None,
+    })
+
+
+@api.route("/games/stats")
+def get_game_stats():
+    """Per-puzzle solve-time median/p90 over every finished session, slowest first."""
+    return jsonify(games.get_stats())
+
+
+@api.route("/games/<session_id>")
+def get_game(session_id):
+    """One session's milestone timeline with offsets from game start and per-puzzle splits."""
+    session = games.get_timeline(session_id)
+    if session is None:
+        return jsonify({"error": f"Unknown game session: {session_id}"}), 404
+    return jsonify(session)
+
+
 # =============================================================================
 # TODO / CLICKUP INTEGRATION
 # =============================================================================
@@ -119,8 +509,12 @@ def resolve_debug_log(entry_id):
 def get_todos():
     device = request.args.get("device")
     status = request.args.get("status")
-    todos = db.get_todos(device_name=device, status=status)
-    return jsonify({"todos": todos})
+    try:
+        limit, after = _page_args(cursor_parts=3)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid cursor: {e}"}), 400
+    todos = db.get_todos(device_name=device, status=status, limit=limit, after=after)
+    return jsonify({"todos": todos, "next": db.next_cursor(todos, limit, ("priority_rank", "timestamp", "id"))})
 
 
 @api.route("/todos", methods=["POST"])
@@ -178,6 +572,52 @@ def get_manifest(device_name):
     return jsonify({"error": f"No manifest for {device_name}"}), 404
 
 
+@api.route("/manifests/<device_name>/history")
+def get_manifest_history(device_name):
+    """
+    What changed in a device's manifest at each sync, newest first.
+    `fields` narrows the timeline (e.g. ?fields=firmware_version,pin_config).
+    """
+    fields = [f for f in request.args.get("fields", "").split(",") if f] or None
+    limit = request.args.get("limit", 50, type=int)
+    history = db.get_manifest_history(device_name, fields=fields, limit=limit)
+    return jsonify({"device": device_name, "history": history})
+
+
+# =============================================================================
+# PRE-GAME CHECKLIST
+# =============================================================================
+
+@api.route("/checklist/run", methods=["POST"])
+def run_checklist():
+    """Start a checklist run in the background; poll /api/checklist/latest for the result."""
+    if not mqtt_client:
+        return jsonify({"error": "MQTT client not initialized"}), 500
+    started = checklist.start_checklist(mqtt_client)
+    return jsonify({"status": "started" if started else "already running"}), 202
+
+
+@api.route("/checklist/latest")
+def get_latest_checklist():
+    return jsonify(checklist.get_latest())
+
+
+@api.route("/checklist/history")
+def get_checklist_history():
+    limit = request.args.get("limit", 20, type=int)
+    after = request.args.get("after", type=int)
+    runs = db.get_checklist_runs(limit=limit, after=after)
+    return jsonify({"runs": runs, "next": str(runs[-1]["id"]) if len(runs) == limit else None})
+
+
+@api.route("/checklist/<int:run_id>")
+def get_checklist_run(run_id):
+    run = db.get_checklist_run(run_id)
+    if run:
+        return jsonify(run)
+    return jsonify({"error": f"No checklist run {run_id}"}), 404
+
+
 # =============================================================================
 # WORKSPACE INFO
 # =============================================================================
@@ -185,6 +625,8 @@ def get_manifest(device_name):
 @api.route("/workspace/members")
 def get_workspace_members():
     """Get ClickUp workspace members for assignment dropdown."""
+    started = time.perf_counter()
+    status = "error"
     try:
         headers = {"Authorization": config.CLICKUP_API_TOKEN}
         resp = requests.get(
@@ -192,10 +634,13 @@ def get_workspace_members():
             headers=headers,
             timeout=5
         )
+        status = str(resp.status_code)
         if resp.status_code == 200:
             return jsonify(resp.json())
     except Exception as e:
         logger.error(f"Failed to get ClickUp members: {e}")
+    finally:
+        metrics.CLICKUP_REQUEST_SECONDS.observe(time.perf_counter() - started, "members", status)
 
     return jsonify({"members": []})
 
@@ -244,12 +689,18 @@ def _create_clickup_task(data: dict) -> dict:
             "Content-Type": "application/json"
         }
 
-        resp = requests.post(
-            f"{config.CLICKUP_API_URL}/list/{config.CLICKUP_LIST_ID}/task",
-            headers=headers,
-            json=task_data,
-            timeout=10
-        )
+        started = time.perf_counter()
+        status = "error"
+        try:
+            resp = requests.post(
+                f"{config.CLICKUP_API_URL}/list/{config.CLICKUP_LIST_ID}/task",
+                headers=headers,
+                json=task_data,
+                timeout=10
+            )
+            status = str(resp.status_code)
+        finally:
+            metrics.CLICKUP_REQUEST_SECONDS.observe(time.perf_counter() - started, "create_task", status)
 
         if resp.status_code in (200, 201):
             result = resp.json()
@@ -1,8 +1,9 @@
 """
 WatchTower V2 Page Routes
 """
-from flask import Blueprint, render_template, abort
+from flask import Blueprint, render_template, abort, request
 import config
+import static_pages
 from models.grimoire_loader import get_all_sections, get_device_index, get_device_section
 
 pages = Blueprint("pages", __name__)
@@ -18,26 +19,43 @@ def mqtt_feed():
     return render_template("mqtt_feed.html")
 
 
-@pages.route("/library")
-def library():
-    grimoire = get_all_sections()
-    devices = get_device_index()
+def render_library() -> str:
     return render_template(
         "library.html",
         gravity_topics=config.GRAVITY_GAMES_TOPICS,
-        grimoire=grimoire,
-        devices=devices,
+        grimoire=get_all_sections(),
+        devices=get_device_index(),
     )
 
 
-@pages.route("/library/device/<slug>")
-def device_page(slug):
+def render_device_page(slug):
+    """The device page's HTML, or None if the manual has no such device."""
     device = get_device_section(slug)
     if device is None:
-        abort(404)
+        return None
     return render_template("device_page.html", device=device)
 
 
+# Both pages are served from the prebuilt copies (static_pages.py) when a
+# current build exists, and rendered live otherwise.
+
+@pages.route("/library")
+def library():
+    prebuilt = static_pages.serve(request.path)
+    return prebuilt if prebuilt is not None else render_library()
+
+
+@pages.route("/library/device/<slug>")
+def device_page(slug):
+    prebuilt = static_pages.serve(request.path)
+    if prebuilt is not None:
+        return prebuilt
+    html = render_device_page(slug)
+    if html is None:
+        abort(404)
+    return html
+
+
 @pages.route("/debug")
 def debug_log():
     return render_template("debug_log.html")
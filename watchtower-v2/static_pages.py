@@ -0,0 +1,175 @@
+"""
+WatchTower V2 Prebuilt Grimoire Pages
+======================================
+Renders /library and every /library/device/<slug> page ahead of time into
+GRIMOIRE_BUILD_DIR (scripts/build_grimoire_pages.py, run by the daily
+grimoire update), each with a gzip copy and a content-hash ETag:
+
+    manifest.json          pages, ETags, and the stamp of every source file
+    library.html(.gz)
+    device/<slug>.html(.gz)
+
+serve() answers from the build while it is current. If a markdown document
+or template has changed since the build, or a page isn't in it, the route
+renders live instead, so a stale or missing build never shows old content.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Optional
+
+from flask import Response, request
+
+import config
+from models import grimoire_loader
+
+MANIFEST = "manifest.json"
+# Everything the pages are rendered from. Listed here rather than borrowed from
+# the search index so a change to what gets indexed can't hide a stale page.
+LIBRARY_DOCS = (
+    "operations-manual.md",
+    "wiring-reference.md",
+    "network-infrastructure.md",
+    "debug-log.md",
+    "code-health-report.md",
+    "system-checker-integration.md",
+)
+TEMPLATES = ("base.html", "library.html", "device_page.html")
+
+_lock = threading.Lock()
+_manifest: Optional[tuple] = None    # (manifest file stamp, parsed manifest)
+
+
+def _stamp(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _source_files(app) -> list:
+    """
+    Every file the pages are rendered from: the library documents, their
+    templates, and config.py (library.html shows GRAVITY_GAMES_TOPICS).
+    """
+    docs = [os.path.join(grimoire_loader.GRIMOIRE_DIR, name) for name in LIBRARY_DOCS]
+    templates = [os.path.join(app.root_path, app.template_folder, name) for name in TEMPLATES]
+    return docs + templates + [os.path.abspath(config.__file__)]
+
+
+def _page_file(path: str) -> str:
+    """/library -> library.html, /library/device/<slug> -> device/<slug>.html"""
+    if path == "/library":
+        return "library.html"
+    return f"device/{path.rsplit('/', 1)[1]}.html"
+
+
+def build(app, out_dir: Optional[str] = None) -> dict:
+    """Render every library page into `out_dir` and swap it in. Returns the manifest."""
+    from routes.pages import render_device_page, render_library
+
+    out_dir = out_dir or config.GRIMOIRE_BUILD_DIR
+    staging = out_dir + ".new"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(os.path.join(staging, "device"))
+
+    # Stamped before rendering: a document edited mid-build marks the build stale
+    sources = {path: _stamp(path) for path in _source_files(app)}
+    renderers = {"/library": render_library}
+    for device in grimoire_loader.get_device_index():
+        slug = device["slug"]
+        renderers[f"/library/device/{slug}"] = lambda slug=slug: render_device_page(slug)
+
+    pages = {}
+    for path, render in renderers.items():
+        with app.test_request_context(path):
+            body = render().encode("utf-8")
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        filename = _page_file(path)
+        with open(os.path.join(staging, filename), "wb") as f:
+            f.write(body)
+        with open(os.path.join(staging, filename + ".gz"), "wb") as f:
+            f.write(compressed)
+        pages[path] = {
+            "file": filename,
+            "etag": hashlib.sha256(body).hexdigest()[:20],
+            "bytes": len(body),
+            "gzip_bytes": len(compressed),
+        }
+
+    manifest = {
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+        "sources": sources,
+        "pages": pages,
+    }
+    with open(os.path.join(staging, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+
+    # Requests arriving between the two renames find no manifest and render live
+    previous = out_dir + ".old"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.rename(out_dir, previous)
+    os.rename(staging, out_dir)
+    shutil.rmtree(previous, ignore_errors=True)
+    return manifest
+
+
+def _load_manifest() -> Optional[dict]:
+    """The current build's manifest, re-read only when the file changes."""
+    global _manifest
+    path = os.path.join(config.GRIMOIRE_BUILD_DIR, MANIFEST)
+    stamp = _stamp(path)
+    if stamp is None:
+        return None
+    with _lock:
+        if _manifest is not None and _manifest[0] == stamp:
+            return _manifest[1]
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None     # mid-swap or half-written
+    with _lock:
+        _manifest = (stamp, manifest)
+    return manifest
+
+
+def is_current(manifest: dict) -> bool:
+    """True while every source file still has the stamp it had when the build ran."""
+    return all(_stamp(path) == stamp for path, stamp in manifest["sources"].items())
+
+
+def serve(path: str) -> Optional[Response]:
+    """The prebuilt page for `path` (honouring gzip and If-None-Match), or None to render live."""
+    manifest = _load_manifest()
+    if manifest is None:
+        return None
+    page = manifest["pages"].get(path)
+    if page is None or not is_current(manifest):
+        return None
+
+    gzipped = request.accept_encodings["gzip"] > 0
+    filename = os.path.join(config.GRIMOIRE_BUILD_DIR, page["file"] + (".gz" if gzipped else ""))
+    try:
+        with open(filename, "rb") as f:
+            body = f.read()
+    except OSError:
+        return None
+
+    response = Response(body, mimetype="text/html")
+    # Each encoding is a different representation, so it gets its own ETag
+    response.set_etag(page["etag"] + ("-gz" if gzipped else ""))
+    if gzipped:
+        response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.max_age = config.GRIMOIRE_PAGE_MAX_AGE
+    response.headers["X-WatchTower-Page"] = "prebuilt"
+    return response.make_conditional(request)
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from models import database as db
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A fresh pair of database files for the test."""
+    path = str(tmp_path / "watchtower.db")
+    monkeypatch.setattr(config, "DATABASE_PATH", path)
+    db.init_db(path)
+    yield db
+    db.close_connections()
@@ -0,0 +1,82 @@
+import pytest
+from flask import Flask
+
+import config
+
+from routes import api as api_routes
+
+
+class FakeTracker:
+    def __init__(self):
+        self.limits = []
+
+    def recent(self, device=None, limit=50):
+        self.limits.append(limit)
+        return []
+
+
+class FakeClient:
+    connected = True
+
+    def __init__(self):
+        self.calls = []
+        self.tracker = FakeTracker()
+
+    def send_bulk(self, command, **kwargs):
+        self.calls.append((command, kwargs))
+        return {"command": command, "results": {}}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeClient()
+    monkeypatch.setattr(api_routes, "mqtt_client", fake)
+    app = Flask(__name__)
+    app.register_blueprint(api_routes.api)
+    return app.test_client(), fake
+
+
+@pytest.mark.parametrize("body", [
+    {"deadline": "soon"},
+    {"deadline": -1},
+    {"deadline": 1e9},
+    {"concurrency": 0},
+    {"concurrency": 10000},
+    {"concurrency": [4]},
+    {"qos": 3},
+    {"qos": "high"},
+])
+def test_bulk_command_rejects_bad_numbers(client, body):
+    http, fake = client
+    resp = http.post("/api/command/bulk", json={"command": "RESET", "all": True, **body})
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()
+    assert not fake.calls
+
+
+def test_bulk_command_rejects_non_list_devices(client):
+    http, fake = client
+    resp = http.post("/api/command/bulk", json={"command": "RESET", "devices": "Cannon1"})
+    assert resp.status_code == 400
+    assert not fake.calls
+
+
+def test_bulk_command_dedupes_devices_and_coerces(client):
+    http, fake = client
+    resp = http.post("/api/command/bulk", json={
+        "command": "RESET", "devices": ["Cannon1", "Cannon2", "Cannon1"],
+        "qos": "1", "deadline": "5", "concurrency": "4",
+    })
+    assert resp.status_code == 200
+    (_, kwargs), = fake.calls
+    assert kwargs["devices"] == ["Cannon1", "Cannon2"]
+    assert kwargs["qos"] == 1
+    assert kwargs["deadline"] == 5.0
+    assert kwargs["concurrency"] == 4
+
+
+def test_command_list_limit_is_clamped(client):
+    http, fake = client
+    for limit in ("0", "-5", "7", "100000"):
+        assert http.get(f"/api/commands?limit={limit}").status_code == 200
+    assert fake.tracker.limits == [1, 1, 7, config.COMMAND_HISTORY]
@@ -0,0 +1,40 @@
+import time
+
+import checklist
+import config
+from mqtt import MQTTClient
+
+
+def test_deadline_caps_a_hung_step(database, monkeypatch):
+    def hangs(mqtt_client):
+        time.sleep(4)
+        return checklist.PASS, "finally", {}
+
+    monkeypatch.setattr(config, "CHECKLIST_DEADLINE", 1.0)
+    monkeypatch.setattr(checklist, "_latest", checklist._NOT_LOADED)
+    monkeypatch.setattr(checklist, "INDEPENDENT_STEPS", [("firmware", hangs)] + checklist.INDEPENDENT_STEPS[1:])
+
+    started = time.perf_counter()
+    run = checklist.run_checklist(MQTTClient())
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 2.0
+    step = next(s for s in run["steps"] if s["step"] == "firmware")
+    assert step["status"] == checklist.FAIL
+    assert step["summary"] == "Timed out"
+    assert 900 <= step["duration_ms"] <= elapsed * 1000
+
+
+def test_latest_run_is_cached_even_when_there_is_none(database, monkeypatch):
+    loads = []
+    load = database.get_latest_checklist_run
+    monkeypatch.setattr(database, "get_latest_checklist_run", lambda: loads.append(1) or load())
+    monkeypatch.setattr(checklist, "_latest", checklist._NOT_LOADED)
+
+    assert checklist.get_latest()["run"] is None
+    assert checklist.get_latest()["run"] is None
+    assert len(loads) == 1
+
+    run = checklist.run_checklist(MQTTClient())
+    assert checklist.get_latest()["run"]["id"] == run["id"]
+    assert len(loads) == 1
@@ -0,0 +1,65 @@
+import config
+from mqtt.commands import CommandTracker
+
+COMMAND = "MermaidsTale/JungleDoor/command"
+STATUS = "MermaidsTale/JungleDoor/status"
+
+
+def track(tracker, command, ack_payloads):
+    return tracker.track("JungleDoor", command, COMMAND, STATUS, 0, 5.0, ack_payloads=ack_payloads)
+
+
+def test_pong_only_acks_a_ping():
+    tracker = CommandTracker()
+    reset = track(tracker, "RESET", ("OK",))
+
+    assert tracker.resolve("JungleDoor", COMMAND, "PONG") is None
+    assert tracker.resolve("JungleDoor", STATUS, "PONG") is None
+    assert reset.status == "pending"
+
+    ping = track(tracker, "PING", ("PONG",))
+    assert tracker.resolve("JungleDoor", COMMAND, "PONG") is ping
+    assert reset.status == "pending"
+
+
+def test_ack_needs_the_expected_reply_on_the_ack_topic():
+    tracker = CommandTracker()
+    reset = track(tracker, "RESET", ("OK",))
+
+    assert tracker.resolve("JungleDoor", STATUS, "HEARTBEAT:IDLE:UP30s:RSSI-60") is None
+    assert tracker.resolve("JungleDoor", STATUS, "DOOR_OPEN") is None
+    assert tracker.resolve("JungleDoor", COMMAND, "OK") is None
+    assert tracker.resolve("JungleDoor", STATUS, "OK") is reset
+    assert reset.status == "acked"
+
+
+def test_any_reply_acks_when_no_payload_is_expected():
+    tracker = CommandTracker()
+    status = track(tracker, "STATUS", None)
+
+    assert tracker.resolve("JungleDoor", STATUS, "HEARTBEAT:IDLE:UP30s:RSSI-60") is None
+    assert tracker.resolve("JungleDoor", STATUS, "IDLE:UP30s:RSSI-60:v2.1") is status
+
+
+class FakePaho:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, payload, qos=0):
+        self.published.append((topic, payload, qos))
+        return type("Info", (), {"rc": 0, "mid": len(self.published)})()
+
+
+def test_send_command_passes_qos_through():
+    from mqtt import MQTTClient
+
+    client = MQTTClient()
+    client.client = FakePaho()
+    client.connected = True
+    name = next(n for n, d in client.devices.items() if d.device_type.value == config.DEVICE_TYPE_ESP32)
+
+    for qos in (0, 1, 2):
+        result = client.send_command(name, "PING", qos=qos)
+        assert result["sent"] and result["qos"] == qos
+        assert client.client.published[-1][2] == qos
+    assert "error" in client.send_command(name, "PING", qos=3)
@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from models import database as db
+
+
+def held():
+    return {path: count for path, (_, count) in getattr(db._local, "held", {}).items()}
+
+
+def test_nested_blocks_share_the_outer_connection(database):
+    with db.get_db() as outer:
+        assert held() == {db.DATABASE_PATH: 1}
+        with db.get_db() as inner:
+            assert inner is outer
+            assert held() == {db.DATABASE_PATH: 2}
+            inner.execute("INSERT INTO debug_log (title) VALUES ('nested')")
+        # The inner block doesn't commit: another connection can't see the row yet
+        assert held() == {db.DATABASE_PATH: 1}
+        assert outer.in_transaction
+        with db.get_hot_db() as hot:
+            assert hot is not outer
+            assert held() == {db.DATABASE_PATH: 1, db.HOT_DATABASE_PATH: 1}
+    assert held() == {}
+    assert [e["title"] for e in db.get_debug_entries()] == ["nested"]
+
+
+def test_outer_failure_rolls_back_nested_writes(database):
+    with pytest.raises(RuntimeError):
+        with db.get_db():
+            with db.get_db() as inner:
+                inner.execute("INSERT INTO debug_log (title) VALUES ('lost')")
+            raise RuntimeError("outer block failed")
+    assert held() == {}
+    assert db.get_debug_entries() == []
+
+
+def test_connections_go_back_to_the_pool_and_are_reused(database):
+    with db.get_db() as first:
+        pass
+    assert any(conn is first for _, conn in db._pool)
+    with db.get_db() as second:
+        assert second is first
+        assert not any(conn is first for _, conn in db._pool)
+
+
+def test_threads_never_share_a_held_connection(database):
+    seen = []
+    inside = threading.Barrier(4)
+
+    def worker():
+        with db.get_db() as conn:
+            seen.append(conn)
+            inside.wait(timeout=5)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(conn) for conn in seen}) == 4
@@ -0,0 +1,27 @@
+import config
+import device_names
+
+
+def test_legacy_spellings_are_rewritten_once_per_alias_table(database, monkeypatch):
+    db = database
+    path = config.DATABASE_PATH
+    name = next(iter(device_names._EXACT.values()))
+    spelled = name.upper() + " "
+    with db.get_db() as conn:
+        conn.execute("INSERT INTO debug_log (device_name, title) VALUES (?, 'legacy')", (spelled,))
+        conn.execute("DELETE FROM schema_meta")
+
+    scans = []
+    canonicalize = db._canonicalize_device_names
+    monkeypatch.setattr(db, "_canonicalize_device_names", lambda conn: scans.append(1) or canonicalize(conn))
+
+    db.init_db(path)
+    assert len(scans) == 1
+    assert db.get_debug_entries()[0]["device_name"] == name
+
+    db.init_db(path)
+    assert len(scans) == 1
+
+    monkeypatch.setattr(device_names, "alias_version", lambda: "changed")
+    db.init_db(path)
+    assert len(scans) == 2
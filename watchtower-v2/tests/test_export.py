@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+from datetime import date
+
+import pytest
+from flask import Flask
+
+import config
+from routes import api as api_routes
+
+
+def rows(day, count, device="Prop1"):
+    return [(f"2026-03-{day:02d} 10:{i // 60 % 60:02d}:{i % 60:02d}.{i // 3600:03d}", "in",
+             f"MermaidsTale/{device}/angle", str(i), device) for i in range(count)]
+
+
+@pytest.fixture
+def http(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MQTT_ARCHIVE_DIR", str(tmp_path / "archive"))
+    app = Flask(__name__)
+    app.register_blueprint(api_routes.api)
+    return app.test_client()
+
+
+@pytest.fixture
+def logged(database):
+    # Day 1 ends up archived, day 3 stays live
+    logged = rows(1, 700) + rows(3, 600, "Prop2")
+    database.log_mqtt_messages(logged)
+    database.rotate_mqtt_log(date(2026, 3, 3))
+    return logged
+
+
+def test_ndjson_export_streams_archive_and_live_rows_in_order(http, logged):
+    response = http.get("/api/mqtt-log/export")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    assert response.headers["Content-Disposition"] == 'attachment; filename="mqtt-log-all.ndjson"'
+
+    chunks = list(response.response)
+    assert [chunk.count(b"\n") for chunk in chunks] == [500, 500, 300]
+    exported = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert [tuple(row.values()) for row in exported] == logged
+    assert list(exported[0]) == list(api_routes.EXPORT_COLUMNS)
+
+
+def test_csv_export_filters_and_quotes(http, database, logged):
+    database.log_mqtt_messages([("2026-03-03 11:00:00.000", "out", "MermaidsTale/Prop2/command",
+                                 'say "hi", then\nstop', "Prop2")])
+    response = http.get("/api/mqtt-log/export?format=csv&device=Prop2&from=2026-03-03T10:09:00")
+    assert response.mimetype == "text/csv"
+    assert response.headers["Content-Disposition"] == 'attachment; filename="mqtt-log-2026-03-03.csv"'
+
+    header, *records = csv.reader(io.StringIO(response.get_data(as_text=True)))
+    assert tuple(header) == api_routes.EXPORT_COLUMNS
+    assert [r[3] for r in records] == [str(i) for i in range(540, 600)] + ['say "hi", then\nstop']
+
+    response = http.get("/api/mqtt-log/export?format=csv&topic=MermaidsTale/Prop1/angle&to=2026-03-01T10:00:02")
+    assert response.get_data(as_text=True).splitlines()[1:] == [
+        "2026-03-01 10:00:00.000,in,MermaidsTale/Prop1/angle,0,Prop1",
+        "2026-03-01 10:00:01.000,in,MermaidsTale/Prop1/angle,1,Prop1",
+    ]
+
+
+def test_export_pulls_rows_only_as_chunks_are_sent(http, database, monkeypatch):
+    pulled = []
+
+    def iter_mqtt_log(**filters):
+        for i in range(2000):
+            pulled.append(i)
+            yield dict(zip(api_routes.EXPORT_COLUMNS, ("2026-03-01 10:00:00.000", "in", "t", str(i), None)))
+
+    monkeypatch.setattr(database, "iter_mqtt_log", iter_mqtt_log)
+    body = iter(http.get("/api/mqtt-log/export").response)
+    next(body)
+    assert len(pulled) == api_routes.EXPORT_CHUNK_ROWS
+
+
+@pytest.mark.parametrize("query", ["format=xml", "from=yesterday", "to=2026-13-01"])
+def test_export_rejects_bad_arguments(http, query):
+    response = http.get(f"/api/mqtt-log/export?{query}")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_replay_sends_stored_messages_as_events(http, logged):
+    assert http.get("/api/mqtt-log/replay").status_code == 400
+
+    response = http.get("/api/mqtt-log/replay?speed=0&from=2026-03-01T10:11:38&to=2026-03-03T10:00:01")
+    assert response.mimetype == "text/event-stream"
+    events = response.get_data(as_text=True).split("\n\n")[:-1]
+    messages = [json.loads(e[len("data: "):]) for e in events[:-1]]
+    assert [(m["timestamp_full"], m["payload"], m["device"]) for m in messages] == [
+        ("2026-03-01T10:11:38", "698", "Prop1"),
+        ("2026-03-01T10:11:39", "699", "Prop1"),
+        ("2026-03-03T10:00:00", "0", "Prop2"),
+    ]
+    assert events[-1] == 'event: end\ndata: {"messages": 3}'
@@ -0,0 +1,13 @@
+from mqtt import MQTTClient
+
+
+def test_room_feed_lookup_ignores_case():
+    client = MQTTClient()
+    name, device = next((n, d) for n, d in client.devices.items() if d.room)
+    client._append_feed({"device": name, "direction": "RX", "topic": f"MermaidsTale/{name}/status",
+                         "payload": "ONLINE"})
+
+    for room in (device.room, device.room.lower(), device.room.upper()):
+        assert [m["device"] for m in client.get_feed(room=room)] == [name]
+        assert [m["device"] for m in client.get_feed(device=name, room=room)] == [name]
+    assert client.get_feed(room="Nowhere") == []
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import games
+
+T0 = datetime(2026, 3, 14, 18, 0, 0)
+
+
+def at(seconds):
+    return T0 + timedelta(seconds=seconds)
+
+
+@pytest.fixture
+def game_db(database):
+    games.invalidate()
+    yield database
+    games.invalidate()
+
+
+def test_stats_without_an_escape_report_no_success_outcome(game_db):
+    games.record([
+        (at(0), games.START_TOPIC, "triggered"),
+        (at(300), "MermaidsTale/DeskDrawer", "triggered"),
+        (at(3600), "MermaidsTale/GameFail", "triggered"),
+    ])
+
+    stats = games.get_stats()
+    assert stats["sessions"] == 1
+    assert stats["outcomes"] == {"fail": 1}
+    assert stats["success_rate"] == 0.0
+    assert stats["escape_time"]["count"] == 0
+
+
+def test_session_boundaries_are_not_puzzles(game_db):
+    games.record([
+        (at(0), games.START_TOPIC, "triggered"),
+        (at(120), "MermaidsTale/DeskDrawer", "triggered"),
+        (at(400), "MermaidsTale/MirrorSensor", "triggered"),
+        (at(1800), "MermaidsTale/GameSuccess", "triggered"),
+    ])
+
+    stats = games.get_stats()
+    assert [p["event"] for p in stats["puzzles"]] == ["Mirror Sensor", "Desk Drawer"]
+    assert stats["outcomes"] == {"success": 1}
+    assert stats["escape_time"]["median_s"] == 1800.0
+
+    session = games.get_timeline(game_db.get_game_sessions()[0]["id"])
+    splits = {e["event_name"]: e.get("split_s") for e in session["timeline"]}
+    assert splits == {"Game Start": None, "Desk Drawer": 120.0, "Mirror Sensor": 280.0, "Game Success": None}
+    assert session["duration_s"] == 1800.0
+
+
+def session_of(db, topic, timestamp):
+    with db.get_hot_db() as conn:
+        return conn.execute("SELECT game_session_id FROM game_events WHERE topic = ? AND timestamp = ?",
+                            (topic, db._log_timestamp(timestamp))).fetchone()[0]
+
+
+def test_restart_start_and_success_bound_sessions(game_db):
+    finished = games.record([
+        (at(0), games.START_TOPIC, "triggered"),
+        (at(60), "MermaidsTale/DeskDrawer", "triggered"),
+        (at(90), games.RESTART_TOPIC, "triggered"),
+        (at(100), "MermaidsTale/DeskDrawer", "triggered"),     # between games
+        (at(200), games.START_TOPIC, "triggered"),
+        (at(260), "MermaidsTale/DeskDrawer", "triggered"),
+        (at(500), games.START_TOPIC, "triggered"),             # new game while one is open
+    ])
+    assert finished == 0
+    # The open game carries over to the next batch
+    assert games.record([
+        (at(800), "MermaidsTale/MirrorSensor", "triggered"),
+        (at(1500), "MermaidsTale/GameSuccess", "triggered"),
+        (at(1600), "MermaidsTale/DeskDrawer", "triggered"),    # after the escape
+    ]) == 1
+
+    sessions = [(s["started_at"][11:19], s["ended_at"][11:19], s["outcome"])
+                for s in reversed(game_db.get_game_sessions())]
+    assert sessions == [
+        ("18:00:00", "18:01:30", "restarted"),
+        ("18:03:20", "18:08:20", "abandoned"),
+        ("18:08:20", "18:25:00", "success"),
+    ]
+
+    first, second, third = (s["id"] for s in reversed(game_db.get_game_sessions()))
+    assert session_of(game_db, games.RESTART_TOPIC, at(90)) is None
+    assert session_of(game_db, "MermaidsTale/DeskDrawer", at(60)) == first
+    assert session_of(game_db, "MermaidsTale/DeskDrawer", at(100)) is None
+    assert session_of(game_db, "MermaidsTale/DeskDrawer", at(260)) == second
+    assert session_of(game_db, "MermaidsTale/MirrorSensor", at(800)) == third
+    assert session_of(game_db, "MermaidsTale/GameSuccess", at(1500)) == third
+    assert session_of(game_db, "MermaidsTale/DeskDrawer", at(1600)) is None
+
+    timeline = games.get_timeline(third)
+    assert [e["event_name"] for e in timeline["timeline"]] == ["Game Start", "Mirror Sensor", "Game Success"]
+    assert timeline["duration_s"] == 1000.0
+
+
+def test_success_without_an_open_session_finishes_nothing(game_db):
+    assert games.record([(at(0), "MermaidsTale/GameSuccess", "triggered")]) == 0
+    assert game_db.get_game_sessions() == []
+    assert session_of(game_db, "MermaidsTale/GameSuccess", at(0)) is None
+
+
+class Message:
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload.encode()
+
+
+def test_full_milestone_buffer_counts_drops(monkeypatch, caplog):
+    import config
+    import metrics
+    from mqtt import MQTTClient
+
+    monkeypatch.setattr(config, "GAME_EVENT_BUFFER", 3)
+    client = MQTTClient()
+    dropped = metrics.BUFFER_DROPS.values.get(("game_events",), 0)
+
+    topics = [games.START_TOPIC, "MermaidsTale/DeskDrawer", "MermaidsTale/MirrorSensor",
+              "MermaidsTale/CabinDoorOpened", "MermaidsTale/GameSuccess"]
+    for topic in topics:
+        client._on_message(None, None, Message(topic, "triggered"))
+
+    assert [topic for _, topic, _ in client.drain_game_events()] == topics[2:]
+    assert metrics.BUFFER_DROPS.values[("game_events",)] == dropped + 2
+    assert "Game event buffer full" in caplog.text
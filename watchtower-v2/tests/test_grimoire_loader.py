@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+from models import grimoire_loader
+
+
+@pytest.fixture
+def grimoire(tmp_path, monkeypatch):
+    monkeypatch.setattr(grimoire_loader, "GRIMOIRE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def lookups(cache):
+    stats = grimoire_loader.get_cache_stats()[cache]
+    return stats["hits"], stats["misses"]
+
+
+def rewrite(path, text, mtime_ns=None):
+    """Replace a file's contents, optionally pinning its mtime."""
+    path.write_text(text)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def counted(cache, call):
+    hits, misses = lookups(cache)
+    result = call()
+    after = lookups(cache)
+    return result, (after[0] - hits, after[1] - misses)
+
+
+def test_rendered_document_is_reused_until_the_file_changes(grimoire):
+    doc = grimoire / "network-infrastructure.md"
+    rewrite(doc, "# Network\n\nBroker on 10.1.10.115\n", mtime_ns=1_000_000_000)
+
+    html, looked_up = counted("grimoire_html", grimoire_loader.get_network_infrastructure)
+    assert "10.1.10.115" in html and looked_up == (0, 1)
+    again, looked_up = counted("grimoire_html", grimoire_loader.get_network_infrastructure)
+    assert again is html and looked_up == (1, 0)
+
+    # Same size, new mtime: a save that only changed one character
+    rewrite(doc, "# Network\n\nBroker on 10.1.10.116\n", mtime_ns=2_000_000_000)
+    html, looked_up = counted("grimoire_html", grimoire_loader.get_network_infrastructure)
+    assert "10.1.10.116" in html and looked_up == (0, 1)
+
+    # Same mtime, new size: a sync that preserved the timestamp
+    rewrite(doc, "# Network\n\nBroker on 10.1.10.116:1883\n", mtime_ns=2_000_000_000)
+    html, looked_up = counted("grimoire_html", grimoire_loader.get_network_infrastructure)
+    assert "1883" in html and looked_up == (0, 1)
+
+    doc.unlink()
+    assert "Document not found" in grimoire_loader.get_network_infrastructure()
+
+
+MANUAL = """# Operations Manual
+
+## CAPTAINS CABIN
+
+### 1. CANNON (Port Cannon)
+**Description:**
+Fires when the fuse is lit.
+
+Fuse relay on pin 4.
+
+### 2. DESK-DRAWER
+**Description:**
+Opens on the right code.
+"""
+
+WIRING = """# Wiring
+
+## CANNON
+Relay board, 12V.
+
+## DESK-DRAWER
+Maglock on relay 2.
+"""
+
+
+def test_device_index_is_parsed_once_per_file_version(grimoire):
+    manual = grimoire / "operations-manual.md"
+    rewrite(manual, MANUAL, mtime_ns=1_000_000_000)
+    rewrite(grimoire / "wiring-reference.md", WIRING, mtime_ns=1_000_000_000)
+
+    devices, looked_up = counted("grimoire_index", grimoire_loader.get_device_index)
+    assert [(d["slug"], d["room"], d["description"]) for d in devices] == [
+        ("cannon", "Captains Cabin", "Fires when the fuse is lit."),
+        ("desk-drawer", "Captains Cabin", "Opens on the right code."),
+    ]
+    assert looked_up == (0, 1)
+
+    section, looked_up = counted("grimoire_index", lambda: grimoire_loader.get_device_section("cannon"))
+    assert "pin 4" in section["html"] and "DESK" not in section["html"]
+    assert "12V" in section["wiring_html"] and "Maglock" not in section["wiring_html"]
+    assert section["aliases"] == "Port Cannon"
+    # The manual's index is reused; the wiring reference is parsed on first use
+    assert looked_up == (1, 1)
+    _, looked_up = counted("grimoire_sections", lambda: grimoire_loader.get_device_section("cannon"))
+    assert looked_up == (2, 0)
+
+    # A new device and a moved pin: index and sections are rebuilt from the edited file
+    rewrite(manual, MANUAL.replace("pin 4", "pin 7") + "\n### 3. MIRROR-SENSOR\n**Description:**\nHall sensor.\n",
+            mtime_ns=2_000_000_000)
+    assert [d["slug"] for d in grimoire_loader.get_device_index()] == ["cannon", "desk-drawer", "mirror-sensor"]
+    section, looked_up = counted("grimoire_sections", lambda: grimoire_loader.get_device_section("cannon"))
+    assert "pin 7" in section["html"] and looked_up == (1, 1)
+    assert grimoire_loader.get_device_section("mirror-sensor")["name"] == "Mirror Sensor"
+
+    manual.unlink()
+    assert grimoire_loader.get_device_index() == []
+    assert grimoire_loader.get_device_section("cannon") is None
@@ -0,0 +1,101 @@
+import sqlite3
+import threading
+import time
+
+from models import database as db
+
+
+def tables(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        conn.close()
+
+
+def test_time_series_tables_live_in_the_hot_file(database):
+    database.log_mqtt_messages([("2026-03-01 10:00:00", "in", "MermaidsTale/Prop1/status", "online", "Prop1")])
+    database.record_status_changes([("2026-03-01 10:00:00", "Prop1", "online")])
+
+    hot = tables(database.HOT_DATABASE_PATH)
+    main = tables(database.DATABASE_PATH)
+    for table in ("game_events", "game_sessions", "device_status_history", "mqtt_log_20260301"):
+        assert table in hot
+        assert table not in main
+    assert {"debug_log", "todo_items", "device_reliability"} <= main
+
+
+def test_main_connections_read_hot_tables_through_the_attachment(database):
+    database.record_status_changes([
+        ("2026-03-01 10:00:00", "Prop1", "online"),
+        ("2026-03-01 10:05:00", "Prop1", "offline"),
+    ])
+    database.add_debug_entry("Prop1", "warning", "went offline")
+
+    with database.get_db() as conn:
+        rows = conn.execute(
+            """SELECT d.title, h.status FROM debug_log d
+               JOIN hot.device_status_history h USING (device_name)
+               ORDER BY h.timestamp""").fetchall()
+    assert [tuple(row) for row in rows] == [("went offline", "online"), ("went offline", "offline")]
+
+    # rebuild_reliability folds hot.device_status_history into the main-file summary
+    with database.get_db() as conn:
+        conn.execute("UPDATE device_reliability SET last_status = NULL, last_status_at = NULL")
+    database.rebuild_reliability()
+    assert database.get_device_reliability("Prop1")[0]["status"] == "offline"
+
+
+def test_hot_writes_do_not_wait_for_the_main_write_lock(database):
+    locked, release = threading.Event(), threading.Event()
+
+    def hold_main_lock():
+        with db.get_db() as conn:
+            # An open main-file write, the way a slow request or batch holds it
+            conn.execute("INSERT INTO debug_log (title) VALUES ('holding the lock')")
+            locked.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold_main_lock)
+    holder.start()
+    try:
+        assert locked.wait(5)
+        started = time.perf_counter()
+        database.log_mqtt_messages([("2026-03-01 10:00:00", "in", "MermaidsTale/Prop1/angle", "90", "Prop1")])
+        assert time.perf_counter() - started < 1
+    finally:
+        release.set()
+        holder.join()
+    assert database.query_mqtt_log()[0]["payload"] == "90"
+
+
+def test_pre_split_databases_move_time_series_to_the_hot_file(tmp_path, monkeypatch):
+    import config
+
+    path = str(tmp_path / "legacy.db")
+    legacy = sqlite3.connect(path)
+    legacy.executescript("""
+        CREATE TABLE mqtt_log (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, direction TEXT,
+                               topic TEXT, payload TEXT, device_name TEXT);
+        CREATE TABLE device_status_history (id INTEGER PRIMARY KEY AUTOINCREMENT, device_name TEXT NOT NULL,
+                                            timestamp TEXT NOT NULL, status TEXT NOT NULL);
+        INSERT INTO mqtt_log (timestamp, direction, topic, payload, device_name)
+            VALUES ('2026-02-28 23:59:00', 'in', 'MermaidsTale/Prop1/status', 'online', 'Prop1'),
+                   ('2026-03-01 00:01:00', 'in', 'MermaidsTale/Prop1/status', 'offline', 'Prop1');
+        INSERT INTO device_status_history (device_name, timestamp, status)
+            VALUES ('Prop1', '2026-03-01 00:01:00', 'offline');
+    """)
+    legacy.commit()
+    legacy.close()
+
+    monkeypatch.setattr(config, "DATABASE_PATH", path)
+    try:
+        db.init_db(path)
+        main = tables(path)
+        assert not {"mqtt_log", "device_status_history"} & main
+        assert {"mqtt_log_20260228", "mqtt_log_20260301", "device_status_history"} <= tables(db.HOT_DATABASE_PATH)
+        assert [row["payload"] for row in db.query_mqtt_log()] == ["online", "offline"]
+        with db.get_hot_db() as hot:
+            assert hot.execute("SELECT status FROM device_status_history").fetchone()[0] == "offline"
+    finally:
+        db.close_connections()
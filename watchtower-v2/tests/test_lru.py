@@ -0,0 +1,40 @@
+from mqtt import lru
+from mqtt.lru import BoundedCache
+
+
+def test_evicts_least_recently_used_at_maxsize():
+    cache = BoundedCache("test_lru", maxsize=3)
+    for key in "abc":
+        cache[key] = key.upper()
+    assert cache.get("a") == "A"     # touch: b is now the oldest
+
+    cache["d"] = "D"
+
+    assert len(cache) == 3
+    assert cache.keys() == ["c", "a", "d"]
+    assert "b" not in cache
+    assert cache.evictions == 1
+
+
+def test_stays_at_maxsize_under_churn():
+    cache = BoundedCache("test_churn", maxsize=100)
+    for i in range(10_000):
+        cache[f"topic/{i}"] = i
+    assert len(cache) == 100
+    assert cache.evictions == 9_900
+    assert cache.keys()[0] == "topic/9900"
+
+
+def test_expires_entries_older_than_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(lru.time, "monotonic", lambda: now[0])
+    cache = BoundedCache("test_ttl", maxsize=10, ttl=60)
+    cache["old"] = 1
+    now[0] += 30
+    cache["new"] = 2
+    now[0] += 31
+
+    assert cache.get("old") is None
+    assert cache.get("new") == 2
+    assert cache.expirations == 1
+    assert len(cache) == 1
@@ -0,0 +1,53 @@
+import json
+
+import config
+
+
+def test_history_records_only_changed_fields(database):
+    db = database
+    manifest = {"firmware_version": "1.0.0", "board_type": "ESP32-S3", "broker_port": 1883}
+
+    assert db.upsert_manifest("JungleDoor", manifest) == "inserted"
+    assert db.upsert_manifest("JungleDoor", manifest) == "unchanged"
+    assert db.upsert_manifest("JungleDoor", dict(manifest, firmware_version="1.1.0")) == "updated"
+
+    latest, first = db.get_manifest_history("JungleDoor")
+    assert first["initial"] and not latest["initial"]
+    assert latest["changes"] == {"firmware_version": {"old": "1.0.0", "new": "1.1.0"}}
+    assert latest["prev_hash"] == first["content_hash"]
+
+    board, = db.get_manifest_history("JungleDoor", fields=["board_type"])
+    assert board["id"] == first["id"]
+    assert board["changes"] == {"board_type": {"old": None, "new": "ESP32-S3"}}
+
+
+def test_first_sync_after_upgrade_is_a_diff_not_initial(database):
+    db = database
+    # A row stored before content hashes existed
+    with db.get_db() as conn:
+        conn.execute("""INSERT INTO device_manifests (device_name, firmware_version, board_type)
+                        VALUES ('JungleDoor', '1.0.0', 'ESP32-S3')""")
+
+    assert db.upsert_manifest("JungleDoor", {"firmware_version": "1.1.0", "board_type": "ESP32-S3"}) == "updated"
+    entry, = db.get_manifest_history("JungleDoor")
+    assert entry["prev_hash"] is None
+    assert not entry["initial"]
+    assert entry["changes"] == {"firmware_version": {"old": "1.0.0", "new": "1.1.0"}}
+
+
+def test_upgrade_backfills_initial_from_the_recorded_changes(database):
+    db = database
+    rows = [
+        ("JungleDoor", "2026-01-01T10:00:00", "a", None, {"firmware_version": {"old": None, "new": "1.0.0"}}),
+        ("Cannon1", "2026-01-02T10:00:00", "b", None, {"firmware_version": {"old": "0.9.0", "new": "1.0.0"}}),
+    ]
+    with db.get_db() as conn:
+        conn.executemany(
+            """INSERT INTO manifest_history (device_name, synced_at, content_hash, prev_hash, changes)
+               VALUES (?, ?, ?, ?, ?)""",
+            [(*row[:4], json.dumps(row[4])) for row in rows])
+        conn.execute("ALTER TABLE manifest_history DROP COLUMN initial")
+
+    db.init_db(config.DATABASE_PATH)
+    assert db.get_manifest_history("JungleDoor")[0]["initial"]
+    assert not db.get_manifest_history("Cannon1")[0]["initial"]
@@ -0,0 +1,98 @@
+import gzip
+import json
+import os
+import stat
+from datetime import date
+
+import pytest
+
+import config
+
+TODAY = date(2026, 3, 5)
+
+
+def message(day, clock, device="Prop1", topic=None, payload=None):
+    timestamp = f"2026-03-{day:02d} {clock}.000"
+    return (timestamp, "in", topic or f"MermaidsTale/{device}/status", payload or timestamp, device)
+
+
+@pytest.fixture
+def mqtt_log(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MQTT_ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(config, "MQTT_LOG_HOT_DAYS", 2)
+    monkeypatch.setattr(config, "MQTT_LOG_RETENTION_DAYS", 30)
+    rows = [message(day, clock, device)
+            for day in range(1, 6)
+            for clock, device in (("08:00:00", "Prop1"), ("12:00:00", "Prop2"), ("20:00:00", "Prop1"))]
+    database.log_mqtt_messages(rows)
+    return rows
+
+
+def payloads(rows):
+    return [row["payload"] for row in rows]
+
+
+def live_days(database):
+    return [p["day"] for p in database.get_mqtt_log_storage()["partitions"]]
+
+
+def test_rotation_archives_days_past_the_hot_window(database, mqtt_log):
+    assert live_days(database) == [f"2026-03-0{d}" for d in range(1, 6)]
+
+    result = database.rotate_mqtt_log(TODAY)
+    assert result == {"archived": {"2026-03-01": 3, "2026-03-02": 3, "2026-03-03": 3},
+                      "dropped": [], "deleted_archives": []}
+    assert live_days(database) == ["2026-03-04", "2026-03-05"]
+
+    path = os.path.join(config.MQTT_ARCHIVE_DIR, "mqtt_log_20260302.ndjson.gz")
+    assert not os.stat(path).st_mode & stat.S_IWUSR
+    with gzip.open(path, "rt") as f:
+        assert [json.loads(line)["payload"] for line in f] == [row[3] for row in mqtt_log[3:6]]
+
+    assert database.rotate_mqtt_log(TODAY) == {"archived": {}, "dropped": [], "deleted_archives": []}
+
+
+def test_queries_span_archives_and_live_partitions(database, mqtt_log):
+    database.rotate_mqtt_log(TODAY)
+
+    assert payloads(database.query_mqtt_log()) == [row[3] for row in mqtt_log]
+    assert payloads(database.query_mqtt_log(limit=4)) == [row[3] for row in mqtt_log[:4]]
+    # From an archived evening into a live morning, start inclusive and end exclusive
+    window = database.query_mqtt_log(start="2026-03-03 12:00:00.000", end="2026-03-04 12:00:00.000")
+    assert payloads(window) == ["2026-03-03 12:00:00.000", "2026-03-03 20:00:00.000", "2026-03-04 08:00:00.000"]
+    prop2 = database.query_mqtt_log(device_name="Prop2", start="2026-03-02 00:00:00")
+    assert payloads(prop2) == [f"2026-03-0{d} 12:00:00.000" for d in range(2, 6)]
+    topic = list(database.iter_mqtt_log(topic="MermaidsTale/Prop2/status", end="2026-03-02 00:00:00"))
+    assert payloads(topic) == ["2026-03-01 12:00:00.000"]
+
+
+def test_late_rows_merge_into_an_existing_archive_in_time_order(database, mqtt_log):
+    database.rotate_mqtt_log(TODAY)
+    # Late messages for an archived day land in a new live partition for it
+    database.log_mqtt_messages([message(2, "10:00:00", "Prop3"), message(2, "23:00:00", "Prop3")])
+    assert "2026-03-02" in live_days(database)
+
+    day = database.query_mqtt_log(start="2026-03-02 00:00:00", end="2026-03-03 00:00:00")
+    expected = ["2026-03-02 08:00:00.000", "2026-03-02 10:00:00.000", "2026-03-02 12:00:00.000",
+                "2026-03-02 20:00:00.000", "2026-03-02 23:00:00.000"]
+    assert payloads(day) == expected
+
+    assert database.rotate_mqtt_log(TODAY)["archived"] == {"2026-03-02": 5}
+    assert "2026-03-02" not in live_days(database)
+    with gzip.open(os.path.join(config.MQTT_ARCHIVE_DIR, "mqtt_log_20260302.ndjson.gz"), "rt") as f:
+        assert [json.loads(line)["payload"] for line in f] == expected
+    assert payloads(database.query_mqtt_log(device_name="Prop3")) == expected[1::3]
+
+
+def test_retention_drops_partitions_and_deletes_archives(database, mqtt_log, monkeypatch):
+    database.rotate_mqtt_log(TODAY)
+    monkeypatch.setattr(config, "MQTT_LOG_RETENTION_DAYS", 3)
+
+    # Keeps 03-03..03-05: the two oldest archives go, the live days stay hot
+    result = database.rotate_mqtt_log(TODAY)
+    assert result == {"archived": {}, "dropped": [], "deleted_archives": ["2026-03-01", "2026-03-02"]}
+
+    # Two days on, 03-04 is past retention before it was ever archived
+    result = database.rotate_mqtt_log(date(2026, 3, 7))
+    assert result == {"archived": {"2026-03-05": 3}, "dropped": ["2026-03-04"], "deleted_archives": ["2026-03-03"]}
+    assert payloads(database.query_mqtt_log()) == [row[3] for row in mqtt_log[12:]]
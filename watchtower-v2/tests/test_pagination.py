@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+import pytest
+from flask import Flask
+
+from routes import api as api_routes
+
+T0 = datetime(2026, 3, 14, 18, 0, 0)
+
+
+@pytest.fixture
+def http(database):
+    app = Flask(__name__)
+    app.register_blueprint(api_routes.api)
+    return app.test_client()
+
+
+def walk(http, url, key, limit):
+    """Every row reachable by following `next` cursors, page by page."""
+    rows, after = [], None
+    while True:
+        page = http.get(f"{url}?limit={limit}" + (f"&after={quote(after)}" if after else "")).get_json()
+        assert len(page[key]) <= limit
+        rows.extend(page[key])
+        after = page["next"]
+        if after is None:
+            return rows
+
+
+def expected(database, sql):
+    with database.get_db() as conn:
+        return [row[0] for row in conn.execute(sql)]
+
+
+@pytest.mark.parametrize("limit", [1, 4, 7, 50])
+def test_debug_log_pages_across_equal_timestamps(database, http, limit):
+    # 30 rows sharing five timestamps, so every page boundary lands inside a tie
+    with database.get_db() as conn:
+        conn.executemany(
+            "INSERT INTO debug_log (timestamp, device_name, title) VALUES (?, ?, ?)",
+            [((T0 + timedelta(minutes=i % 5)).strftime("%Y-%m-%d %H:%M:%S"), "JungleDoor", f"issue {i}")
+             for i in range(30)])
+
+    ids = [row["id"] for row in walk(http, "/api/debug-log", "entries", limit)]
+    assert ids == expected(database, "SELECT id FROM debug_log ORDER BY timestamp DESC, id DESC")
+    assert len(set(ids)) == 30
+
+
+@pytest.mark.parametrize("limit", [1, 4, 7, 50])
+def test_todos_page_across_equal_rank_and_timestamp(database, http, limit):
+    priorities = ["urgent", "high", "normal", "low"]
+    with database.get_db() as conn:
+        conn.executemany(
+            "INSERT INTO todo_items (timestamp, title, priority) VALUES (?, ?, ?)",
+            [((T0 + timedelta(minutes=i % 3)).strftime("%Y-%m-%d %H:%M:%S"), f"todo {i}", priorities[i % 4])
+             for i in range(30)])
+
+    ids = [row["id"] for row in walk(http, "/api/todos", "todos", limit)]
+    assert ids == expected(database, "SELECT id FROM todo_items ORDER BY priority_rank DESC, timestamp DESC, id DESC")
+    assert len(set(ids)) == 30
+
+
+@pytest.mark.parametrize("limit", [1, 4, 7, 50])
+def test_mqtt_log_pages_across_partitions_and_equal_timestamps(database, http, limit):
+    # Two day partitions, ten messages per millisecond timestamp
+    database.log_mqtt_messages([
+        (T0 + timedelta(days=i // 20, milliseconds=i % 2), "RX", "MermaidsTale/Cannon1/status", str(i), "Cannon1")
+        for i in range(40)
+    ])
+
+    rows = walk(http, "/api/mqtt-log", "messages", limit)
+    payloads = [row["payload"] for row in rows]
+    assert sorted(payloads, key=int) == [str(i) for i in range(40)]
+    assert [(r["timestamp"], r["id"]) for r in rows] == sorted(((r["timestamp"], r["id"]) for r in rows), reverse=True)
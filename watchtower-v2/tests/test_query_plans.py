@@ -0,0 +1,122 @@
+"""
+EXPLAIN QUERY PLAN checks for every list query (debug log, todos, MQTT log,
+checklist history, device status timeline), for each filter/cursor
+combination, with and without ANALYZE statistics:
+
+    - no temp B-tree for ORDER BY, so an unfiltered page reads LIMIT rows
+      in index (or rowid) order and stops
+    - filtered queries must SEARCH an index, never scan the table
+"""
+
+from datetime import datetime, timedelta
+from itertools import product
+
+import pytest
+
+import config
+from models import database as db
+
+
+def seed(rows=2000, analyze=True):
+    now = datetime.now()
+    devices = ["JungleDoor", "Cannon1", "Captains-Cuffs", "CoveDoor", None]
+    priorities = ["urgent", "high", "normal", "low"]
+    with db.get_db() as conn:
+        for i in range(rows):
+            ts = (now - timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S")
+            conn.execute(
+                "INSERT INTO debug_log (timestamp, device_name, title, resolved) VALUES (?, ?, ?, ?)",
+                (ts, devices[i % 5], f"issue {i}", i % 3 == 0))
+            conn.execute(
+                "INSERT INTO todo_items (timestamp, device_name, title, priority, status) VALUES (?, ?, ?, ?, ?)",
+                (ts, devices[i % 5], f"todo {i}", priorities[i % 4], "open" if i % 2 else "done"))
+            conn.execute(
+                "INSERT INTO checklist_runs (started_at, passed) VALUES (?, 1)", (ts,))
+    with db.get_hot_db() as hot:
+        hot.executemany(
+            "INSERT INTO device_status_history (device_name, timestamp, status) VALUES (?, ?, ?)",
+            [(devices[i % 4], (now - timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+              ["online", "testing", "offline"][i % 3]) for i in range(rows)])
+    db.log_mqtt_messages([
+        (now - timedelta(seconds=i * 30), "RX", f"MermaidsTale/{devices[i % 4]}/status", "OK", devices[i % 4])
+        for i in range(rows)
+    ])
+    if analyze:
+        with db.get_db() as conn:
+            conn.execute("ANALYZE")
+            conn.execute("ANALYZE hot")
+
+
+def capture(call):
+    """Run `call` and return the SELECT statements it executed, with values bound."""
+    statements = []
+    with db.get_db() as conn, db.get_hot_db() as hot:
+        for c in (conn, hot):
+            c.set_trace_callback(statements.append)
+        try:
+            call()
+        finally:
+            for c in (conn, hot):
+                c.set_trace_callback(None)
+    return [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+
+
+def problems(conn, sql, filtered):
+    plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+    bad = []
+    for step in plan:
+        if "sqlite_master" in step:
+            continue  # partition lookup reads the schema catalog
+        if "TEMP B-TREE" in step:
+            bad.append(step)
+        elif step.startswith("SCAN") and filtered:
+            bad.append(step + " (filtered query should SEARCH)")
+    return plan, bad
+
+
+def cases():
+    debug_cursor = ("2999-01-01 00:00:00", 1)
+    todo_cursor = (4, "2999-01-01 00:00:00", 1)
+    log_cursor = (datetime.now().isoformat(sep=" ", timespec="milliseconds"), 10**9)
+
+    for device, resolved, after in product([None, "JungleDoor"], [None, False], [None, debug_cursor]):
+        yield (f"debug_log device={device} resolved={resolved} after={bool(after)}",
+               device or resolved is not None,
+               lambda d=device, r=resolved, a=after: db.get_debug_entries(device_name=d, resolved=r, after=a))
+    for device, status, after in product([None, "JungleDoor"], [None, "open"], [None, todo_cursor]):
+        yield (f"todos device={device} status={status} after={bool(after)}",
+               device or status,
+               lambda d=device, st=status, a=after: db.get_todos(device_name=d, status=st, after=a))
+    for device, after in product([None, "Cannon1"], [None, log_cursor]):
+        yield (f"mqtt_log device={device} after={bool(after)}",
+               bool(device),
+               lambda d=device, a=after: db.get_mqtt_log(device_name=d, after=a))
+    for after in [None, 500]:
+        yield (f"checklist_runs after={after}", False,
+               lambda a=after: db.get_checklist_runs(after=a))
+    yield ("status timeline device=Cannon1", True,
+           lambda: db.get_status_timeline("Cannon1", datetime.now() - timedelta(days=1)))
+
+
+CASES = list(cases())
+
+
+@pytest.fixture(scope="module", params=[True, False], ids=["analyzed", "no-stats"])
+def seeded(request, tmp_path_factory):
+    with pytest.MonkeyPatch.context() as mp:
+        path = str(tmp_path_factory.mktemp("plans") / "plans.db")
+        mp.setattr(config, "DATABASE_PATH", path)
+        db.init_db(path)
+        seed(analyze=request.param)
+        yield
+        db.close_connections()
+
+
+@pytest.mark.parametrize("filtered, call", [case[1:] for case in CASES], ids=[case[0] for case in CASES])
+def test_list_query_plan(seeded, filtered, call):
+    statements = capture(call)
+    assert statements
+    with db.get_db() as conn:
+        for sql in statements:
+            plan, bad = problems(conn, sql, bool(filtered))
+            assert not bad, f"{sql}\n  " + "\n  ".join(plan)
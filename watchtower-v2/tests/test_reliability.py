@@ -0,0 +1,103 @@
+import importlib.util
+import os
+
+import pytest
+
+import config
+
+_SCRIPT = os.path.join(os.path.dirname(config.__file__), "..", "scripts", "rebuild_analytics.py")
+
+
+@pytest.fixture
+def rebuild_analytics():
+    spec = importlib.util.spec_from_file_location("rebuild_analytics", _SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def add_incident(db, device, timestamp, resolved_at=None):
+    entry_id = db.add_debug_entry(device, "warning", f"{device} at {timestamp}")
+    with db.get_db() as conn:
+        conn.execute("UPDATE debug_log SET timestamp = ? WHERE id = ?", (timestamp, entry_id))
+        if resolved_at:
+            conn.execute("UPDATE debug_log SET resolved = 1, resolved_at = ? WHERE id = ?", (resolved_at, entry_id))
+    return entry_id
+
+
+def assert_matches_rebuild(db, rebuild_analytics):
+    before = rebuild_analytics.snapshot()
+    db.rebuild_reliability()
+    assert rebuild_analytics.differences(before, rebuild_analytics.snapshot()) == []
+
+
+def test_triggers_track_inserts_updates_and_deletes(database, rebuild_analytics):
+    db = database
+    add_incident(db, "JungleDoor", "2026-01-05 10:00:00", "2026-01-05 12:00:00")
+    add_incident(db, "JungleDoor", "2026-02-10 09:00:00")
+    march = add_incident(db, "JungleDoor", "2026-03-01 11:00:00", "2026-03-02 11:00:00")
+    other = add_incident(db, "Cannon1", "2026-02-11 14:00:00")
+    assert_matches_rebuild(db, rebuild_analytics)
+
+    with db.get_db() as conn:
+        conn.execute("UPDATE debug_log SET device_name = 'Cannon2' WHERE id = ?", (other,))
+        conn.execute("UPDATE debug_log SET timestamp = '2026-03-01 08:00:00' WHERE id = ?", (march,))
+    assert_matches_rebuild(db, rebuild_analytics)
+
+
+def test_removing_the_earliest_incident_moves_first_incident(database, rebuild_analytics):
+    db = database
+    first = add_incident(db, "JungleDoor", "2026-01-05 10:00:00", "2026-01-05 12:00:00")
+    add_incident(db, "JungleDoor", "2026-02-10 09:00:00")
+
+    with db.get_db() as conn:
+        conn.execute("DELETE FROM debug_log WHERE id = ?", (first,))
+        summary = conn.execute(
+            "SELECT first_incident FROM device_reliability WHERE device_name = 'JungleDoor'").fetchone()
+        months = [row[0] for row in conn.execute(
+            "SELECT month FROM device_incidents_monthly WHERE device_name = 'JungleDoor'")]
+    assert summary["first_incident"] == "2026-02-10 09:00:00"
+    assert months == ["2026-02"]
+    assert_matches_rebuild(db, rebuild_analytics)
+
+    # Moving the earliest incident later has to be noticed too
+    with db.get_db() as conn:
+        conn.execute("UPDATE debug_log SET timestamp = '2026-04-01 09:00:00' WHERE device_name = 'JungleDoor'")
+    assert_matches_rebuild(db, rebuild_analytics)
+
+    with db.get_db() as conn:
+        conn.execute("DELETE FROM debug_log")
+    assert_matches_rebuild(db, rebuild_analytics)
+
+
+def test_resolving_through_the_api_updates_mttr(database, rebuild_analytics):
+    db = database
+    entry_id = add_incident(db, "JungleDoor", "2026-01-05 10:00:00")
+    assert db.get_device_reliability("JungleDoor")[0]["open_incidents"] == 1
+
+    db.resolve_debug_entry(entry_id, "reseated the maglock")
+    summary, = db.get_device_reliability("JungleDoor")
+    assert (summary["open_incidents"], summary["resolved_incidents"], summary["mttr_samples"]) == (0, 1, 1)
+    assert summary["mttr_hours"] > 0
+    assert_matches_rebuild(db, rebuild_analytics)
+
+
+def test_uptime_folded_batch_by_batch_matches_a_full_rebuild(database, rebuild_analytics):
+    db = database
+    batches = [
+        [("2026-03-02 17:00:00", "JungleDoor", "online"), ("2026-03-02 18:30:00", "Cannon1", "unknown")],
+        [("2026-03-02 19:00:00", "JungleDoor", "offline"), ("2026-03-02 19:00:30", "JungleDoor", "offline")],
+        [("2026-03-02 19:20:00", "JungleDoor", "testing"), ("2026-03-02 19:40:00", "JungleDoor", "online"),
+         ("2026-03-02 20:00:00", "Cannon1", "online")],
+        [("2026-03-03 09:00:00", "JungleDoor", "offline"), ("2026-03-03 18:00:00", "JungleDoor", "online"),
+         ("2026-03-03 18:00:00", "Cannon1", "offline")],
+    ]
+    for batch in batches:
+        db.record_status_changes(batch)
+
+    with db.get_db() as conn:
+        totals = {row["device_name"]: (row["game_seconds"], row["online_seconds"], row["last_status"])
+                  for row in conn.execute("SELECT * FROM device_reliability")}
+    assert totals["JungleDoor"][2] == "online"
+    assert totals["JungleDoor"][0] > totals["JungleDoor"][1] > 0
+    assert_matches_rebuild(db, rebuild_analytics)
@@ -0,0 +1,91 @@
+import threading
+
+from models import grimoire_loader
+
+
+def test_grimoire_reindex_is_a_queued_write_not_part_of_search(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(grimoire_loader, "GRIMOIRE_DIR", str(tmp_path))
+    doc = tmp_path / "operations-manual.md"
+    doc.write_text("# Cannon\n\nThe cannon fuse relay sits under the deck.\n")
+
+    queued = []
+    submit_write = database.submit_write
+    monkeypatch.setattr(database, "submit_write",
+                        lambda fn, *a, **kw: queued.append(fn.__name__) or submit_write(fn, *a, **kw))
+    split_on = []
+    split_sections = grimoire_loader.split_sections
+    monkeypatch.setattr(grimoire_loader, "split_sections",
+                        lambda doc: split_on.append(threading.current_thread()) or split_sections(doc))
+
+    assert database.reindex_grimoire() == ["operations-manual.md"]
+    # Only the row swap goes to the writer; the file is read on this thread
+    assert queued == ["_replace_grimoire_sections"]
+    assert split_on == [threading.current_thread()]
+    assert database.reindex_grimoire() == []
+    assert queued == ["_replace_grimoire_sections"]
+    assert [h["kind"] for h in database.search("fuse relay", kinds=["grimoire"])] == ["grimoire"]
+
+    # Searching never re-reads the docs; an edit shows up after the next reindex
+    doc.write_text("# Cannon\n\nThe cannon igniter is wired to relay 3.\n")
+    assert database.search("igniter", kinds=["grimoire"]) == []
+    assert database.reindex_grimoire(force=True) == ["operations-manual.md"]
+    assert len(database.search("igniter", kinds=["grimoire"])) == 1
+
+
+def hits(database, text, kind):
+    return [h["id"] for h in database.search(text, kinds=[kind])]
+
+
+def assert_index_consistent(database):
+    with database.get_db() as conn:
+        for table, _, _ in database.SEARCH_SOURCES.values():
+            conn.execute(f"INSERT INTO {table}_fts({table}_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def test_debug_log_index_follows_insert_update_and_delete(database):
+    entry_id = database.add_debug_entry("Prop1", "warning", "Cannon fuse sticks", "Relay clicks but no fire")
+    assert hits(database, "fuse", "debug") == [entry_id]
+    assert hits(database, "relay", "debug") == [entry_id]
+
+    database.resolve_debug_entry(entry_id, "Swapped the solenoid")
+    assert hits(database, "solenoid", "debug") == [entry_id]
+    with database.get_db() as conn:
+        conn.execute("UPDATE debug_log SET title = 'Cannon igniter sticks' WHERE id = ?", (entry_id,))
+    assert hits(database, "fuse", "debug") == []
+    assert hits(database, "igniter", "debug") == [entry_id]
+
+    with database.get_db() as conn:
+        conn.execute("DELETE FROM debug_log WHERE id = ?", (entry_id,))
+    assert hits(database, "igniter", "debug") == []
+    assert_index_consistent(database)
+
+
+def test_todo_and_manifest_index_follow_their_tables(database):
+    todo_id = database.add_todo("Order spare relays", device_name="Prop1", description="Two 5V modules")
+    assert hits(database, "spare", "todo") == [todo_id]
+    database.update_todo_status(todo_id, "completed")  # status isn't indexed; the row stays findable
+    assert hits(database, "spare", "todo") == [todo_id]
+    with database.get_db() as conn:
+        conn.execute("UPDATE todo_items SET description = 'Two 12V modules' WHERE id = ?", (todo_id,))
+    assert hits(database, "12V", "todo") == [todo_id]
+    assert hits(database, "5V", "todo") == []
+
+    database.upsert_manifest("JungleDoor", {"description": "Maglock door", "known_quirks": "Sticks when cold"})
+    manifest_id, = hits(database, "maglock", "manifest")
+    database.upsert_manifest("JungleDoor", {"description": "Maglock door", "known_quirks": "Hinge squeaks"})
+    assert hits(database, "cold", "manifest") == []
+    assert hits(database, "hinge", "manifest") == [manifest_id]
+    assert_index_consistent(database)
+
+
+def test_grimoire_sections_leave_the_index_with_their_doc(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(grimoire_loader, "GRIMOIRE_DIR", str(tmp_path))
+    doc = tmp_path / "wiring-reference.md"
+    doc.write_text("# Lighthouse\n\nThe beacon relay is on pin 12.\n")
+    database.reindex_grimoire()
+    assert len(database.search("beacon", kinds=["grimoire"])) == 1
+
+    doc.unlink()
+    assert database.reindex_grimoire() == ["wiring-reference.md"]
+    assert database.search("beacon", kinds=["grimoire"]) == []
+    assert_index_consistent(database)
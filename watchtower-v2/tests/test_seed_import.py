@@ -0,0 +1,78 @@
+import sqlite3
+
+import pytest
+
+
+def issue(title, description="", resolved=False, device="Prop1"):
+    return {"device_name": device, "severity": "warning", "title": title,
+            "description": description, "resolution": None, "resolved": resolved}
+
+
+def fts_triggers(database):
+    with database.get_db() as conn:
+        return {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_fts_%'")}
+
+
+def test_reimport_only_writes_what_changed(database):
+    issues = [issue("Cannon fuse sticks"), issue("Chest latch slips"), issue("Wheel sensor drifts")]
+    assert database.import_debug_entries(issues) == {"inserted": 3, "updated": 0, "unchanged": 0}
+    assert database.import_debug_entries(issues) == {"inserted": 0, "updated": 0, "unchanged": 3}
+
+    issues[1] = issue("Chest latch slips", "shimmed the strike plate", resolved=True)
+    assert database.import_debug_entries(issues) == {"inserted": 0, "updated": 1, "unchanged": 2}
+    assert database.import_debug_entries(issues, force=True) == {"inserted": 0, "updated": 3, "unchanged": 0}
+
+    entries = database.get_debug_entries()
+    assert sorted(e["title"] for e in entries) == sorted(i["title"] for i in issues)
+    latch = next(e for e in entries if e["title"] == "Chest latch slips")
+    assert (latch["description"], latch["resolved"]) == ("shimmed the strike plate", 1)
+    # The deferred index picked up the new text once, with no stale or duplicate entries
+    assert [h["id"] for h in database.search("strike plate", kinds=["debug"])] == [latch["id"]]
+
+
+def test_import_adopts_rows_seeded_before_import_keys(database):
+    with database.get_db() as conn:
+        conn.execute(
+            """INSERT INTO debug_log (device_name, severity, title, description, resolution, resolved, created_by)
+               VALUES ('Prop1', 'warning', 'Cannon fuse sticks', '', NULL, 0, 'grimoire_import')""")
+        conn.execute(
+            """INSERT INTO todo_items (device_name, title, description, priority, created_by)
+               VALUES (NULL, 'Order spare relays', NULL, 'high', 'watchtower')""")
+        # Same title, but added by hand in WatchTower: not the seeder's row
+        conn.execute(
+            """INSERT INTO debug_log (device_name, severity, title, created_by)
+               VALUES ('Prop1', 'warning', 'Chest latch slips', 'system')""")
+
+    counts = database.import_debug_entries([issue("Cannon fuse sticks"), issue("Chest latch slips")])
+    assert counts == {"inserted": 1, "updated": 0, "unchanged": 1}
+    counts = database.import_todos([{"device_name": None, "title": "Order spare relays", "priority": "high"}])
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": 1}
+
+    with database.get_db() as conn:
+        rows = conn.execute("SELECT title, created_by, import_key IS NOT NULL FROM debug_log ORDER BY id").fetchall()
+        todo = conn.execute("SELECT count(*), min(import_key) IS NOT NULL FROM todo_items").fetchone()
+    assert [tuple(r) for r in rows] == [
+        ("Cannon fuse sticks", "grimoire_import", 1),
+        ("Chest latch slips", "system", 0),
+        ("Chest latch slips", "grimoire_import", 1),
+    ]
+    assert tuple(todo) == (1, 1)
+
+
+def test_failed_import_leaves_search_triggers_in_place(database):
+    triggers = fts_triggers(database)
+    assert {"debug_log_fts_ai", "debug_log_fts_au", "debug_log_fts_ad"} <= triggers
+    database.import_debug_entries([issue("Cannon fuse sticks")])
+
+    # The NOT NULL title fails partway through the executemany, with the triggers dropped
+    with pytest.raises(sqlite3.IntegrityError):
+        database.import_debug_entries([issue("Chest latch slips"), issue(None), issue("Wheel sensor drifts")])
+
+    assert fts_triggers(database) == triggers
+    assert [e["title"] for e in database.get_debug_entries()] == ["Cannon fuse sticks"]
+    entry_id = database.add_debug_entry("Prop2", "info", "Bilge pump hums")
+    assert [h["id"] for h in database.search("bilge", kinds=["debug"])] == [entry_id]
+    database.resolve_debug_entry(entry_id, "tightened the impeller")
+    assert [h["id"] for h in database.search("impeller", kinds=["debug"])] == [entry_id]
+    assert len(database.search("cannon", kinds=["debug"])) == 1
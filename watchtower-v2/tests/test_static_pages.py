@@ -0,0 +1,23 @@
+import os
+
+import config
+import static_pages
+from app import create_app
+
+
+def test_source_files_cover_docs_templates_and_config():
+    sources = static_pages._source_files(create_app())
+    names = [os.path.basename(path) for path in sources]
+    assert set(static_pages.LIBRARY_DOCS) <= set(names)
+    assert {"base.html", "library.html", "device_page.html"} <= set(names)
+    assert os.path.abspath(config.__file__) in sources
+
+
+def test_build_goes_stale_when_a_source_changes(tmp_path):
+    source = tmp_path / "config.py"
+    source.write_text("GRAVITY_GAMES_TOPICS = {}\n")
+    manifest = {"sources": {str(source): static_pages._stamp(str(source))}}
+    assert static_pages.is_current(manifest)
+
+    source.write_text("GRAVITY_GAMES_TOPICS = {'Ball': 'MermaidsTale/Ball'}\n")
+    assert not static_pages.is_current(manifest)
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from routes import api as api_routes
+
+DAY = datetime(2026, 3, 1)
+
+
+def at(clock):
+    return DAY.replace(hour=int(clock[:2]), minute=int(clock[3:]))
+
+
+@pytest.fixture
+def history(database):
+    database.record_status_changes([
+        (at("10:00"), "Prop1", "online"),
+        (at("10:30"), "Prop1", "offline"),
+        (at("10:45"), "Prop1", "online"),
+        (at("11:00"), "Prop1", "testing"),
+        (at("11:10"), "Prop1", "online"),
+        (at("11:30"), "Prop1", "offline"),
+    ])
+    return database
+
+
+def test_outages_and_uptime_within_the_window(history):
+    timeline = history.get_status_timeline("Prop1", at("10:00"), at("12:00"))
+    assert timeline["outages"] == [
+        {"start": "2026-03-01 10:30:00", "end": "2026-03-01 10:45:00", "duration_s": 900.0},
+        {"start": "2026-03-01 11:30:00", "end": "2026-03-01 12:00:00", "duration_s": 1800.0},
+    ]
+    # "testing" is neither up nor down: the online stretch runs straight through it
+    assert timeline["seconds"] == {"online": 4500.0, "offline": 2700.0, "unknown": 0.0}
+    assert timeline["uptime_pct"] == 62.5
+    assert timeline["changes"] == 6
+
+
+def test_window_opening_mid_outage_reports_when_it_began(history):
+    timeline = history.get_status_timeline("Prop1", at("10:40"), at("11:00"))
+    assert timeline["outages"] == [
+        {"start": "2026-03-01 10:30:00", "end": "2026-03-01 10:45:00", "duration_s": 900.0},
+    ]
+    assert timeline["seconds"] == {"online": 900.0, "offline": 300.0, "unknown": 0.0}
+
+
+def test_outage_still_open_has_no_end(database):
+    now = datetime.now().replace(microsecond=0)
+    database.record_status_changes([
+        (now - timedelta(hours=2), "Prop1", "online"),
+        (now - timedelta(hours=1), "Prop1", "offline"),
+        (now - timedelta(minutes=30), "Prop1", "offline"),  # repeat, dropped
+    ])
+    timeline = database.get_status_timeline("Prop1", now - timedelta(hours=3))
+    outage, = timeline["outages"]
+    assert outage["end"] is None
+    assert outage["duration_s"] >= 3600
+    assert timeline["changes"] == 2
+    assert timeline["seconds"]["unknown"] == 3600.0
+
+
+def test_device_without_history_is_unknown(database):
+    timeline = database.get_status_timeline("Prop9", at("10:00"), at("12:00"))
+    assert timeline["uptime_pct"] is None
+    assert timeline["outages"] == []
+    assert timeline["seconds"] == {"online": 0.0, "offline": 0.0, "unknown": 7200.0}
+
+
+def test_uptime_route_validates_the_window(history):
+    app = Flask(__name__)
+    app.register_blueprint(api_routes.api)
+    http = app.test_client()
+
+    response = http.get("/api/devices/Prop1/uptime?start=2026-03-01T10:00:00&end=2026-03-01T12:00:00")
+    assert response.status_code == 200
+    assert response.get_json()["uptime_pct"] == 62.5
+    assert http.get("/api/devices/Prop1/uptime?start=yesterday").status_code == 400
+    assert http.get("/api/devices/Prop1/uptime?start=2026-03-01T12:00:00&end=2026-03-01T10:00:00").status_code == 400
@@ -0,0 +1,14 @@
+from mqtt.traffic import HeavyHitters
+
+
+def test_heavy_hitters_survive_a_flood_of_distinct_keys():
+    table = HeavyHitters(capacity=50)
+    now = 1000.0
+    for i in range(20_000):
+        now += 0.01
+        table.add(f"MermaidsTale/Cannon{i % 5}/status", now, 10)
+        table.add(f"MermaidsTale/Junk{i}/status", now, 10)
+
+    assert len(table.entries) == 50
+    assert {f"MermaidsTale/Cannon{i}/status" for i in range(5)} <= set(table.entries)
+    assert len(table._heap) <= 4 * table.capacity + 64
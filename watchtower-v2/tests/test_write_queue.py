@@ -0,0 +1,44 @@
+import sqlite3
+import threading
+
+import pytest
+
+
+def test_failing_write_rolls_back_alone_inside_its_batch(database, monkeypatch):
+    batches = []
+    commit_batch = database._commit_batch
+    monkeypatch.setattr(database, "_commit_batch", lambda batch: batches.append(len(batch)) or commit_batch(batch))
+
+    # Hold the writer so the next three queue up behind it and commit together
+    running, release = threading.Event(), threading.Event()
+    held = database.submit_write(lambda: running.set() or release.wait(5))
+    assert running.wait(5)
+    first = database.submit_write(database.add_debug_entry, "Prop1", "warning", "kept before")
+    failing = database.submit_write(database.add_debug_entry, "Prop1", "warning", None)
+    last = database.submit_write(database.add_todo, "kept after")
+    release.set()
+
+    assert held.result(5) is True
+    first_id = first.result(5)
+    with pytest.raises(sqlite3.IntegrityError, match="NOT NULL"):
+        failing.result(5)
+    todo_id = last.result(5)
+
+    assert batches == [1, 3]
+    assert [(e["id"], e["title"]) for e in database.get_debug_entries()] == [(first_id, "kept before")]
+    assert [(t["id"], t["title"]) for t in database.get_todos()] == [(todo_id, "kept after")]
+
+
+def test_queued_write_returns_the_row_id_to_the_caller(database):
+    entry_id = database.add_debug_entry("Prop1", "info", "from a request thread")
+    assert database.get_debug_entries()[0]["id"] == entry_id
+
+
+def test_queued_write_inside_an_open_transaction_runs_inline(database):
+    with pytest.raises(RuntimeError):
+        with database.get_db():
+            database.add_todo("grouped with the caller")
+            # Joined the caller's transaction rather than waiting on the writer
+            assert database.get_todos()[0]["title"] == "grouped with the caller"
+            raise RuntimeError("caller failed")
+    assert database.get_todos() == []